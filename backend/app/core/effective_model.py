@@ -0,0 +1,78 @@
+# app/core/effective_model.py
+"""
+Efektivni process model TOP-a: prvi postavljeni process_model_id uzlazno
+Top → Ebene → Stiege → Bauteil (pravilo iz generate-/sync-tasks).
+
+Umjesto upita po nivou (i po TOP-u) to je jedan COALESCE nad joinom
+Top/Ebene/Stiege/Bauteil: effective_models_select() daje red po TOP-u
+(top_id, process_model_id, model_source) + dodatne kolone po potrebi
+(nazivi za log i sl.). effective_model_expr() / model_source_expr() se
+mogu koristiti i u drugim SELECT-ima nad istim joinom (timeline,
+statistika po modelu).
+"""
+from typing import Optional
+
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.orm import Session
+
+from app.models.process import ProcessModel
+from app.models.structure import Top, Ebene, Stiege, Bauteil
+
+# redoslijed traženja (izvor, tabela)
+LEVELS = (("top", Top), ("ebene", Ebene), ("stiege", Stiege), ("bauteil", Bauteil))
+
+
+def _model_id(table):
+    # 0 se tretira kao "nije postavljeno" (kao `if x.process_model_id:`)
+    return func.nullif(table.process_model_id, 0)
+
+
+def effective_model_expr():
+    """SQL izraz: id efektivnog process modela (NULL ako ga nijedan nivo nema)."""
+    return func.coalesce(*(_model_id(table) for _, table in LEVELS))
+
+
+def model_source_expr():
+    """SQL izraz: nivo s kojeg dolazi model ("top" … "bauteil") ili NULL."""
+    return case(
+        *((_model_id(table).isnot(None), literal(source)) for source, table in LEVELS),
+        else_=None,
+    )
+
+
+def effective_models_select(*columns, project_id: Optional[int] = None):
+    """SELECT top_id, process_model_id, model_source (+ `columns`) – jedan red po TOP-u."""
+    stmt = (
+        select(
+            Top.id.label("top_id"),
+            effective_model_expr().label("process_model_id"),
+            model_source_expr().label("model_source"),
+            *columns,
+        )
+        .select_from(Top)
+        .join(Ebene, Ebene.id == Top.ebene_id)
+        .join(Stiege, Stiege.id == Ebene.stiege_id)
+        .join(Bauteil, Bauteil.id == Stiege.bauteil_id)
+    )
+    if project_id is not None:
+        stmt = stmt.where(Bauteil.project_id == project_id)
+    return stmt
+
+
+def effective_models(db: Session, project_id: int) -> dict[int, tuple[Optional[int], Optional[str]]]:
+    """{top_id: (process_model_id, model_source)} za sve TOP-ove projekta."""
+    return {
+        r.top_id: (r.process_model_id, r.model_source)
+        for r in db.execute(effective_models_select(project_id=project_id))
+    }
+
+
+def effective_model(db: Session, top_id: int) -> Optional[ProcessModel]:
+    """Efektivni ProcessModel jednog TOP-a – jedan upit."""
+    model_id = (
+        effective_models_select()
+        .with_only_columns(effective_model_expr())
+        .where(Top.id == top_id)
+        .scalar_subquery()
+    )
+    return db.query(ProcessModel).filter(ProcessModel.id == model_id).first()
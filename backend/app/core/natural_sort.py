@@ -0,0 +1,20 @@
+# app/core/natural_sort.py
+"""
+Ključ za "prirodno" sortiranje naziva strukture: "Top 2" < "Top 10".
+
+Brojevi u nazivu se dopune nulama na fiksnu širinu, ostatak ide casefold,
+pa obično string poređenje (ORDER BY u bazi) daje isti redoslijed kao
+Intl.Collator({numeric: true}) na frontendu.
+"""
+import re
+from typing import Optional
+
+NUM_WIDTH = 10
+_NUM = re.compile(r"\d+")
+
+
+def natural_key(name: Optional[str]) -> Optional[str]:
+    if name is None:
+        return None
+    s = name.strip().casefold()
+    return _NUM.sub(lambda m: m.group(0).lstrip("0").zfill(NUM_WIDTH), s)
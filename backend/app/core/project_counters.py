@@ -0,0 +1,259 @@
+# app/core/project_counters.py
+"""
+Brojači taskova po (projekt, sub) → project_counters.
+
+tasks-count / has-tasks čitaju nekoliko redova ove tabele umjesto COUNT(*)
+nad svim taskovima projekta. Red sa sub_id = 0 su taskovi bez suba; zbir
+redova projekta je projekt ukupno.
+
+Klasa (done / in_progress / offen) je ista kao u app/core/task_stats.py.
+"Kasni" (app/core/task_filters.delayed_condition) zavisi od današnjeg datuma,
+pa red nosi counted_on: red od jučer se pri čitanju/pisanju preračuna.
+
+Održavanje (transakcijski, u istom commitu kao i taskovi):
+  - ORM insert/update/delete taska → before_flush listener ispod bilježi
+    delte (stara vrijednost −1, nova +1) po (projekt, sub)
+  - set-based UPDATE/DELETE i kaskade (purge, bulk sub, brisanje strukture,
+    process model) → pozivaoci zovu mark_counters_dirty()
+  - prije commita: delte → UPDATE … SET total = total + d; označeni projekti
+    i projekti bez reda / s redom od jučer → preračun (DELETE + INSERT … SELECT)
+  - brisanje projekta → redovi odlaze kaskadno (FK)
+  - drift / postojeći podaci → ensure_project_counters() pri startu,
+    reconcile_project_counters() (reconcile_counters.py)
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, event, except_, exists, func, insert, inspect, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.core.task_filters import delayed_condition
+from app.core.task_stats import STATS_CLASSES, class_counts, stats_class_expr
+from app.models.task import Task
+from app.models.stats import ProjectCounter as PC
+
+NO_SUB = 0
+
+# kolone taska koje mijenjaju brojače
+TRACKED_COLUMNS = ("project_id", "sub_id", "start_ist", "end_ist", "end_soll")
+
+COUNT_FIELDS = ("total", *STATS_CLASSES, "delayed")
+
+_DIRTY_KEY = "project_counters_dirty"
+_DELTA_KEY = "project_counters_delta"
+
+_COLS = ["project_id", "sub_id", *COUNT_FIELDS, "counted_on"]
+
+
+def counters_select(today: date, *criteria):
+    """SELECT redova brojača iz taskova (GROUP BY projekt, sub)."""
+    sub = func.coalesce(Task.sub_id, NO_SUB)
+    return (
+        select(
+            Task.project_id,
+            sub,
+            func.count(Task.id),
+            *class_counts(stats_class_expr()),
+            func.count(case((delayed_condition(today), 1))),
+            literal(today),
+        )
+        .where(*criteria)
+        .group_by(Task.project_id, sub)
+    )
+
+
+def refresh_project_counters(db: Session, project_ids: Iterable[int], today: Optional[date] = None) -> int:
+    """Preračunaj brojače za date projekte."""
+    ids = sorted({pid for pid in project_ids if pid is not None})
+    if not ids:
+        return 0
+    today = today or date.today()
+    db.execute(
+        delete(PC).where(PC.project_id.in_(ids)).execution_options(synchronize_session=False)
+    )
+    res = db.execute(insert(PC).from_select(_COLS, counters_select(today, Task.project_id.in_(ids))))
+    return res.rowcount or 0
+
+
+def mark_counters_dirty(db: Session, *criteria) -> None:
+    """
+    Zabilježi projekte taskova koji odgovaraju `criteria` – pozovi PRIJE
+    set-based UPDATE/DELETE-a. Preračun ide pri commitu.
+    """
+    rows = db.execute(select(Task.project_id).where(*criteria).distinct())
+    db.info.setdefault(_DIRTY_KEY, set()).update(r[0] for r in rows)
+
+
+def reconcile_project_counters(db: Session, project_id: Optional[int] = None) -> int:
+    """Obriši i ponovo složi brojače (cijela baza ili jedan projekt)."""
+    today = date.today()
+    stmt = delete(PC)
+    criteria = []
+    if project_id is not None:
+        stmt = stmt.where(PC.project_id == project_id)
+        criteria.append(Task.project_id == project_id)
+    db.execute(stmt.execution_options(synchronize_session=False))
+    res = db.execute(insert(PC).from_select(_COLS, counters_select(today, *criteria)))
+    return res.rowcount or 0
+
+
+def stale_counter_rows(db: Session) -> int:
+    """Broj redova koji se razlikuju između brojača i taskova (oba smjera, za provjeru)."""
+    expected = select(counters_select(date.today()).subquery())
+    actual = select(*[getattr(PC, c) for c in _COLS])
+    diff = 0
+    for a, b in ((expected, actual), (actual, expected)):
+        diff += db.execute(select(func.count()).select_from(except_(a, b).subquery())).scalar() or 0
+    return diff
+
+
+def ensure_project_counters(db: Session) -> None:
+    """Pri startu: ako brojači još nisu popunjeni a taskovi postoje → reconcile."""
+    has_counters = db.execute(select(exists().select_from(PC))).scalar()
+    has_tasks = db.execute(select(exists().select_from(Task))).scalar()
+    if has_tasks and not has_counters:
+        reconcile_project_counters(db)
+        db.commit()
+
+
+def project_counts(db: Session, project_id: int, sub_id: Optional[int] = None) -> dict:
+    """
+    {"total", "done", "in_progress", "offen", "delayed"} projekta (ili samo
+    taskova jednog suba) iz brojača. Red od jučer → preračun projekta + commit.
+    """
+    today = date.today()
+    stale = db.execute(
+        select(exists().where(PC.project_id == project_id, PC.counted_on < today))
+    ).scalar()
+    if stale:
+        refresh_project_counters(db, [project_id], today)
+        db.commit()
+
+    q = select(*[func.coalesce(func.sum(getattr(PC, f)), 0) for f in COUNT_FIELDS]).where(
+        PC.project_id == project_id
+    )
+    if sub_id is not None:
+        q = q.where(PC.sub_id == sub_id)
+    row = db.execute(q).one()
+    return {f: int(v) for f, v in zip(COUNT_FIELDS, row)}
+
+
+# --- delte iz ORM promjena ---
+
+def _counter_key(values: dict, today: date):
+    """(project_id, sub_id) i vektor (total, done, in_progress, offen, delayed) za jedan task."""
+    start_ist, end_ist, end_soll = values["start_ist"], values["end_ist"], values["end_soll"]
+    if end_ist is not None:
+        cls = 1
+    elif start_ist is not None:
+        cls = 2
+    else:
+        cls = 3
+    delayed = end_soll is not None and (
+        (end_ist is None and end_soll < today) or (end_ist is not None and end_ist > end_soll)
+    )
+    vec = [1, 0, 0, 0, 1 if delayed else 0]
+    vec[cls] = 1
+    return (values["project_id"], values["sub_id"] or NO_SUB), vec
+
+
+def _old_values(session: Session, task: Task) -> dict:
+    """Vrijednosti praćenih kolona kakve su u bazi (prije ovog flusha)."""
+    state = inspect(task)
+    values, missing = {}, False
+    for col in TRACKED_COLUMNS:
+        hist = state.attrs[col].history
+        if hist.deleted:
+            values[col] = hist.deleted[0]
+        elif hist.unchanged:
+            values[col] = hist.unchanged[0]
+        else:
+            # nije učitano (ili postavljeno "naslijepo") → stara vrijednost iz baze
+            missing = True
+            break
+    if missing:
+        row = session.execute(
+            select(*[getattr(Task, c) for c in TRACKED_COLUMNS]).where(Task.id == task.id)
+        ).one()
+        values = dict(zip(TRACKED_COLUMNS, row))
+    return values
+
+
+def _changed(task: Task) -> bool:
+    state = inspect(task)
+    return any(state.attrs[c].history.has_changes() for c in TRACKED_COLUMNS)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_counter_deltas(session: Session, flush_context, instances):
+    today = date.today()
+    deltas = session.info.setdefault(_DELTA_KEY, defaultdict(lambda: [0] * len(COUNT_FIELDS)))
+
+    def add(values: dict, sign: int):
+        if values["project_id"] is None:
+            return
+        key, vec = _counter_key(values, today)
+        acc = deltas[key]
+        for i, v in enumerate(vec):
+            acc[i] += sign * v
+
+    for obj in session.new:
+        if isinstance(obj, Task):
+            add({c: getattr(obj, c) for c in TRACKED_COLUMNS}, +1)
+    for obj in session.dirty:
+        if isinstance(obj, Task) and obj not in session.deleted and _changed(obj):
+            add(_old_values(session, obj), -1)
+            add({c: getattr(obj, c) for c in TRACKED_COLUMNS}, +1)
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            add(_old_values(session, obj), -1)
+
+
+def _apply_deltas(session: Session, deltas: dict, today: date) -> set[int]:
+    """UPDATE postojećih redova; vraća projekte kojima treba preračun."""
+    recount: set[int] = set()
+    touched: set[int] = set()
+    for (pid, sub_id), vec in deltas.items():
+        if not any(vec):
+            continue
+        res = session.execute(
+            update(PC)
+            .where(PC.project_id == pid, PC.sub_id == sub_id, PC.counted_on == today)
+            .values({f: getattr(PC, f) + d for f, d in zip(COUNT_FIELDS, vec)})
+            .execution_options(synchronize_session=False)
+        )
+        if not res.rowcount:
+            # nema reda (prvi task suba/projekta) ili je red od jučer
+            recount.add(pid)
+        touched.add(pid)
+    if touched - recount:
+        session.execute(
+            delete(PC)
+            .where(PC.project_id.in_(touched - recount), PC.total <= 0)
+            .execution_options(synchronize_session=False)
+        )
+    return recount
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _write_counters(session: Session):
+    session.flush()  # before_flush gore skuplja delte ovog flusha
+    dirty = session.info.pop(_DIRTY_KEY, None) or set()
+    deltas = session.info.pop(_DELTA_KEY, None) or {}
+    if not dirty and not deltas:
+        return
+    today = date.today()
+    # označeni projekti se ionako preračunavaju → njihove delte se ne primjenjuju
+    recount = set(dirty)
+    recount |= _apply_deltas(
+        session, {k: v for k, v in deltas.items() if k[0] not in dirty}, today
+    )
+    refresh_project_counters(session, recount, today)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _forget_counters(session: Session, previous_transaction):
+    session.info.pop(_DIRTY_KEY, None)
+    session.info.pop(_DELTA_KEY, None)
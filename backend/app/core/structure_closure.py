@@ -0,0 +1,235 @@
+# app/core/structure_closure.py
+"""
+Closure tabela (structure_closure) za Bauteil → Stiege → Ebene → Top.
+
+Svaki čvor ima red sam sa sobom (depth=0) i po jedan red za svakog pretka.
+Time su:
+  - podstablo ("svi TOP-ovi ispod Stiege 3")  → descendants_of()
+  - putanja za log (Projekt/Bauteil/.../Top)  → structure_path()
+  - propagacija process modela na djecu       → propagate_process_model()
+svaki po jedan indeksirani upit, bez lanca .get() poziva.
+
+Održavanje:
+  - novi čvor            → after_insert mapper eventi ispod (sve putanje kreiranja)
+  - premještanje čvora   → rute zovu move_node()
+  - brisanje čvora       → rute zovu delete_node() (projekt briše kaskadno u bazi)
+  - postojeći podaci     → ensure_structure_closure() pri startu / rebuild_structure_closure()
+"""
+from typing import Optional
+
+from sqlalchemy import delete, event, exists, insert, literal, select, union_all
+from sqlalchemy.orm import Session, aliased
+
+from app.models.project import Project
+from app.models.structure import Bauteil, Stiege, Ebene, Top, StructureClosure as C
+
+LEVELS = ("bauteil", "stiege", "ebene", "top")
+MODELS = {"bauteil": Bauteil, "stiege": Stiege, "ebene": Ebene, "top": Top}
+PARENT_LEVEL = {"stiege": "bauteil", "ebene": "stiege", "top": "ebene"}
+PARENT_FK = {"stiege": "bauteil_id", "ebene": "stiege_id", "top": "ebene_id"}
+
+_COLS = ["project_id", "ancestor_kind", "ancestor_id", "descendant_kind", "descendant_id", "depth"]
+
+
+def descendants_of(kind: str, node_id, of_kind: str, *, include_self: bool = True):
+    """SELECT id-eva svih čvorova vrste `of_kind` ispod (kind, node_id)."""
+    q = select(C.descendant_id).where(
+        C.ancestor_kind == kind,
+        C.ancestor_id == node_id,
+        C.descendant_kind == of_kind,
+    )
+    if not include_self:
+        q = q.where(C.depth > 0)
+    return q
+
+
+def node_project_id(db: Session, kind: str, node_id: int) -> Optional[int]:
+    return db.execute(
+        select(C.project_id).where(
+            C.descendant_kind == kind, C.descendant_id == node_id, C.depth == 0
+        )
+    ).scalar()
+
+
+def structure_path(db: Session, kind: str, node_id: int) -> dict[str, Optional[str]]:
+    """
+    Nazivi čvora i svih predaka + projekt, jednim upitom:
+    {"project": ..., "bauteil": ..., "stiege": ..., "ebene": ..., "top": ...}
+    (nivoi ispod `kind` ostaju None).
+    """
+    path: dict[str, Optional[str]] = {"project": None, **{lvl: None for lvl in LEVELS}}
+    q = (
+        select(C.ancestor_kind, Bauteil.name, Stiege.name, Ebene.name, Top.name, Project.name)
+        .select_from(C)
+        .outerjoin(Bauteil, (C.ancestor_kind == "bauteil") & (Bauteil.id == C.ancestor_id))
+        .outerjoin(Stiege, (C.ancestor_kind == "stiege") & (Stiege.id == C.ancestor_id))
+        .outerjoin(Ebene, (C.ancestor_kind == "ebene") & (Ebene.id == C.ancestor_id))
+        .outerjoin(Top, (C.ancestor_kind == "top") & (Top.id == C.ancestor_id))
+        .outerjoin(Project, Project.id == C.project_id)
+        .where(C.descendant_kind == kind, C.descendant_id == node_id)
+    )
+    for anc_kind, b, s, e, t, project_name in db.execute(q):
+        path[anc_kind] = {"bauteil": b, "stiege": s, "ebene": e, "top": t}[anc_kind]
+        path["project"] = project_name
+    return path
+
+
+def propagate_process_model(db: Session, kind: str, node_id: int, process_model_id) -> None:
+    """process_model_id na SVE čvorove ispod (kind, node_id) – jedan UPDATE po nivou."""
+    for level in LEVELS[LEVELS.index(kind) + 1:]:
+        model = MODELS[level]
+        db.query(model).filter(
+            model.id.in_(descendants_of(kind, node_id, level, include_self=False))
+        ).update({"process_model_id": process_model_id}, synchronize_session=False)
+
+
+def _in_subtree(kind: str, node_id: int):
+    """Korelisani uslov: red C ima potomka u podstablu (kind, node_id)."""
+    sub = aliased(C)
+    return exists().where(
+        sub.ancestor_kind == kind,
+        sub.ancestor_id == node_id,
+        sub.descendant_kind == C.descendant_kind,
+        sub.descendant_id == C.descendant_id,
+    )
+
+
+def move_node(db: Session, kind: str, node_id: int, new_parent_id: int) -> None:
+    """Premjesti podstablo (kind, node_id) pod novog roditelja (nivo iznad `kind`)."""
+    above = LEVELS[: LEVELS.index(kind)]
+
+    # 1) odveži podstablo od starih predaka
+    db.execute(
+        delete(C)
+        .where(C.ancestor_kind.in_(above), _in_subtree(kind, node_id))
+        .execution_options(synchronize_session=False)
+    )
+
+    # 2) novi preci × podstablo
+    anc, sub = aliased(C), aliased(C)
+    db.execute(
+        insert(C).from_select(
+            _COLS,
+            select(
+                anc.project_id,
+                anc.ancestor_kind,
+                anc.ancestor_id,
+                sub.descendant_kind,
+                sub.descendant_id,
+                anc.depth + sub.depth + 1,
+            ).where(
+                anc.descendant_kind == PARENT_LEVEL[kind],
+                anc.descendant_id == new_parent_id,
+                sub.ancestor_kind == kind,
+                sub.ancestor_id == node_id,
+            ),
+        )
+    )
+
+
+def delete_node(db: Session, kind: str, node_id: int) -> None:
+    """Ukloni redove cijelog podstabla (pozovi prije brisanja čvora)."""
+    db.execute(
+        delete(C)
+        .where(_in_subtree(kind, node_id))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _joined_up(kind: str):
+    """FROM <kind> JOIN roditelji sve do Bauteila (treba za project_id)."""
+    frm = MODELS[kind].__table__
+    child = kind
+    while child in PARENT_LEVEL:
+        parent = PARENT_LEVEL[child]
+        frm = frm.join(MODELS[parent], MODELS[parent].id == getattr(MODELS[child], PARENT_FK[child]))
+        child = parent
+    return frm
+
+
+def closure_select(project_id: Optional[int] = None):
+    """Očekivani sadržaj closure tabele izveden iz FK-ova strukture (za rebuild/provjeru)."""
+    selects = []
+    for idx, desc_kind in enumerate(LEVELS):
+        for depth in range(idx + 1):
+            anc_kind = LEVELS[idx - depth]
+            q = select(
+                Bauteil.project_id.label("project_id"),
+                literal(anc_kind).label("ancestor_kind"),
+                MODELS[anc_kind].id.label("ancestor_id"),
+                literal(desc_kind).label("descendant_kind"),
+                MODELS[desc_kind].id.label("descendant_id"),
+                literal(depth).label("depth"),
+            ).select_from(_joined_up(desc_kind))
+            if project_id is not None:
+                q = q.where(Bauteil.project_id == project_id)
+            selects.append(q)
+    return union_all(*selects)
+
+
+def rebuild_structure_closure(db: Session, project_id: Optional[int] = None) -> int:
+    """Obriši i ponovo složi closure (cijela baza ili jedan projekt)."""
+    stmt = delete(C)
+    if project_id is not None:
+        stmt = stmt.where(C.project_id == project_id)
+    db.execute(stmt.execution_options(synchronize_session=False))
+    res = db.execute(insert(C).from_select(_COLS, closure_select(project_id)))
+    return res.rowcount or 0
+
+
+def ensure_structure_closure(db: Session) -> None:
+    """Pri startu: ako closure još nije popunjen a struktura postoji → rebuild."""
+    has_closure = db.execute(select(exists().select_from(C))).scalar()
+    has_structure = db.execute(select(exists().select_from(Bauteil))).scalar()
+    if has_structure and not has_closure:
+        rebuild_structure_closure(db)
+        db.commit()
+
+
+# --- novi čvor → closure redovi (radi za rute, crud i create_project) ---
+
+@event.listens_for(Bauteil, "after_insert")
+def _closure_on_bauteil_insert(mapper, connection, target):
+    connection.execute(
+        insert(C).values(
+            project_id=target.project_id,
+            ancestor_kind="bauteil",
+            ancestor_id=target.id,
+            descendant_kind="bauteil",
+            descendant_id=target.id,
+            depth=0,
+        )
+    )
+
+
+def _closure_on_child_insert(kind: str):
+    def listener(mapper, connection, target):
+        parent_id = getattr(target, PARENT_FK[kind])
+        # preci roditelja (uklj. roditelja) + red sam sa sobom, project_id od roditelja
+        connection.execute(
+            insert(C).from_select(
+                _COLS,
+                union_all(
+                    select(
+                        C.project_id, C.ancestor_kind, C.ancestor_id,
+                        literal(kind), literal(target.id), C.depth + 1,
+                    ).where(
+                        C.descendant_kind == PARENT_LEVEL[kind],
+                        C.descendant_id == parent_id,
+                    ),
+                    select(
+                        C.project_id, literal(kind), literal(target.id),
+                        literal(kind), literal(target.id), literal(0),
+                    ).where(
+                        C.descendant_kind == PARENT_LEVEL[kind],
+                        C.descendant_id == parent_id,
+                        C.depth == 0,
+                    ),
+                ),
+            )
+        )
+    return listener
+
+
+for _kind in ("stiege", "ebene", "top"):
+    event.listen(MODELS[_kind], "after_insert", _closure_on_child_insert(_kind))
@@ -0,0 +1,225 @@
+# app/core/structure_denorm.py
+"""
+Denormalizirani podaci strukture na tasku.
+
+Task.bauteil_id / stiege_id / ebene_id = roditelji TOP-a → filteri po
+strukturi idu direktno po indeksiranoj koloni taska, bez joina.
+
+Task.location = "Bauteil • Stiege • Ebene • Top" (prazni nazivi se
+preskaču) → logovi (bulk, skip-window) ne šetaju task.top.ebene.stiege.bauteil.
+
+Task.sort_key = složeni "prirodni" ključ Bauteil/Stiege/Ebene/Top
+(po nivou "0"+sort_key ili "1" ako nema naziva → prazni idu na kraj),
+spojen separatorom koji je manji od svakog znaka u nazivu. Index
+(project_id, sort_key) → timeline čita redove već sortirane, bez joina.
+
+Održavanje:
+  - novi task / promjena top_id → before_flush listener ispod
+  - promjena naziva ili roditelja strukture → rute zovu refresh_task_structure()
+  - provjera/popravka postojećih podataka → repair_task_structure.py
+"""
+from sqlalchemy import String, case, event, func, inspect, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.task import Task
+from app.models.structure import Top, Ebene, Stiege, Bauteil
+from app.core.task_sync import next_revision
+from app.core.structure_closure import descendants_of
+from app.core.structure_rollup import mark_rollup_dirty
+
+SORT_SEP = "\x1f"
+LOCATION_SEP = " • "
+
+# kolone taska koje se izvode iz top_id
+DENORM_COLUMNS = ("bauteil_id", "stiege_id", "ebene_id", "location", "sort_key")
+
+
+def _sort_part(col):
+    return case((col.is_(None), literal("1")), else_=literal("0") + col)
+
+
+def task_sort_key_expr():
+    """SQL izraz složenog ključa – koristi se unutar SELECT-a nad Top/Ebene/Stiege/Bauteil."""
+    return (
+        _sort_part(Bauteil.sort_key) + SORT_SEP
+        + _sort_part(Stiege.sort_key) + SORT_SEP
+        + _sort_part(Ebene.sort_key) + SORT_SEP
+        + _sort_part(Top.sort_key)
+    )
+
+
+def _location_part(col):
+    return func.coalesce(
+        literal(LOCATION_SEP) + func.nullif(col, "", type_=String), "", type_=String
+    )
+
+
+def task_location_expr():
+    """SQL izraz za Task.location – isti rezultat kao " • ".join(nazivi koji nisu prazni)."""
+    joined = (
+        _location_part(Bauteil.name)
+        + _location_part(Stiege.name)
+        + _location_part(Ebene.name)
+        + _location_part(Top.name)
+    )
+    # skini vodeći separator; prazno → NULL
+    return func.nullif(func.substr(joined, len(LOCATION_SEP) + 1), "", type_=String)
+
+
+def structure_select():
+    """SELECT top_id + sve denormalizirane vrijednosti (jedan red po TOP-u)."""
+    return (
+        select(
+            Top.id.label("top_id"),
+            Bauteil.id.label("bauteil_id"),
+            Stiege.id.label("stiege_id"),
+            Ebene.id.label("ebene_id"),
+            task_location_expr().label("location"),
+            task_sort_key_expr().label("sort_key"),
+        )
+        .select_from(Top)
+        .join(Ebene, Ebene.id == Top.ebene_id)
+        .join(Stiege, Stiege.id == Ebene.stiege_id)
+        .join(Bauteil, Bauteil.id == Stiege.bauteil_id)
+    )
+
+
+def refresh_task_structure(db: Session, *criteria) -> int:
+    """
+    Preračunaj denormalizirane kolone za taskove koji odgovaraju `criteria`
+    (npr. nakon promjene naziva ili roditelja Bauteila). Podiže i reviziju
+    projekta jer se mijenjaju nazivi u timeline redovima.
+    """
+    db.flush()  # nazivi/roditelji strukture moraju biti u bazi prije podupita
+    project_ids = db.execute(
+        select(Task.project_id).where(*criteria).distinct()
+    ).scalars().all()
+
+    # rollup: stare Ebene (prije) + nove Ebene (poslije UPDATE-a)
+    mark_rollup_dirty(db, *criteria)
+
+    s = structure_select().subquery()
+    touched = 0
+    for pid in project_ids:
+        # UPDATE ... FROM (jedan prolaz, bez korelisanog podupita po koloni)
+        res = db.execute(
+            update(Task)
+            .where(Task.top_id == s.c.top_id, Task.project_id == pid, *criteria)
+            .values(
+                **{col: s.c[col] for col in DENORM_COLUMNS},
+                revision=next_revision(db, pid),
+                updated_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        touched += res.rowcount or 0
+
+    if touched:
+        mark_rollup_dirty(db, *criteria)
+    return touched
+
+
+def stale_task_criteria():
+    """Predikat: task čije denormalizirane kolone ne odgovaraju strukturi."""
+    s = structure_select().subquery()
+    return ~(
+        select(s.c.top_id)
+        .where(
+            s.c.top_id == Task.top_id,
+            *[s.c[col].is_not_distinct_from(getattr(Task, col)) for col in DENORM_COLUMNS],
+        )
+        .exists()
+    )
+
+
+def task_location_names(db: Session, task: Task) -> dict:
+    """{"bauteil","stiege","ebene","top"} nazivi za log jednog taska – jedan upit."""
+    row = db.execute(
+        select(Bauteil.name, Stiege.name, Ebene.name, Top.name)
+        .select_from(Top)
+        .join(Ebene, Ebene.id == Top.ebene_id)
+        .join(Stiege, Stiege.id == Ebene.stiege_id)
+        .join(Bauteil, Bauteil.id == Stiege.bauteil_id)
+        .where(Top.id == task.top_id)
+    ).first()
+    b, s, e, t = row if row else (None, None, None, None)
+    return {"bauteil": b, "stiege": s, "ebene": e, "top": t}
+
+
+def project_structure_names(db: Session, project_id: int) -> dict[str, dict[int, str]]:
+    """
+    Nazivi strukture projekta po nivou i id-u ({"top": {id: name}, ...}).
+    Jedan upit nad malim tabelama; redovi taskova ih čitaju preko
+    denormaliziranih id-eva umjesto joina po tasku.
+    """
+    names: dict[str, dict[int, str]] = {"bauteil": {}, "stiege": {}, "ebene": {}, "top": {}}
+    rows = db.execute(
+        select(Bauteil.id, Bauteil.name, Stiege.id, Stiege.name,
+               Ebene.id, Ebene.name, Top.id, Top.name)
+        .select_from(Bauteil)
+        .outerjoin(Stiege, Stiege.bauteil_id == Bauteil.id)
+        .outerjoin(Ebene, Ebene.stiege_id == Stiege.id)
+        .outerjoin(Top, Top.ebene_id == Ebene.id)
+        .where(Bauteil.project_id == project_id)
+    )
+    for b_id, b_name, s_id, s_name, e_id, e_name, t_id, t_name in rows:
+        names["bauteil"][b_id] = b_name
+        if s_id is not None:
+            names["stiege"][s_id] = s_name
+        if e_id is not None:
+            names["ebene"][e_id] = e_name
+        if t_id is not None:
+            names["top"][t_id] = t_name
+    return names
+
+
+def tops_under(level: str, obj_id: int):
+    """SELECT tops.id za sve TOP-ove ispod datog čvora strukture (closure tabela)."""
+    return descendants_of(level, obj_id, "top")
+
+
+def _apply_structure_row(task: Task, row) -> None:
+    for col in DENORM_COLUMNS:
+        setattr(task, col, row[col])
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _fill_task_structure(session: Session, flush_context, instances):
+    """Novi taskovi / promjena top_id → jedan upit za sve TOP-ove u ovom flushu."""
+    pending: list[Task] = []
+    for obj in session.new:
+        if isinstance(obj, Task) and obj.top_id is not None:
+            pending.append(obj)
+    for obj in session.dirty:
+        if (
+            isinstance(obj, Task)
+            and obj.top_id is not None
+            and inspect(obj).attrs.top_id.history.has_changes()
+        ):
+            pending.append(obj)
+    if not pending:
+        return
+
+    top_ids = {t.top_id for t in pending}
+    rows = {
+        r.top_id: r
+        for r in session.execute(
+            structure_select().where(Top.id.in_(top_ids))
+        ).mappings()
+    }
+    for t in pending:
+        row = rows.get(t.top_id)
+        if row is not None:
+            _apply_structure_row(t, row)
+
+
+@event.listens_for(Task, "before_insert")
+def _task_structure_on_insert(mapper, connection, target):
+    # rezerva za taskove čiji TOP nije bio u bazi u before_flush (npr. novi TOP u istom flushu)
+    if target.top_id is not None and target.ebene_id is None:
+        row = connection.execute(
+            structure_select().where(Top.id == target.top_id)
+        ).mappings().first()
+        if row is not None:
+            _apply_structure_row(target, row)
@@ -0,0 +1,205 @@
+# app/core/structure_rollup.py
+"""
+Rollup taskova po (projekt, Ebene, aktivnost) → structure_activity_rollup.
+
+/structure-timeline bez filtera čita ovu tabelu umjesto taskova: trošak je
+O(Ebene × aktivnosti), neovisno o broju taskova. Stiege/Bauteil se slažu iz
+redova Ebene (MIN/MAX/SUM).
+
+"Kasni" zavisi od današnjeg datuma, pa se ne sprema kao zastavica nego kao
+late_done (gotovi poslije end_soll) + open_end_min (najraniji end_soll
+otvorenih) → delayed = late_done > 0 OR open_end_min < danas.
+
+Gewerk se sprema kao gewerk_id = MIN(Gewerk.id); naziv i boja se čitaju iz
+tog jednog gewerka (kao u filtriranom GROUP BY-u u task_structure.py), pa
+su rollup i filtrirani put isti red za red.
+
+Održavanje (inkrementalno, po Ebene):
+  - ORM promjene taska (update, bulk, skip-window, sync, generate, delete)
+    → after_flush listener ispod bilježi (projekt, Ebene) stare i nove vrijednosti
+  - set-based UPDATE/DELETE i kaskade (purge, brisanje strukture, process
+    model, refresh_task_structure) → pozivaoci zovu mark_rollup_dirty()
+  - prije commita se označene Ebene preračunaju (DELETE + INSERT … SELECT)
+  - postojeći podaci / popravka → ensure_structure_rollup() pri startu
+    (uklj. tabelu iz starije sheme), rebuild_structure_rollup() (repair_task_structure.py)
+"""
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, case, delete, event, except_, exists, func, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.task import Task
+from app.models.process import ProcessStep
+from app.models.gewerk import Gewerk
+from app.models.structure import StructureActivityRollup as R
+
+NO_ACTIVITY = "(ohne Aktivität)"
+
+# kolone taska koje mijenjaju rollup
+TRACKED_COLUMNS = (
+    "project_id", "ebene_id", "process_step_id",
+    "start_soll", "end_soll", "start_ist", "end_ist",
+)
+
+_DIRTY_KEY = "structure_rollup_dirty"
+
+_COLS = [
+    "project_id", "ebene_id", "activity", "start", "end",
+    "total", "done", "late_done", "open_end_min", "gewerk_id",
+]
+
+
+def activity_expr():
+    return case((ProcessStep.id.is_(None), NO_ACTIVITY), else_=ProcessStep.activity)
+
+
+def rollup_select(*criteria):
+    """SELECT redova rolluppa iz taskova (GROUP BY projekt, Ebene, aktivnost)."""
+    activity = activity_expr()
+    return (
+        select(
+            Task.project_id,
+            Task.ebene_id,
+            activity,
+            func.min(func.coalesce(Task.start_ist, Task.start_soll)),
+            func.max(func.coalesce(Task.end_ist, Task.end_soll)),
+            func.count(Task.id),
+            func.count(Task.end_ist),
+            func.count(case((and_(Task.end_ist.isnot(None), Task.end_ist > Task.end_soll), 1))),
+            func.min(case((Task.end_ist.is_(None), Task.end_soll))),
+            func.min(Gewerk.id),
+        )
+        .select_from(Task)
+        .outerjoin(ProcessStep, ProcessStep.id == Task.process_step_id)
+        .outerjoin(Gewerk, Gewerk.id == ProcessStep.gewerk_id)
+        .where(Task.ebene_id.isnot(None), *criteria)
+        .group_by(Task.project_id, Task.ebene_id, activity)
+    )
+
+
+def rollup_delayed(today):
+    """Agregat "kasni" nad redovima rolluppa (ista logika kao nad taskovima)."""
+    return func.max(case((or_(R.late_done > 0, R.open_end_min < today), 1), else_=0))
+
+
+def refresh_structure_rollup(db: Session, keys: Iterable[tuple[int, int]]) -> int:
+    """Preračunaj rollup za date (project_id, ebene_id) parove."""
+    by_project: dict[int, set[int]] = defaultdict(set)
+    for project_id, ebene_id in keys:
+        if project_id is not None and ebene_id is not None:
+            by_project[project_id].add(ebene_id)
+
+    written = 0
+    for pid, ebene_ids in by_project.items():
+        ids = sorted(ebene_ids)
+        db.execute(
+            delete(R)
+            .where(R.project_id == pid, R.ebene_id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        res = db.execute(
+            insert(R).from_select(
+                _COLS, rollup_select(Task.project_id == pid, Task.ebene_id.in_(ids))
+            )
+        )
+        written += res.rowcount or 0
+    return written
+
+
+def mark_rollup_dirty(db: Session, *criteria) -> None:
+    """
+    Zabilježi Ebene taskova koji odgovaraju `criteria` – pozovi PRIJE set-based
+    UPDATE/DELETE-a (i poslije, ako se mijenja ebene_id). Preračun ide pri commitu.
+    """
+    rows = db.execute(
+        select(Task.project_id, Task.ebene_id).where(Task.ebene_id.isnot(None), *criteria).distinct()
+    )
+    db.info.setdefault(_DIRTY_KEY, set()).update(tuple(r) for r in rows)
+
+
+def rebuild_structure_rollup(db: Session, project_id: Optional[int] = None) -> int:
+    """Obriši i ponovo složi rollup (cijela baza ili jedan projekt)."""
+    stmt = delete(R)
+    criteria = []
+    if project_id is not None:
+        stmt = stmt.where(R.project_id == project_id)
+        criteria.append(Task.project_id == project_id)
+    db.execute(stmt.execution_options(synchronize_session=False))
+    res = db.execute(insert(R).from_select(_COLS, rollup_select(*criteria)))
+    return res.rowcount or 0
+
+
+def stale_rollup_rows(db: Session) -> int:
+    """Broj redova koji se razlikuju između rolluppa i taskova (oba smjera, za provjeru)."""
+    expected = select(rollup_select().subquery())
+    actual = select(*[getattr(R, c) for c in _COLS])
+    diff = 0
+    for a, b in ((expected, actual), (actual, expected)):
+        diff += db.execute(select(func.count()).select_from(except_(a, b).subquery())).scalar() or 0
+    return diff
+
+
+def ensure_rollup_schema(db: Session) -> bool:
+    """Tabela iz starije sheme (gewerk/color umjesto gewerk_id) → nova, prazna tabela."""
+    conn = db.connection()
+    if "gewerk_id" in {c["name"] for c in inspect(conn).get_columns(R.__tablename__)}:
+        return False
+    R.__table__.drop(conn)  # izvedeni podaci – rebuild ih vrati
+    R.__table__.create(conn)
+    db.commit()
+    return True
+
+
+def ensure_structure_rollup(db: Session) -> None:
+    """Pri startu: shema (ensure_rollup_schema); ako rollup još nije popunjen a taskovi postoje → rebuild."""
+    ensure_rollup_schema(db)
+    has_rollup = db.execute(select(exists().select_from(R))).scalar()
+    has_tasks = db.execute(select(exists().where(Task.ebene_id.isnot(None)))).scalar()
+    if has_tasks and not has_rollup:
+        rebuild_structure_rollup(db)
+        db.commit()
+
+
+def _task_keys(task: Task, *, changed_only: bool) -> set[tuple[int, int]]:
+    state = inspect(task)
+    if changed_only and not any(
+        state.attrs[c].history.has_changes() for c in TRACKED_COLUMNS
+    ):
+        return set()
+    keys = set()
+    pids = state.attrs.project_id.history
+    eids = state.attrs.ebene_id.history
+    # stara i nova vrijednost → i Ebene iz koje je task otišao se preračuna
+    for pid in [*pids.added, *pids.unchanged, *pids.deleted]:
+        for eid in [*eids.added, *eids.unchanged, *eids.deleted]:
+            keys.add((pid, eid))
+    return keys
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_rollup_keys(session: Session, flush_context):
+    dirty = session.info.setdefault(_DIRTY_KEY, set())
+    for obj in session.new:
+        if isinstance(obj, Task):
+            dirty.update(_task_keys(obj, changed_only=False))
+    for obj in session.dirty:
+        if isinstance(obj, Task):
+            dirty.update(_task_keys(obj, changed_only=True))
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            dirty.update(_task_keys(obj, changed_only=False))
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _refresh_dirty_rollups(session: Session):
+    session.flush()  # after_flush gore skuplja ključeve ovog flusha
+    dirty = session.info.pop(_DIRTY_KEY, None)
+    if dirty:
+        refresh_structure_rollup(session, dirty)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _forget_dirty_rollups(session: Session, previous_transaction):
+    session.info.pop(_DIRTY_KEY, None)
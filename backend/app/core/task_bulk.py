@@ -0,0 +1,96 @@
+# app/core/task_bulk.py
+"""
+Bulk upis novih i izmjena postojećih taskova (generate-tasks, sync-tasks)
+bez ORM objekata.
+
+ORM flush s func.now() u updated_at (app/core/task_sync.py) šalje po jedan
+INSERT po tasku. Ovdje ide jedan INSERT … RETURNING id kao executemany
+(SQLAlchemy ga slaže u višeredne VALUES stranice), a ono što bi ORM
+listeneri uradili za db.add(Task) radi se eksplicitno:
+  - revizija projekta + updated_at (jedna revizija za cijeli upis)
+  - denormalizirana struktura (bauteil/stiege/ebene_id, location, sort_key)
+    iz jednog structure_select upita za projekt
+  - rollup strukture + brojači → označeni, preračun pri commitu
+
+update_tasks() isto za izmjene: jedan UPDATE … WHERE id = :id kao
+executemany, sve izmjene dobiju jednu novu reviziju.
+"""
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.orm import Session
+
+from app.core.project_counters import mark_counters_dirty
+from app.core.structure_denorm import DENORM_COLUMNS, structure_select
+from app.core.structure_rollup import mark_rollup_dirty
+from app.core.task_sync import next_revision
+from app.models.structure import Bauteil
+from app.models.task import Task
+
+
+def insert_tasks(db: Session, project_id: int, rows: list[dict]) -> list[int]:
+    """
+    Upiši taskove (dict-ovi s istim ključevima, npr. top_id, process_step_id,
+    start_soll, end_soll, status) u projekt; vraća id-jeve istim redom.
+    (top_id, process_step_id) mora biti jedinstven unutar `rows`. Ne commita.
+    """
+    if not rows:
+        return []
+
+    structure = {
+        r["top_id"]: r
+        for r in db.execute(
+            structure_select().where(Bauteil.project_id == project_id)
+        ).mappings()
+    }
+    params = []
+    for row in rows:
+        s = structure.get(row["top_id"])
+        params.append({
+            **{col: s[col] if s else None for col in DENORM_COLUMNS},
+            **row,
+            "project_id": project_id,
+        })
+
+    # bez sort_by_parameter_order (SQLite bi tada slao red po red) → id-jevi
+    # se vežu za redove preko (top_id, process_step_id)
+    rev = next_revision(db, project_id)
+    returned = db.execute(
+        insert(Task)
+        .values(revision=rev, updated_at=func.now())
+        .returning(Task.id, Task.top_id, Task.process_step_id),
+        params,
+    ).all()
+    id_by_key = {(top_id, step_id): task_id for task_id, top_id, step_id in returned}
+
+    # novi taskovi = taskovi projekta s ovom revizijom
+    criteria = (Task.project_id == project_id, Task.revision == rev)
+    mark_rollup_dirty(db, *criteria)
+    mark_counters_dirty(db, *criteria)
+    return [id_by_key[(row["top_id"], row["process_step_id"])] for row in rows]
+
+
+def update_tasks(db: Session, project_id: int, rows: list[dict]) -> None:
+    """
+    Izmijeni taskove projekta: dict-ovi s "id" + kolonama (isti ključevi u
+    svim redovima, npr. start_soll, end_soll). Ne mijenja strukturu. Ne commita.
+    """
+    if not rows:
+        return
+
+    columns = [key for key in rows[0] if key != "id"]
+    rev = next_revision(db, project_id)
+    # Core executemany (bez ORM bulk-by-PK) → parametri se zovu b_*, ne kao kolone
+    db.connection().execute(
+        update(Task)
+        .where(Task.id == bindparam("b_id"), Task.project_id == project_id)
+        .values(
+            revision=rev,
+            updated_at=func.now(),
+            **{col: bindparam(f"b_{col}") for col in columns},
+        ),
+        [{f"b_{key}": value for key, value in row.items()} for row in rows],
+    )
+
+    # izmijenjeni taskovi = taskovi projekta s ovom revizijom
+    criteria = (Task.project_id == project_id, Task.revision == rev)
+    mark_rollup_dirty(db, *criteria)
+    mark_counters_dirty(db, *criteria)
@@ -0,0 +1,183 @@
+# app/core/task_export.py
+"""
+Export tabele taskova (/projects/{id}/tasks-export) kao CSV ili XLSX.
+
+Redovi se čitaju kolonama (bez ORM objekata) preko server-side kursora
+(stream_results + yield_per) i pišu u dijelovima od CHUNK_SIZE redova, pa
+memorija ne raste s veličinom projekta. Check-answers se učitavaju po
+dijelu (jedan IN upit za CHUNK_SIZE taskova) i izravnavaju u po jednu
+kolonu po pitanju (label); važi zadnji odgovor.
+
+CSV se šalje dio po dio (download kreće odmah). XLSX traži openpyxl
+(write_only → redovi idu na disk, ne u memoriju); zip se može poslati tek
+kad je workbook zatvoren.
+"""
+import csv
+import io
+import tempfile
+from datetime import date, datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.structure_denorm import project_structure_names
+from app.core.task_filters import task_filter_criteria
+from app.models.aktivitaet_question import TaskCheckAnswer
+from app.models.gewerk import Gewerk
+from app.models.process import ProcessStep, ProcessModel
+from app.models.task import Task
+from app.models.user import User
+from app.schemas.bulk import BulkFilters
+
+try:  # opcionalno – samo za format=xlsx
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+CHUNK_SIZE = 1000
+CSV_DELIMITER = ";"  # Excel (de-AT) otvara ; direktno u kolone
+
+BASE_HEADER = [
+    "ID", "Bauteil", "Stiege", "Ebene", "Top", "Aktivität", "Gewerk",
+    "Prozessmodell", "Start Soll", "Ende Soll", "Start Ist", "Ende Ist",
+    "Status", "Sub", "Beschreibung",
+]
+
+
+def xlsx_available() -> bool:
+    return Workbook is not None
+
+
+def _rows_select(criteria):
+    return (
+        select(
+            Task.id, Task.bauteil_id, Task.stiege_id, Task.ebene_id, Task.top_id,
+            ProcessStep.activity, Gewerk.name, ProcessModel.name,
+            Task.start_soll, Task.end_soll, Task.start_ist, Task.end_ist,
+            Task.status, User.name, Task.beschreibung,
+        )
+        .select_from(Task)
+        .outerjoin(ProcessStep, ProcessStep.id == Task.process_step_id)
+        .outerjoin(Gewerk, Gewerk.id == ProcessStep.gewerk_id)
+        .outerjoin(ProcessModel, ProcessModel.id == ProcessStep.model_id)
+        .outerjoin(User, User.id == Task.sub_id)
+        .where(*criteria)
+        .order_by(Task.sort_key, Task.id)
+    )
+
+
+def _answer_labels(db: Session, criteria) -> list[str]:
+    """Nazivi pitanja koja imaju bar jedan odgovor – redoslijed prvog odgovora."""
+    first = func.min(TaskCheckAnswer.id)
+    rows = db.execute(
+        select(TaskCheckAnswer.label)
+        .where(TaskCheckAnswer.task_id.in_(select(Task.id).where(*criteria)))
+        .group_by(TaskCheckAnswer.label)
+        .order_by(first)
+    )
+    return [r[0] for r in rows]
+
+
+def _answer_value(a) -> Optional[str]:
+    if a.field_type == "boolean":
+        return None if a.bool_value is None else ("Ja" if a.bool_value else "Nein")
+    if a.field_type == "image":
+        return a.image_path
+    return a.text_value
+
+
+def _answers_for(db: Session, task_ids: list[int]) -> dict[int, dict[str, Optional[str]]]:
+    by_task: dict[int, dict[str, Optional[str]]] = {}
+    rows = db.execute(
+        select(
+            TaskCheckAnswer.task_id, TaskCheckAnswer.label, TaskCheckAnswer.field_type,
+            TaskCheckAnswer.bool_value, TaskCheckAnswer.text_value, TaskCheckAnswer.image_path,
+        )
+        .where(TaskCheckAnswer.task_id.in_(task_ids))
+        .order_by(TaskCheckAnswer.id)  # kasniji odgovor prepisuje raniji
+    )
+    for a in rows:
+        by_task.setdefault(a.task_id, {})[a.label] = _answer_value(a)
+    return by_task
+
+
+def export_rows(db: Session, project_id: int, filters: Optional[BulkFilters]) -> Iterator[list]:
+    """Zaglavlje pa redovi (liste vrijednosti), dio po dio."""
+    criteria = task_filter_criteria(filters, project_id=project_id)
+    names = project_structure_names(db, project_id)
+    labels = _answer_labels(db, criteria)
+    yield BASE_HEADER + labels
+
+    result = db.execute(
+        _rows_select(criteria).execution_options(stream_results=True, yield_per=CHUNK_SIZE)
+    )
+    for chunk in result.partitions():
+        answers = _answers_for(db, [r[0] for r in chunk]) if labels else {}
+        for (tid, b_id, s_id, e_id, t_id, activity, gewerk, model,
+             start_soll, end_soll, start_ist, end_ist, status, sub, beschreibung) in chunk:
+            row = [
+                tid,
+                names["bauteil"].get(b_id),
+                names["stiege"].get(s_id),
+                names["ebene"].get(e_id),
+                names["top"].get(t_id),
+                activity, gewerk, model,
+                start_soll, end_soll, start_ist, end_ist,
+                status, sub, beschreibung,
+            ]
+            task_answers = answers.get(tid, {})
+            row.extend(task_answers.get(label) for label in labels)
+            yield row
+
+
+def _csv_cell(v):
+    if v is None:
+        return ""
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    return v
+
+
+def stream_csv(session_factory, project_id: int, filters: Optional[BulkFilters]) -> Iterator[bytes]:
+    """
+    CSV (UTF-8 s BOM, `;`) u dijelovima. Vlastita sesija: generator živi
+    duže od request dependency-ja (get_db se zatvara prije slanja tijela).
+    """
+    db = session_factory()
+    try:
+        buf = io.StringIO()
+        writer = csv.writer(buf, delimiter=CSV_DELIMITER)
+        buf.write("\ufeff")  # BOM → Excel prepoznaje UTF-8
+        for n, row in enumerate(export_rows(db, project_id, filters), start=1):
+            writer.writerow([_csv_cell(v) for v in row])
+            # zaglavlje odmah (download kreće), dalje po CHUNK_SIZE redova
+            if n == 1 or n % CHUNK_SIZE == 0:
+                yield buf.getvalue().encode("utf-8")
+                buf.seek(0)
+                buf.truncate()
+        if buf.tell():
+            yield buf.getvalue().encode("utf-8")
+    finally:
+        db.close()
+
+
+def stream_xlsx(session_factory, project_id: int, filters: Optional[BulkFilters]) -> Iterator[bytes]:
+    """XLSX preko openpyxl write_only workbooka (temp fajl), šalje se u blokovima."""
+    db = session_factory()
+    try:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Aufgaben")
+        for row in export_rows(db, project_id, filters):
+            ws.append(row)
+    finally:
+        db.close()
+
+    with tempfile.TemporaryFile() as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            block = tmp.read(64 * 1024)
+            if not block:
+                break
+            yield block
@@ -0,0 +1,141 @@
+# app/core/task_filters.py
+"""
+Zajednički "compiler" za filtere taskova (gewerk/status/datumi/delayed/taskName/
+top/ebene/stiege/bauteil/activity/processModel/topIds).
+
+Koriste ga /tasks-timeline, /structure-timeline, PATCH /tasks/bulk i skip-window.
+
+Ideja: filteri NE dodaju joinove u glavni upit. Filteri strukture idu po
+denormaliziranim kolonama taska (`Task.ebene_id IN (SELECT ebenen.id ...)`,
+vidi app/core/structure_denorm.py), a sve što zavisi od koraka procesa
+postaje jedan `Task.process_step_id IN (SELECT process_steps.id ...)`.
+Svaka tabela se u podupitu joina najviše jednom, a glavni upit ostaje
+slobodan za joinove koje treba sort / eager load.
+
+Rezultat je lista predikata nad `Task`, pa radi sa Query.filter(),
+select().where() i update().where().
+"""
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.task import Task
+from app.models.structure import Top, Ebene, Stiege, Bauteil
+from app.models.process import ProcessStep, ProcessModel
+from app.models.gewerk import Gewerk
+from app.schemas.bulk import BulkFilters
+
+STATUS_CHOICES = ("Erledigt", "In Bearbeitung", "Offen")
+
+
+def status_condition(statuses: Iterable[str]) -> Optional[ColumnElement]:
+    """"Erledigt" / "In Bearbeitung" / "Offen" → OR uslova nad IST datumima."""
+    conds = []
+    statuses = set(statuses or ())
+    if "Erledigt" in statuses:
+        conds.append(Task.end_ist.isnot(None))
+    if "In Bearbeitung" in statuses:
+        conds.append(and_(Task.start_ist.isnot(None), Task.end_ist.is_(None)))
+    if "Offen" in statuses:
+        conds.append(and_(Task.start_ist.is_(None), Task.end_ist.is_(None)))
+    return or_(*conds) if conds else None
+
+
+def delayed_condition(today: Optional[date] = None) -> ColumnElement:
+    """
+    Kašnjenje:
+      1) nije gotov (end_ist je null) i end_soll < danas
+      2) gotov je, ali end_ist > end_soll
+    """
+    today = today or date.today()
+    return or_(
+        and_(Task.end_ist.is_(None), Task.end_soll < today),
+        Task.end_ist > Task.end_soll,
+    )
+
+
+def _structure_criteria(f: BulkFilters) -> list[ColumnElement]:
+    """
+    Po jedan uslov po nivou, nad denormaliziranom kolonom taska
+    (top_id / ebene_id / stiege_id / bauteil_id) – podupit je samo nad
+    malom tabelom tog nivoa, bez joina.
+    """
+    crit: list[ColumnElement] = []
+    if f.tops:
+        crit.append(Task.top_id.in_(select(Top.id).where(Top.name.in_(f.tops))))
+    if f.ebenen:
+        crit.append(Task.ebene_id.in_(select(Ebene.id).where(Ebene.name.in_(f.ebenen))))
+    if f.stiegen:
+        crit.append(Task.stiege_id.in_(select(Stiege.id).where(Stiege.name.in_(f.stiegen))))
+    if f.bauteile:
+        crit.append(Task.bauteil_id.in_(select(Bauteil.id).where(Bauteil.name.in_(f.bauteile))))
+    return crit
+
+
+def _step_subquery(f: BulkFilters):
+    """Jedan podupit nad process_steps (+ gewerke/process_models samo ako trebaju)."""
+    if not (f.gewerk or f.activities or f.taskName or f.processModels):
+        return None
+
+    sq = select(ProcessStep.id)
+    conds = []
+    if f.activities:
+        conds.append(ProcessStep.activity.in_(f.activities))
+    if f.taskName:
+        conds.append(ProcessStep.activity.ilike(f"%{f.taskName}%"))
+    if f.gewerk:
+        sq = sq.join(Gewerk, Gewerk.id == ProcessStep.gewerk_id)
+        conds.append(Gewerk.name.in_(f.gewerk))
+    if f.processModels:
+        sq = sq.join(ProcessModel, ProcessModel.id == ProcessStep.model_id)
+        conds.append(ProcessModel.name.in_(f.processModels))
+    return sq.where(*conds)
+
+
+def task_filter_criteria(
+    f: Optional[BulkFilters],
+    *,
+    project_id: Optional[int] = None,
+    ids: Optional[Iterable[int]] = None,
+    today: Optional[date] = None,
+) -> list[ColumnElement]:
+    """
+    Složi predikate nad `Task` za dati filter.
+
+    Redoslijed: prvo indeksirani (project_id, id, struktura, process_step_id,
+    datumi), na kraju oni koji se računaju po redu (status, delayed).
+    """
+    crit: list[ColumnElement] = []
+
+    if project_id is not None:
+        crit.append(Task.project_id == project_id)
+    if ids:
+        crit.append(Task.id.in_(list(ids)))
+
+    if f is None:
+        return crit
+
+    if f.topIds:
+        crit.append(Task.top_id.in_(f.topIds))
+
+    crit.extend(_structure_criteria(f))
+
+    step_sq = _step_subquery(f)
+    if step_sq is not None:
+        crit.append(Task.process_step_id.in_(step_sq))
+
+    if f.startDate:
+        crit.append(Task.end_soll >= f.startDate)
+    if f.endDate:
+        crit.append(Task.start_soll <= f.endDate)
+
+    if f.status:
+        cond = status_condition(f.status)
+        if cond is not None:
+            crit.append(cond)
+    if f.delayed:
+        crit.append(delayed_condition(today))
+
+    return crit
@@ -0,0 +1,104 @@
+# app/core/task_propagation.py
+"""
+Pomjeranje nasljednika kad task kasni (PUT /tasks/{id}).
+
+Lanac koraka jednog TOP-a je isti kao kod generate/sync-tasks: koraci
+process modela po `order`; sljedeći korak počinje radni dan poslije kraja
+zadnjeg ne-paralelnog koraka, `parallel` korak ne pomjera kursor.
+
+Kad se tasku pomjeri kraj (end_ist, ili end_soll dok nije gotov), idu se
+samo koraci POSLIJE njega u istom TOP-u i guraju naprijed ako bi počeli
+prije dozvoljenog dana (trajanje u radnim danima projekta ostaje –
+praznici i zatvaranja, app/core/work_calendar.py). Lanac staje na
+prvom ne-paralelnom tasku koji se ne mora pomjeriti, koji je već krenuo
+(start_ist) ili nema plan – od njega dalje ništa se ne mijenja. Taskovi se
+nikad ne pomjeraju unazad.
+
+Promjene idu preko ORM objekata, pa revizije, rollup i brojači idu istim
+putem kao i ručna izmjena (listeneri u app/core).
+"""
+from datetime import timedelta
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.work_calendar import project_calendar
+from app.models.process import ProcessStep
+from app.models.task import Task
+
+NO_ORDER = 10**9  # korak bez order-a ide na kraj (kao u generate-tasks)
+
+
+def _step_key():
+    return func.coalesce(ProcessStep.order, NO_ORDER)
+
+
+def _successors(db: Session, task: Task, step: ProcessStep):
+    """(task, parallel, duration_days, activity) koraka poslije `step` u TOP-u, po redu."""
+    key = _step_key()
+    step_key = step.order if step.order is not None else NO_ORDER
+    return db.execute(
+        select(Task, ProcessStep.parallel, ProcessStep.duration_days, ProcessStep.activity)
+        .join(ProcessStep, ProcessStep.id == Task.process_step_id)
+        .where(
+            Task.top_id == task.top_id,
+            Task.project_id == task.project_id,
+            ProcessStep.model_id == step.model_id,
+            or_(key > step_key, and_(key == step_key, ProcessStep.id > step.id)),
+        )
+        .order_by(key, ProcessStep.id)
+    ).all()
+
+
+def propagate_successors(db: Session, task: Task) -> list[dict]:
+    """
+    Pomjeri nasljednike `task`-a prema njegovom (novom) kraju. Vraća promjene
+    za protokol ({task_id, task_name, start_soll, end_soll} sa old/new).
+    Ne commita.
+    """
+    step = task.process_step
+    if step is None or task.top_id is None or step.parallel:
+        return []
+    end = task.end_ist or task.end_soll
+    if end is None:
+        return []
+
+    cal = project_calendar(db, task.project_id)
+    cursor = end + timedelta(days=1)
+    changes: list[dict] = []
+    for succ, parallel, duration, activity in _successors(db, task, step):
+        if succ.start_ist is not None or succ.start_soll is None:
+            # već krenuo / bez plana → ne diramo; lanac iza njega ide od njegovog kraja
+            if parallel:
+                continue
+            break
+
+        required = cal.next_workday(cursor)
+        if succ.start_soll >= required:
+            if parallel:
+                continue
+            break
+
+        if succ.end_soll is not None and succ.end_soll >= succ.start_soll:
+            span = cal.count_workdays(succ.start_soll, succ.end_soll)
+        else:
+            span = duration or 1
+        new_start = required
+        new_end = cal.add_workdays(new_start, max(1, span))
+
+        changes.append({
+            "task_id": succ.id,
+            "task_name": activity,
+            "start_soll": {"old": str(succ.start_soll), "new": str(new_start)},
+            "end_soll": {
+                "old": str(succ.end_soll) if succ.end_soll else None,
+                "new": str(new_end),
+            },
+        })
+        succ.start_soll = new_start
+        succ.end_soll = new_end
+
+        if not parallel:
+            cursor = new_end + timedelta(days=1)
+
+    return changes
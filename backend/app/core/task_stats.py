@@ -0,0 +1,339 @@
+# app/core/task_stats.py
+"""
+Statistika taskova projekta (/stats, /task-stats, /progress-curve) kao jedan
+GROUP BY u bazi.
+
+Klasa taska (done / in_progress / offen) je CASE nad IST/SOLL datumima, pa
+baza vraća samo po jedan red po gewerku – bez učitavanja taskova i bez
+lazy-loada process_step.gewerk po tasku.
+"""
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import Date, String, case, delete, func, insert, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.natural_sort import natural_key
+from app.models.task import Task
+from app.models.process import ProcessStep
+from app.models.gewerk import Gewerk
+from app.models.structure import Bauteil
+from app.models.stats import ProjectStatsSnapshot
+
+DEFAULT_GEWERK = "Allgemein"
+STATS_CLASSES = ("done", "in_progress", "offen")
+
+
+def stats_class_expr(until: Optional[date] = None):
+    """
+    CASE → "done" | "in_progress" | "offen" | NULL (task se ne broji).
+
+    Bez `until`: end_ist → done, start_ist → in_progress, inače offen.
+    Sa `until` (stanje na taj dan):
+      end_ist <= until                                 → done
+      start_ist <= until i (nema end_ist ili > until)  → in_progress
+      nema start_soll ili start_soll <= until          → offen
+      inače (čisto budući task)                        → ne broji se
+    """
+    if until is None:
+        return case(
+            (Task.end_ist.isnot(None), literal("done")),
+            (Task.start_ist.isnot(None), literal("in_progress")),
+            else_=literal("offen"),
+        )
+    return case(
+        (Task.end_ist <= until, literal("done")),
+        (
+            (Task.start_ist <= until) & or_(Task.end_ist.is_(None), Task.end_ist > until),
+            literal("in_progress"),
+        ),
+        (or_(Task.start_soll.is_(None), Task.start_soll <= until), literal("offen")),
+        else_=None,
+    )
+
+
+def gewerk_label_expr():
+    """Naziv gewerka za statistiku – prazno/bez gewerka → "Allgemein"."""
+    return func.coalesce(func.nullif(func.trim(Gewerk.name), ""), DEFAULT_GEWERK)
+
+
+def class_counts(cls):
+    """COUNT(CASE ...) po klasi, labelirano imenom klase."""
+    return [func.count(case((cls == c, 1))).label(c) for c in STATS_CLASSES]
+
+
+def _gewerk_counts_select(until: Optional[date], *criteria):
+    """(project_id, gewerk, done, in_progress, offen) po projektu i gewerku."""
+    gname = gewerk_label_expr()
+    return (
+        select(Task.project_id, gname.label("gewerk"), *class_counts(stats_class_expr(until)))
+        .select_from(Task)
+        .outerjoin(ProcessStep, ProcessStep.id == Task.process_step_id)
+        .outerjoin(Gewerk, Gewerk.id == ProcessStep.gewerk_id)
+        .where(*criteria)
+        .group_by(Task.project_id, gname)
+    )
+
+
+def project_stats(db: Session, project_id: int, until: Optional[date] = None) -> dict:
+    """Odgovor za /projects/{id}/stats (živo računanje)."""
+    rows = db.execute(_gewerk_counts_select(until, Task.project_id == project_id)).all()
+    return _stats_response(rows)
+
+
+def _stats_response(rows) -> dict:
+    # gewerk bez taskova u "until" rezu ostaje u listi sa 0/0/0
+    by_gewerk = [
+        {"gewerk": r.gewerk, "done": r.done, "in_progress": r.in_progress, "offen": r.offen}
+        for r in rows
+    ]
+    done = sum(r.done for r in rows)
+    in_prog = sum(r.in_progress for r in rows)
+    offen = sum(r.offen for r in rows)
+    total = done + in_prog + offen
+
+    return {
+        "total": total,
+        "done": done,
+        "in_progress": in_prog,
+        "offen": offen,
+        "percent_done": round((done / total) * 100, 2) if total else 0.0,
+        "by_gewerk": sorted(by_gewerk, key=lambda r: r["gewerk"].lower()),
+    }
+
+
+def project_status_stats(db: Session, project_id: int) -> dict:
+    """Odgovor za /projects/{id}/task-stats (brojanje po koloni Task.status)."""
+    status_counts = [func.count(case((Task.status == c, 1))).label(c) for c in STATS_CLASSES]
+    totals = db.execute(
+        select(func.count(Task.id).label("total"), *status_counts)
+        .where(Task.project_id == project_id)
+    ).one()
+
+    # samo taskovi s gewerkom; redoslijed = prvi task gewerka (kao ranije petlja)
+    rows = db.execute(
+        select(Gewerk.name, *status_counts)
+        .select_from(Task)
+        .join(ProcessStep, ProcessStep.id == Task.process_step_id)
+        .join(Gewerk, Gewerk.id == ProcessStep.gewerk_id)
+        .where(Task.project_id == project_id)
+        .group_by(Gewerk.name)
+        .order_by(func.min(Task.id))
+    ).all()
+
+    total = totals.total or 0
+    return {
+        "total": total,
+        "done": totals.done,
+        "in_progress": totals.in_progress,
+        "offen": totals.offen,
+        "percent_done": round((totals.done / total) * 100, 1) if total else 0,
+        "by_gewerk": [
+            {"gewerk": name, "done": d, "in_progress": ip, "offen": o}
+            for name, d, ip, o in rows
+        ],
+    }
+
+
+# ---------- dnevni snimci (/stats?until=<prošli dan>, historija) ----------
+
+def snapshot_stats(db: Session, day: date, project_ids: Optional[list[int]] = None) -> int:
+    """
+    Snimi stanje "do dana `day`" za sve (ili date) projekte: jedan
+    INSERT … SELECT GROUP BY (projekt, gewerk). Postojeći snimak tog dana se
+    zamjenjuje, pa se job smije ponavljati.
+    """
+    stmt = delete(ProjectStatsSnapshot).where(ProjectStatsSnapshot.day == day)
+    criteria = []
+    if project_ids is not None:
+        stmt = stmt.where(ProjectStatsSnapshot.project_id.in_(project_ids))
+        criteria.append(Task.project_id.in_(project_ids))
+    db.execute(stmt.execution_options(synchronize_session=False))
+
+    counts = _gewerk_counts_select(day, *criteria).subquery()
+    res = db.execute(
+        insert(ProjectStatsSnapshot).from_select(
+            ["project_id", "day", "gewerk", "done", "in_progress", "offen"],
+            select(
+                counts.c.project_id, literal(day, type_=Date), counts.c.gewerk,
+                counts.c.done, counts.c.in_progress, counts.c.offen,
+            ),
+        )
+    )
+    return res.rowcount or 0
+
+
+def snapshot_project_stats(db: Session, project_id: int, day: date) -> Optional[dict]:
+    """Odgovor /stats iz snimka (indeksirani lookup) ili None ako snimka nema."""
+    rows = db.execute(
+        select(
+            ProjectStatsSnapshot.gewerk,
+            ProjectStatsSnapshot.done,
+            ProjectStatsSnapshot.in_progress,
+            ProjectStatsSnapshot.offen,
+        ).where(ProjectStatsSnapshot.project_id == project_id, ProjectStatsSnapshot.day == day)
+    ).all()
+    # bez snimka (ili projekt bez taskova) → pozivalac računa živo
+    return _stats_response(rows) if rows else None
+
+
+def stats_history(db: Session, project_id: int, start: Optional[date], end: Optional[date]) -> dict:
+    """Dnevni zbirovi iz snimaka (trend, poređenje sedmica) – jedan GROUP BY po danu."""
+    S = ProjectStatsSnapshot
+    q = (
+        select(S.day, func.sum(S.done), func.sum(S.in_progress), func.sum(S.offen))
+        .where(S.project_id == project_id)
+        .group_by(S.day)
+        .order_by(S.day)
+    )
+    if start:
+        q = q.where(S.day >= start)
+    if end:
+        q = q.where(S.day <= end)
+
+    days, done, in_prog, offen, percent = [], [], [], [], []
+    for d, dn, ip, of in db.execute(q):
+        total = dn + ip + of
+        days.append(d.isoformat())
+        done.append(dn)
+        in_prog.append(ip)
+        offen.append(of)
+        percent.append(round((dn / total) * 100, 2) if total else 0.0)
+    return {
+        "days": days,
+        "done": done,
+        "in_progress": in_prog,
+        "offen": offen,
+        "percent_done": percent,
+    }
+
+
+# ---------- /progress-curve: S-kriva (Soll vs. Ist) po periodu ----------
+
+CURVE_BUCKETS = ("day", "week", "month")
+CURVE_SERIES = ("gewerk", "bauteil")
+
+
+def _bucket_expr(col, bucket: str):
+    """
+    Ključ perioda u SQLite-u:
+      day   → datum
+      week  → četvrtak ISO sedmice (jednoznačno određuje ISO godinu + KW)
+      month → "YYYY-MM"
+    """
+    if bucket == "day":
+        return func.date(col, type_=String)
+    if bucket == "month":
+        return func.strftime("%Y-%m", col, type_=String)
+    return func.date(col, "-3 days", "weekday 4", type_=String)
+
+
+def _bucket_label(key: str, bucket: str) -> str:
+    if bucket == "week":
+        year, week, _ = date.fromisoformat(key).isocalendar()
+        return f"{year}-KW{week}"
+    return key
+
+
+def _cumulative(values: list[int]) -> list[int]:
+    out, acc = [], 0
+    for v in values:
+        acc += v
+        out.append(acc)
+    return out
+
+
+def progress_curve(
+    db: Session,
+    project_id: int,
+    bucket: str = "week",
+    series: Optional[str] = None,
+) -> dict:
+    """
+    Soll = start_soll (ili end_soll), Ist = end_ist (ili start_ist) – broj
+    taskova po periodu + kumulativno. Jedan GROUP BY nad UNION ALL
+    (soll-datum, ist-datum); `series` dodaje iste nizove po gewerku/Bauteilu.
+    """
+    if bucket not in CURVE_BUCKETS:
+        bucket = "week"
+    if series not in CURVE_SERIES:
+        series = None
+
+    series_col = {"gewerk": ProcessStep.gewerk_id, "bauteil": Task.bauteil_id}.get(series)
+
+    def _part(kind: str, when):
+        q = (
+            select(
+                literal(kind).label("kind"),
+                _bucket_expr(when, bucket).label("bucket"),
+                (series_col if series_col is not None else literal(None)).label("series"),
+            )
+            .select_from(Task)
+            .where(Task.project_id == project_id, when.isnot(None))
+        )
+        if series == "gewerk":
+            q = q.outerjoin(ProcessStep, ProcessStep.id == Task.process_step_id)
+        return q
+
+    dates = union_all(
+        _part("soll", func.coalesce(Task.start_soll, Task.end_soll)),
+        _part("ist", func.coalesce(Task.end_ist, Task.start_ist)),
+    ).subquery()
+    rows = db.execute(
+        select(
+            dates.c.bucket,
+            dates.c.series,
+            func.count(case((dates.c.kind == "soll", 1))).label("soll"),
+            func.count(case((dates.c.kind == "ist", 1))).label("ist"),
+        )
+        .group_by(dates.c.bucket, dates.c.series)
+        .order_by(dates.c.bucket)
+    ).all()
+
+    # ključevi su ISO datumi / "YYYY-MM" → leksikografski == hronološki
+    keys = sorted({r.bucket for r in rows})
+    pos = {k: i for i, k in enumerate(keys)}
+    soll, ist = [0] * len(keys), [0] * len(keys)
+    per_series: dict = {}
+    for r in rows:
+        i = pos[r.bucket]
+        soll[i] += r.soll
+        ist[i] += r.ist
+        if series:
+            s = per_series.setdefault(r.series, ([0] * len(keys), [0] * len(keys)))
+            s[0][i] += r.soll
+            s[1][i] += r.ist
+
+    result = {
+        "bucket": bucket,
+        "labels": [_bucket_label(k, bucket) for k in keys],
+        "soll": soll,
+        "ist": ist,
+        "soll_cum": _cumulative(soll),
+        "ist_cum": _cumulative(ist),
+    }
+    if series:
+        result["series_by"] = series
+        result["series"] = _curve_series(db, series, per_series)
+    return result
+
+
+def _curve_series(db: Session, series: str, per_series: dict) -> list[dict]:
+    ids = [k for k in per_series if k is not None]
+    model = Gewerk if series == "gewerk" else Bauteil
+    names = dict(db.execute(select(model.id, model.name).where(model.id.in_(ids))).all()) if ids else {}
+
+    out = []
+    for key, (s_soll, s_ist) in per_series.items():
+        name = names.get(key) if key is not None else None
+        if series == "gewerk":
+            name = (name or "").strip() or DEFAULT_GEWERK
+        out.append({
+            "key": key,
+            "name": name,
+            "soll": s_soll,
+            "ist": s_ist,
+            "soll_cum": _cumulative(s_soll),
+            "ist_cum": _cumulative(s_ist),
+        })
+    return sorted(out, key=lambda s: (natural_key(s["name"]) or "", s["key"] or 0))
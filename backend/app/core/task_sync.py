@@ -0,0 +1,107 @@
+# app/core/task_sync.py
+"""
+Revizije + tombstone-ovi za delta sync taskova (/projects/{id}/tasks/changes).
+
+- svaki projekt ima brojač (project_revisions) koji samo raste
+- svaki flush koji doda/promijeni Task dobije novu reviziju projekta
+  (before_flush listener ispod – pokriva sve ORM putanje)
+- ORM brisanje taska ostavlja TaskTombstone s istom revizijom
+- bulk UPDATE/DELETE i kaskadna brisanja (Top/Ebene/Stiege/Bauteil) idu
+  mimo ORM-a, pa ih rute eksplicitno pokrivaju sa revision_values() i
+  record_tombstones()
+"""
+from collections import defaultdict
+
+from sqlalchemy import event, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.task import Task, ProjectRevision, TaskTombstone
+
+
+def current_revision(db: Session, project_id: int) -> int:
+    rev = db.execute(
+        select(ProjectRevision.revision).where(ProjectRevision.project_id == project_id)
+    ).scalar()
+    return int(rev or 0)
+
+
+def next_revision(db: Session, project_id: int) -> int:
+    """Podigni brojač projekta za 1 i vrati novu reviziju (u tekućoj transakciji)."""
+    conn = db.connection()
+    rev = conn.execute(
+        update(ProjectRevision)
+        .where(ProjectRevision.project_id == project_id)
+        .values(revision=ProjectRevision.revision + 1)
+        .returning(ProjectRevision.revision)
+    ).scalar()
+    if rev is not None:
+        return int(rev)
+
+    # prvi put za ovaj projekt – nastavi iznad svega što već postoji
+    max_task = conn.execute(
+        select(func.max(Task.revision)).where(Task.project_id == project_id)
+    ).scalar()
+    max_tomb = conn.execute(
+        select(func.max(TaskTombstone.revision)).where(TaskTombstone.project_id == project_id)
+    ).scalar()
+    rev = max(max_task or 0, max_tomb or 0) + 1
+    conn.execute(insert(ProjectRevision).values(project_id=project_id, revision=rev))
+    return rev
+
+
+def revision_values(db: Session, project_id: int) -> dict:
+    """Dodatne kolone za bulk `query.update({...})` nad taskovima jednog projekta."""
+    return {"revision": next_revision(db, project_id), "updated_at": func.now()}
+
+
+def record_tombstones(db: Session, *criteria) -> int:
+    """
+    Zapiši tombstone za sve taskove koji odgovaraju `criteria` – pozovi PRIJE
+    bulk delete-a ili brisanja strukture (kaskada u bazi ne prolazi kroz ORM).
+    """
+    project_ids = db.execute(
+        select(Task.project_id).where(*criteria).distinct()
+    ).scalars().all()
+
+    written = 0
+    for pid in project_ids:
+        rev = next_revision(db, pid)
+        res = db.execute(
+            insert(TaskTombstone).from_select(
+                ["project_id", "task_id", "revision"],
+                select(Task.project_id, Task.id, literal(rev)).where(
+                    Task.project_id == pid, *criteria
+                ),
+            )
+        )
+        written += res.rowcount or 0
+    return written
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _stamp_task_revisions(session: Session, flush_context, instances):
+    changed: dict[int, list[Task]] = defaultdict(list)
+    deleted: dict[int, list[int]] = defaultdict(list)
+
+    for obj in session.new:
+        if isinstance(obj, Task) and obj.project_id is not None:
+            changed[obj.project_id].append(obj)
+    for obj in session.dirty:
+        if (
+            isinstance(obj, Task)
+            and obj.project_id is not None
+            and session.is_modified(obj, include_collections=False)
+        ):
+            changed[obj.project_id].append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Task) and obj.id is not None:
+            deleted[obj.project_id].append(obj.id)
+
+    for pid in set(changed) | set(deleted):
+        rev = next_revision(session, pid)
+        for t in changed.get(pid, ()):
+            t.revision = rev
+            t.updated_at = func.now()
+        for task_id in deleted.get(pid, ()):
+            session.add(TaskTombstone(project_id=pid, task_id=task_id, revision=rev))
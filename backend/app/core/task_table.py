@@ -0,0 +1,118 @@
+# app/core/task_table.py
+"""
+Stranica za /projects/{id}/tasks-tabelle: sort po bilo kojoj koloni tabele,
+keyset kursor i zajednički filteri (app/core/task_filters.py).
+
+Kursor = zadnji red stranice (sort vrijednost + id), pa sljedeća stranica
+košta isto bez obzira koliko je daleko (nema OFFSET-a). NULL vrijednosti su
+uvijek na kraju, u oba smjera; id je tie-breaker u smjeru sorta.
+"""
+import base64
+import json
+from datetime import date
+from typing import Any, Optional
+
+from sqlalchemy import Date, and_, or_
+from sqlalchemy.orm import Query
+
+from app.models.task import Task
+from app.models.structure import Top, Ebene, Stiege, Bauteil
+from app.models.process import ProcessStep, ProcessModel
+from app.models.gewerk import Gewerk
+from app.models.user import User
+
+DEFAULT_SORT = "struktur"
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# ključ kolone (kao u redu tabele) → (izraz, joinovi koje izraz treba)
+SORT_COLUMNS: dict[str, tuple[Any, tuple]] = {
+    "struktur": (Task.sort_key, ()),  # prirodni redoslijed Bauteil/Stiege/Ebene/Top
+    "bauteil": (Bauteil.sort_key, ((Bauteil, Bauteil.id == Task.bauteil_id),)),
+    "stiege": (Stiege.sort_key, ((Stiege, Stiege.id == Task.stiege_id),)),
+    "ebene": (Ebene.sort_key, ((Ebene, Ebene.id == Task.ebene_id),)),
+    "top": (Top.sort_key, ((Top, Top.id == Task.top_id),)),
+    "task": (ProcessStep.activity, ((ProcessStep, ProcessStep.id == Task.process_step_id),)),
+    "gewerk_name": (
+        Gewerk.name,
+        ((ProcessStep, ProcessStep.id == Task.process_step_id), (Gewerk, Gewerk.id == ProcessStep.gewerk_id)),
+    ),
+    "process_model": (
+        ProcessModel.name,
+        ((ProcessStep, ProcessStep.id == Task.process_step_id), (ProcessModel, ProcessModel.id == ProcessStep.model_id)),
+    ),
+    "sub_name": (User.name, ((User, User.id == Task.sub_id),)),
+    "beschreibung": (Task.beschreibung, ()),
+    "start_soll": (Task.start_soll, ()),
+    "end_soll": (Task.end_soll, ()),
+    "start_ist": (Task.start_ist, ()),
+    "end_ist": (Task.end_ist, ()),
+    "status": (Task.status, ()),
+    "id": (Task.id, ()),
+}
+
+
+def encode_cursor(value: Any, task_id: int) -> str:
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps([value is None, value, task_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[bool, Any, int]:
+    """(is_null, vrijednost, id) – ValueError ako kursor nije ispravan."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        is_null, value, task_id = json.loads(raw)
+        expr = SORT_COLUMNS[sort][0]
+        if value is not None and isinstance(expr.type, Date):
+            value = date.fromisoformat(value)
+        return bool(is_null), value, int(task_id)
+    except Exception as exc:  # noqa: BLE001 – bilo šta pogrešno = neispravan kursor
+        raise ValueError("invalid cursor") from exc
+
+
+def _after(expr, desc: bool, cursor: tuple[bool, Any, int]):
+    """Uslov "red dolazi poslije kursora" za ORDER BY (expr IS NULL), expr, id."""
+    is_null, value, task_id = cursor
+    id_after = Task.id < task_id if desc else Task.id > task_id
+    if is_null:
+        return and_(expr.is_(None), id_after)
+    value_after = expr < value if desc else expr > value
+    return or_(expr.is_(None), value_after, and_(expr == value, id_after))
+
+
+def table_page(
+    q: Query,
+    sort: str,
+    desc: bool,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> tuple[list[Task], Optional[str]]:
+    """
+    Jedna stranica taskova iz (već filtriranog) upita `q` + kursor sljedeće
+    stranice (None = zadnja). `sort` mora biti ključ iz SORT_COLUMNS.
+    """
+    expr, joins = SORT_COLUMNS[sort]
+    joined = set()
+    for target, onclause in joins:
+        if target not in joined:
+            q = q.outerjoin(target, onclause)
+            joined.add(target)
+
+    if cursor:
+        q = q.filter(_after(expr, desc, decode_cursor(cursor, sort)))
+
+    q = q.add_columns(expr).order_by(
+        expr.is_(None),
+        expr.desc() if desc else expr.asc(),
+        Task.id.desc() if desc else Task.id.asc(),
+    )
+    rows = q.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_task, last_value = rows[-1]
+        next_cursor = encode_cursor(last_value, last_task.id)
+    return [t for t, _ in rows], next_cursor
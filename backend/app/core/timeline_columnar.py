@@ -0,0 +1,100 @@
+# app/core/timeline_columnar.py
+"""
+Kolonarni (columnar) format za /tasks-timeline.
+
+Umjesto liste objekata vraćamo jedan niz po polju:
+  - string kolone (gewerk_name, farbe, bauteil, ...) su dictionary-encoded:
+    u "dicts[<polje>]" je lookup tabela, a u koloni su samo indeksi (ili null)
+  - datumi su pomak u danima od "base_date" (ili null)
+  - ostala polja (id, top_id, beschreibung, ...) idu kako jesu
+
+Dekoder na frontendu: src/utils/timelineColumnar.ts
+"""
+from datetime import date
+from typing import Any, Optional
+
+COLUMNAR_VERSION = 1
+
+# polja koja se ponavljaju tisuće puta → lookup tabela + indeksi
+DICT_FIELDS = (
+    "task",
+    "wohnung",
+    "farbe",
+    "gewerk_name",
+    "top",
+    "ebene",
+    "stiege",
+    "bauteil",
+    "process_model",
+    "sub_name",
+)
+
+# datumi → pomak u danima od base_date
+DATE_FIELDS = ("start_soll", "end_soll", "start_ist", "end_ist")
+
+# sve ostalo ide "raw"
+PLAIN_FIELDS = (
+    "id",
+    "process_step_id",
+    "beschreibung",
+    "sub_id",
+    "top_id",
+    "project_id",
+)
+
+
+class TimelineColumnarEncoder:
+    """Skuplja redove (dict s istim ključevima kao TimelineTask) i složi kolonarni payload."""
+
+    def __init__(self) -> None:
+        self._count = 0
+        self._lookup: dict[str, dict[str, int]] = {f: {} for f in DICT_FIELDS}
+        self._dicts: dict[str, list[str]] = {f: [] for f in DICT_FIELDS}
+        self._columns: dict[str, list[Any]] = {
+            f: [] for f in (*PLAIN_FIELDS, *DICT_FIELDS, *DATE_FIELDS)
+        }
+        # datume držimo kao ordinal dok ne znamo base_date (min svih datuma)
+        self._min_ordinal: Optional[int] = None
+
+    def _encode_str(self, field: str, value: Optional[str]) -> Optional[int]:
+        if value is None:
+            return None
+        lookup = self._lookup[field]
+        idx = lookup.get(value)
+        if idx is None:
+            idx = len(self._dicts[field])
+            lookup[value] = idx
+            self._dicts[field].append(value)
+        return idx
+
+    def append(self, row: dict[str, Any]) -> None:
+        cols = self._columns
+        for f in PLAIN_FIELDS:
+            cols[f].append(row.get(f))
+        for f in DICT_FIELDS:
+            cols[f].append(self._encode_str(f, row.get(f)))
+        for f in DATE_FIELDS:
+            d: Optional[date] = row.get(f)
+            if d is None:
+                cols[f].append(None)
+                continue
+            o = d.toordinal()
+            if self._min_ordinal is None or o < self._min_ordinal:
+                self._min_ordinal = o
+            cols[f].append(o)
+        self._count += 1
+
+    def payload(self) -> dict[str, Any]:
+        base = self._min_ordinal or 0
+        columns = dict(self._columns)
+        for f in DATE_FIELDS:
+            columns[f] = [None if o is None else o - base for o in self._columns[f]]
+
+        return {
+            "format": "columnar",
+            "version": COLUMNAR_VERSION,
+            "count": self._count,
+            "base_date": date.fromordinal(base).isoformat() if self._min_ordinal else None,
+            "dicts": self._dicts,
+            "columns": columns,
+        }
@@ -0,0 +1,382 @@
+# app/core/work_calendar.py
+"""
+Radni kalendar: vikendi + austrijski državni praznici (isti kao
+frontend/src/utils/atHolidays.ts) + zatvaranja gradilišta po projektu
+(project_closures, npr. Betriebsurlaub).
+
+WorkCalendar drži kumulativni indeks radnih dana nad opsegom datuma:
+cum[i] = broj radnih dana prije (first + i), workdays[k] = k-ti radni dan.
+next_workday / add_workdays / sub_workdays / count_workdays su onda par
+indeksiranja (O(1)) umjesto petlje po danima, a schedule_chain raspoređuje
+cijeli niz koraka (generate/sync-tasks) u prostoru indeksa. *_many varijante
+rade isto za liste (hiljade koraka odjednom). Opseg raste sam ako datum
+ispadne van njega.
+
+Raspored lanca koraka (generate/sync-tasks) ide preko šablona:
+chain_template() jednom prevede korake modela (duration, parallel) u
+relativne offsete radnih dana (ne zavise od kalendara ni datuma), a
+WorkCalendar.schedule() ga instancira za početni datum u O(koraka) i
+pamti rezultat po (šablon, datum) – stotine TOP-ova s istim modelom i
+istim startom dobiju gotov raspored. Šablon se kešira po samim koracima,
+pa izmijenjen model (trajanje, parallel, redoslijed) daje novi šablon.
+
+default_calendar() (samo praznici) i project_calendar() (praznici +
+zatvaranja projekta) se keširaju – indeks se gradi jednom po skupu zatvaranja.
+
+Za SQL postoji tabela calendar_days (samo vikendi + praznici): "dan + N" je
+join po day_no (date.toordinal()), "prvi radni dan od" je kolona
+next_workday. Tako se npr. skip-window pomjeri jednim UPDATE-om
+(shifted_day_expr) umjesto petlje po taskovima i danima. Tabela se gradi u
+cijelim godinama (FIRST_YEAR … danas + YEARS_AHEAD) pri startu;
+ensure_work_calendar() je proširi ako neki datum ispadne iz opsega.
+
+Keširani kalendar dijele svi requesti (FastAPI threadpool), a rast opsega
+mijenja/zamjenjuje _cum i _workdays – zato rast, sva čitanja indeksa i
+memo rasporeda idu pod self._lock (RLock, javne metode se međusobno pozivaju).
+"""
+import threading
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session, aliased
+
+from app.models.calendar import CalendarDay, ProjectClosure
+
+FIRST_YEAR = 2000
+YEARS_AHEAD = 30
+
+FIXED_HOLIDAYS = {
+    (1, 1): "Neujahr",
+    (1, 6): "Heilige Drei Könige",
+    (5, 1): "Staatsfeiertag",
+    (8, 15): "Mariä Himmelfahrt",
+    (10, 26): "Nationalfeiertag",
+    (11, 1): "Allerheiligen",
+    (12, 8): "Mariä Empfängnis",
+    (12, 25): "Christtag",
+    (12, 26): "Stefanitag",
+}
+
+# dani od Uskrsa (nedjelja)
+EASTER_HOLIDAYS = {
+    1: "Ostermontag",
+    39: "Christi Himmelfahrt",
+    50: "Pfingstmontag",
+    60: "Fronleichnam",
+}
+
+Closure = tuple[date, date]  # (start, end) inkluzivno
+ChainSteps = tuple[tuple[int, bool], ...]  # (duration_days, parallel) po koraku
+
+SCHEDULE_MEMO_SIZE = 4096  # (šablon, start) → raspored, po kalendaru
+
+
+def easter_sunday(year: int) -> date:
+    """Gregorijanski Uskrs (isti algoritam kao u atHolidays.ts)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def austria_holidays(year: int) -> dict[date, str]:
+    res = {date(year, m, d): name for (m, d), name in FIXED_HOLIDAYS.items()}
+    easter = easter_sunday(year)
+    for offset, name in EASTER_HOLIDAYS.items():
+        res[easter + timedelta(days=offset)] = name
+    return res
+
+
+class ChainTemplate:
+    """
+    Lanac koraka preveden u offsete radnih dana od početka: (start, end) po
+    koraku. Korak traje `duration` radnih dana (min. 1); ne-paralelni korak
+    pomjera kursor iza svog kraja, paralelni ne.
+    """
+    __slots__ = ("steps", "offsets")
+
+    def __init__(self, steps: ChainSteps):
+        self.steps = steps
+        offsets = []
+        k = 0
+        for duration, parallel in steps:
+            end_k = k + max(1, duration or 1) - 1
+            offsets.append((k, end_k))
+            if not parallel:
+                k = end_k + 1
+        self.offsets: tuple[tuple[int, int], ...] = tuple(offsets)
+
+
+@lru_cache(maxsize=256)
+def _template_for(steps: ChainSteps) -> ChainTemplate:
+    return ChainTemplate(steps)
+
+
+def chain_template(steps: Iterable[tuple[int, bool]]) -> ChainTemplate:
+    """Šablon za korake (duration_days, parallel) – isti koraci → isti objekt."""
+    return _template_for(tuple((duration, bool(parallel)) for duration, parallel in steps))
+
+
+class WorkCalendar:
+    """Kumulativni indeks radnih dana nad [first, last] (raste po potrebi)."""
+
+    def __init__(self, first: date, last: date, closures: Iterable[Closure] = ()):
+        self.closures: tuple[Closure, ...] = tuple(sorted(closures))
+        self._lock = threading.RLock()
+        self._schedules: dict[tuple[ChainTemplate, date], tuple[tuple[date, date], ...]] = {}
+        self._build(first, last)
+
+    # --- indeks ---
+
+    def _off_days(self, first: date, last: date) -> set[int]:
+        """Ordinali neradnih dana koji nisu vikend (praznici + zatvaranja)."""
+        off = {d.toordinal() for y in range(first.year, last.year + 1) for d in austria_holidays(y)}
+        for start, end in self.closures:
+            lo, hi = max(start, first), min(end, last)
+            off.update(range(lo.toordinal(), hi.toordinal() + 1))
+        return off
+
+    def _build(self, first: date, last: date) -> None:
+        self.first = first
+        self._origin = first.toordinal()
+        self._cum = [0]
+        self._workdays: list[int] = []
+        self._append_days(first, last)
+
+    def _append_days(self, first: date, last: date) -> None:
+        off = self._off_days(first, last)
+        cum, workdays = self._cum, self._workdays
+        wd = first.weekday()
+        for o in range(first.toordinal(), last.toordinal() + 1):
+            if wd < 5 and o not in off:
+                workdays.append(o)
+            cum.append(len(workdays))
+            wd = 0 if wd == 6 else wd + 1
+        self.last = last
+
+    def _grow_forward(self, target: date) -> None:
+        new_last = date(max(target.year, self.last.year) + 1, 12, 31)
+        self._append_days(self.last + timedelta(days=1), new_last)
+
+    def _grow_backward(self, target: date) -> int:
+        """Izgradi ponovo od ranije godine; vraća koliko je radnih dana dodano ispred."""
+        before = len(self._workdays)
+        self._build(date(min(target.year, self.first.year) - 1, 1, 1), self.last)
+        return len(self._workdays) - before
+
+    def _index(self, d: date) -> int:
+        if d < self.first:
+            self._grow_backward(d)
+        elif d > self.last:
+            self._grow_forward(d)
+        return d.toordinal() - self._origin
+
+    def _day(self, k: int) -> date:
+        """k-ti radni dan (k računat poslije _index poziva – rast unaprijed ne mijenja indekse)."""
+        while k >= len(self._workdays):
+            self._grow_forward(self.last)
+        return date.fromordinal(self._workdays[k])
+
+    def _before(self, d: date) -> int:
+        """Broj radnih dana prije d = indeks prvog radnog dana >= d."""
+        i = self._index(d)  # prvo – rast unazad gradi novi _cum
+        return self._cum[i]
+
+    def _day_back(self, k: int) -> date:
+        while k < 0:
+            k += self._grow_backward(self.first)
+        return date.fromordinal(self._workdays[k])
+
+    # --- pojedinačni datumi (O(1)) ---
+
+    def is_workday(self, d: date) -> bool:
+        with self._lock:
+            i = self._index(d)
+            return self._cum[i + 1] != self._cum[i]
+
+    def next_workday(self, d: date) -> date:
+        """Prvi radni dan >= d."""
+        with self._lock:
+            return self._day(self._before(d))
+
+    def prev_workday(self, d: date) -> date:
+        """Zadnji radni dan <= d."""
+        with self._lock:
+            self._index(d)
+            return self._day_back(self._before(d + timedelta(days=1)) - 1)
+
+    def add_workdays(self, start: date, days: int) -> date:
+        """Zadnji radni dan intervala od `days` radnih dana; start (→ radni dan) je 1. dan."""
+        with self._lock:
+            return self._day(self._before(start) + max(1, days) - 1)
+
+    def sub_workdays(self, end: date, days: int) -> date:
+        """Prvi radni dan intervala od `days` radnih dana koji završava na end (← radni dan)."""
+        with self._lock:
+            last = self.prev_workday(end)
+            return self._day_back(self._before(last) - (max(1, days) - 1))
+
+    def count_workdays(self, start: date, end: date) -> int:
+        """Broj radnih dana u [start, end] (inkluzivno); 0 ako je end < start."""
+        if end < start:
+            return 0
+        with self._lock:
+            self._index(start)
+            after = self._before(end + timedelta(days=1))
+            return after - self._before(start)
+
+    # --- batch ---
+
+    def next_workday_many(self, days: Sequence[date]) -> list[date]:
+        return [self.next_workday(d) for d in days]
+
+    def add_workdays_many(self, starts: Sequence[date], durations: Sequence[int]) -> list[date]:
+        return [self.add_workdays(s, n) for s, n in zip(starts, durations)]
+
+    def schedule(self, template: ChainTemplate, start: date) -> tuple[tuple[date, date], ...]:
+        """
+        (start_soll, end_soll) po koraku šablona kad lanac kreće od `start`
+        (→ prvi radni dan). Pamti se po (šablon, start); memo je pod istim
+        lockom kao rast indeksa.
+        """
+        key = (template, start)
+        with self._lock:
+            hit = self._schedules.get(key)
+            if hit is None:
+                k = self._before(start)
+                hit = tuple((self._day(k + s), self._day(k + e)) for s, e in template.offsets)
+                if len(self._schedules) >= SCHEDULE_MEMO_SIZE:
+                    self._schedules.clear()
+                self._schedules[key] = hit
+            return hit
+
+    def schedule_chain(self, start: date, steps: Sequence[tuple[int, bool]]) -> list[tuple[date, date]]:
+        """
+        (start_soll, end_soll) za niz koraka (duration_days, parallel) kao u
+        generate/sync-tasks: korak počinje prvi radni dan od kursora, traje
+        `duration` radnih dana; ne-paralelni korak pomjera kursor iza svog kraja.
+        """
+        return list(self.schedule(chain_template(steps), start))
+
+    def schedule_chains(
+        self, starts: Sequence[date], steps: Sequence[tuple[int, bool]]
+    ) -> list[list[tuple[date, date]]]:
+        """schedule_chain za više početnih datuma (npr. svi TOP-ovi istog modela)."""
+        template = chain_template(steps)
+        return [list(self.schedule(template, s)) for s in starts]
+
+
+@lru_cache(maxsize=32)
+def _calendar_for(closures: tuple[Closure, ...]) -> WorkCalendar:
+    today = date.today()
+    return WorkCalendar(date(FIRST_YEAR, 1, 1), date(today.year + YEARS_AHEAD, 12, 31), closures)
+
+
+def default_calendar() -> WorkCalendar:
+    """Vikendi + praznici (bez zatvaranja projekta)."""
+    return _calendar_for(())
+
+
+def project_calendar(db: Session, project_id: Optional[int]) -> WorkCalendar:
+    """Kalendar projekta: praznici + njegova zatvaranja (jedan upit)."""
+    if project_id is None:
+        return default_calendar()
+    closures = tuple(
+        (start, end)
+        for start, end in db.execute(
+            select(ProjectClosure.start, ProjectClosure.end)
+            .where(ProjectClosure.project_id == project_id)
+            .order_by(ProjectClosure.start, ProjectClosure.end)
+        )
+    )
+    return _calendar_for(closures)
+
+
+# kratice nad default kalendarom
+def is_workday(d: date) -> bool:
+    return default_calendar().is_workday(d)
+
+
+def next_workday(d: date) -> date:
+    return default_calendar().next_workday(d)
+
+
+def add_workdays(start: date, days: int) -> date:
+    return default_calendar().add_workdays(start, days)
+
+
+def count_workdays(start: date, end: date) -> int:
+    return default_calendar().count_workdays(start, end)
+
+
+# --- calendar_days (SQL) ---
+
+def _calendar_rows(first_year: int, last_year: int) -> list[dict]:
+    """Redovi za 1.1.first_year … 31.12.last_year (next_workday gleda i preko kraja)."""
+    first, last = date(first_year, 1, 1), date(last_year, 12, 31)
+    cal = WorkCalendar(first, date(last_year + 1, 12, 31))
+    holidays: dict[date, str] = {}
+    for y in range(first_year, last_year + 1):
+        holidays.update(austria_holidays(y))
+
+    rows = []
+    for i in range((last - first).days + 1):
+        d = first + timedelta(days=i)
+        rows.append({
+            "day": d,
+            "day_no": d.toordinal(),
+            "holiday": holidays.get(d),
+            "is_workday": cal.is_workday(d),
+            "next_workday": cal.next_workday(d),
+            "workday_no": cal.count_workdays(first, d),
+        })
+    return rows
+
+
+def ensure_work_calendar(db: Session, first: Optional[date] = None, last: Optional[date] = None) -> bool:
+    """
+    Osiguraj da kalendar pokriva [first, last] (default: FIRST_YEAR … danas +
+    YEARS_AHEAD). Ako ne pokriva → tabela se složi ponovo u cijelim godinama
+    (workday_no ostaje kontinuiran) + commit. Vraća True ako je građena.
+    """
+    today = date.today()
+    first = first or date(FIRST_YEAR, 1, 1)
+    last = last or date(today.year + YEARS_AHEAD, 12, 31)
+
+    lo, hi, n = db.execute(
+        select(func.min(CalendarDay.day), func.max(CalendarDay.day), func.count())
+    ).one()
+    if n and lo <= first and hi >= last and n == (hi - lo).days + 1:
+        return False
+
+    first_year = min(first.year, lo.year if lo else first.year, FIRST_YEAR)
+    last_year = max(last.year, hi.year if hi else last.year)
+    db.execute(delete(CalendarDay).execution_options(synchronize_session=False))
+    db.execute(insert(CalendarDay), _calendar_rows(first_year, last_year))
+    db.commit()
+    return True
+
+
+def shifted_day_expr(col, days: int, workday: bool = False):
+    """
+    SQL izraz: datum kolone `col` + `days` kalendarskih dana; sa workday=True
+    se rezultat gura na prvi radni dan (vikend/praznik → dalje). NULL ostaje
+    NULL. Kalendar mora pokrivati col i col + days (ensure_work_calendar).
+    """
+    src = aliased(CalendarDay)
+    dst = aliased(CalendarDay)
+    target = dst.next_workday if workday else dst.day
+    return (
+        select(target)
+        .where(src.day == col, dst.day_no == src.day_no + days)
+        .scalar_subquery()
+    )
@@ -8,7 +8,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.gzip import GZipMiddleware
 
-from app.database import Base, engine
+from app.database import Base, SessionLocal, engine
 from app.deps import bind_user
 from app.routes import aktivitaet_questions
 from app.routes import upload
@@ -43,6 +43,17 @@ app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
 # --- DB init ---
 Base.metadata.create_all(bind=engine)
 
+# SQLAlchemy listeneri (revizije/tombstone-ovi, denormalizirana struktura na tasku, closure, brojači)
+from app.core import task_sync, structure_denorm, structure_closure, structure_rollup, project_counters  # noqa: F401
+from app.core import work_calendar
+
+# closure tabela strukture + rollup aktivnosti + brojači + radni kalendar – popuni jednom za postojeće baze
+with SessionLocal() as _db:
+    structure_closure.ensure_structure_closure(_db)
+    structure_rollup.ensure_structure_rollup(_db)
+    project_counters.ensure_project_counters(_db)
+    work_calendar.ensure_work_calendar(_db)
+
 # --- Routers ---
 from app.routes import (
     protocol,
@@ -1,13 +1,19 @@
 # app/models/__init__.py
 
 # osnovni modeli
-from .task import Task
+from .task import Task, ProjectRevision, TaskTombstone
 from .project import Project
 from .user import User
 from .gewerk import Gewerk
 
 # structure.* modeli (Top/Ebene/Stiege/Bauteil su u structure.py)
-from .structure import Top, Ebene, Stiege, Bauteil
+from .structure import Top, Ebene, Stiege, Bauteil, StructureClosure, StructureActivityRollup
+
+# dnevni snimci statistike (/stats?until=...) + brojači taskova po projektu
+from .stats import ProjectStatsSnapshot, ProjectCounter
+
+# radni kalendar (vikendi + praznici) + zatvaranja gradilišta po projektu
+from .calendar import CalendarDay, ProjectClosure
 
 # process.* modeli (ProcessModel/ProcessStep su u process.py)
 from .process import ProcessModel, ProcessStep
@@ -19,6 +25,8 @@ from app.models.aktivitaet_question import AktivitaetQuestion, TaskCheckAnswer
 
 __all__ = [
     "Task",
+    "ProjectRevision",
+    "TaskTombstone",
     "Project",
     "User",
     "Gewerk",
@@ -26,6 +34,12 @@ __all__ = [
     "Ebene",
     "Stiege",
     "Bauteil",
+    "StructureClosure",
+    "StructureActivityRollup",
+    "ProjectStatsSnapshot",
+    "ProjectCounter",
+    "CalendarDay",
+    "ProjectClosure",
     "ProcessModel",
     "ProcessStep",
     "Aktivitaet",
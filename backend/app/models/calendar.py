@@ -0,0 +1,36 @@
+from sqlalchemy import Boolean, Column, Date, ForeignKey, Index, Integer, String
+from app.database import Base
+
+
+class CalendarDay(Base):
+    """
+    Radni kalendar (vikendi + austrijski praznici), jedan red po danu.
+    Puni ga app/core/work_calendar.py; služi za pomjeranje datuma u SQL-u
+    (skip-window) bez petlje po danima.
+    """
+    __tablename__ = "calendar_days"
+
+    day = Column(Date, primary_key=True)
+    day_no = Column(Integer, nullable=False, unique=True)   # date.toordinal() → dan + N = day_no + N
+    holiday = Column(String, nullable=True)                 # naziv praznika (None = nije praznik)
+    is_workday = Column(Boolean, nullable=False)
+    next_workday = Column(Date, nullable=False)             # prvi radni dan >= day
+    workday_no = Column(Integer, nullable=False)            # broj radnih dana do uklj. day (kumulativno)
+
+
+class ProjectClosure(Base):
+    """
+    Zatvaranje gradilišta projekta (npr. Betriebsurlaub) – dani [start, end]
+    su neradni za raspored taskova tog projekta (app/core/work_calendar.py).
+    """
+    __tablename__ = "project_closures"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    start = Column(Date, nullable=False)
+    end = Column(Date, nullable=False)
+    name = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("idx_project_closures_project", "project_id"),
+    )
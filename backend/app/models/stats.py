@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class ProjectStatsSnapshot(Base):
+    """
+    Dnevni snimak /stats po (projekt, dan, gewerk) – stanje "do tog dana".
+    Puni ga app/core/task_stats.py (snapshot_stats.py / POST .../stats/snapshot).
+    """
+    __tablename__ = "project_stats_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    gewerk = Column(String, nullable=False)
+    done = Column(Integer, nullable=False, default=0)
+    in_progress = Column(Integer, nullable=False, default=0)
+    offen = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_project_stats_snapshots_project_day", "project_id", "day"),
+    )
+
+
+class ProjectCounter(Base):
+    """
+    Brojači taskova po (projekt, sub) – sub_id 0 = bez suba.
+    Održava ih app/core/project_counters.py pri svakom commitu taskova.
+    """
+    __tablename__ = "project_counters"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    sub_id = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    done = Column(Integer, nullable=False, default=0)
+    in_progress = Column(Integer, nullable=False, default=0)
+    offen = Column(Integer, nullable=False, default=0)
+    delayed = Column(Integer, nullable=False, default=0)
+    counted_on = Column(Date, nullable=False)  # "delayed" važi za ovaj dan
+
+    __table_args__ = (
+        Index("idx_project_counters_project_sub", "project_id", "sub_id", unique=True),
+    )
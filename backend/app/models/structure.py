@@ -1,12 +1,14 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Date, Integer, String, ForeignKey, Index, event
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.core.natural_sort import natural_key
 
 class Bauteil(Base):
     __tablename__ = "bauteile"
 
     id = Column(Integer, primary_key=True)
     name = Column(String)
+    sort_key = Column(String, nullable=True)  # natural_key(name), vidi app/core/natural_sort.py
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     process_model_id = Column(Integer, ForeignKey("process_models.id"), nullable=True)
     project = relationship("Project", back_populates="bauteile")
@@ -24,6 +26,7 @@ class Stiege(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String)
+    sort_key = Column(String, nullable=True)  # natural_key(name), vidi app/core/natural_sort.py
     bauteil_id = Column(Integer, ForeignKey("bauteile.id", ondelete="CASCADE"), nullable=False)
     process_model_id = Column(Integer, ForeignKey("process_models.id"), nullable=True)
 
@@ -42,6 +45,7 @@ class Ebene(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String)
+    sort_key = Column(String, nullable=True)  # natural_key(name), vidi app/core/natural_sort.py
     stiege_id = Column(Integer, ForeignKey("stiegen.id", ondelete="CASCADE"), nullable=False)
     process_model_id = Column(Integer, ForeignKey("process_models.id"), nullable=True)
 
@@ -60,8 +64,63 @@ class Top(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String)
+    sort_key = Column(String, nullable=True)  # natural_key(name), vidi app/core/natural_sort.py
     ebene_id = Column(Integer, ForeignKey("ebenen.id", ondelete="CASCADE"), nullable=False)
     process_model_id = Column(Integer, ForeignKey("process_models.id"), nullable=True)
 
 
     ebene = relationship("Ebene", back_populates="tops")
+
+
+class StructureClosure(Base):
+    """
+    Closure tabela hijerarhije Bauteil/Stiege/Ebene/Top: jedan red za svaki
+    par (predak, potomak), uklj. čvor sam sa sobom (depth=0).
+    Puni je app/core/structure_closure.py.
+    """
+    __tablename__ = "structure_closure"
+
+    ancestor_kind = Column(String, primary_key=True)    # "bauteil" | "stiege" | "ebene" | "top"
+    ancestor_id = Column(Integer, primary_key=True)
+    descendant_kind = Column(String, primary_key=True)
+    descendant_id = Column(Integer, primary_key=True)
+    depth = Column(Integer, nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (
+        Index("idx_structure_closure_descendant", "descendant_kind", "descendant_id", "depth"),
+    )
+
+
+class StructureActivityRollup(Base):
+    """
+    Agregat taskova po (projekt, Ebene, aktivnost) za /structure-timeline bez
+    filtera. Stiege/Bauteil se slažu iz redova Ebene. Održava ga
+    app/core/structure_rollup.py.
+    """
+    __tablename__ = "structure_activity_rollup"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    ebene_id = Column(Integer, ForeignKey("ebenen.id", ondelete="CASCADE"), nullable=False)
+    activity = Column(String)
+    start = Column(Date)                 # MIN(coalesce(start_ist, start_soll))
+    end = Column(Date)                   # MAX(coalesce(end_ist, end_soll))
+    total = Column(Integer, nullable=False, default=0)
+    done = Column(Integer, nullable=False, default=0)
+    late_done = Column(Integer, nullable=False, default=0)   # gotovi poslije end_soll
+    open_end_min = Column(Date)          # MIN(end_soll) otvorenih → kasni ako < danas
+    gewerk_id = Column(Integer, ForeignKey("gewerke.id", ondelete="SET NULL"))  # MIN(Gewerk.id) → naziv + boja pri čitanju
+
+    __table_args__ = (
+        Index("idx_structure_rollup_project_ebene", "project_id", "ebene_id"),
+    )
+
+
+# sort_key prati name (insert + svaki update naziva)
+def _set_sort_key(mapper, connection, target):
+    target.sort_key = natural_key(target.name)
+
+for _cls in (Bauteil, Stiege, Ebene, Top):
+    event.listen(_cls, "before_insert", _set_sort_key)
+    event.listen(_cls, "before_update", _set_sort_key)
@@ -1,6 +1,6 @@
-
-from sqlalchemy import Column, Integer, Date, ForeignKey, String, Text
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, String, Text, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from app.database import Base
 
 class Task(Base):
@@ -18,7 +18,51 @@ class Task(Base):
     beschreibung = Column(Text, nullable=True)
     sub_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
+    # delta sync (/projects/{id}/tasks/changes) – puni app/core/task_sync.py
+    updated_at = Column(DateTime, server_default=func.now(), nullable=True)
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # denormalizirana struktura (roditelji TOP-a, putanja, prirodni sort ključ
+    # Bauteil/Stiege/Ebene/Top) – puni app/core/structure_denorm.py
+    bauteil_id = Column(Integer, ForeignKey("bauteile.id", ondelete="CASCADE"), nullable=True)
+    stiege_id = Column(Integer, ForeignKey("stiegen.id", ondelete="CASCADE"), nullable=True)
+    ebene_id = Column(Integer, ForeignKey("ebenen.id", ondelete="CASCADE"), nullable=True)
+    location = Column(String, nullable=True)  # "Bauteil • Stiege • Ebene • Top"
+    sort_key = Column(String, nullable=True)
+
     sub = relationship("User", foreign_keys=[sub_id], lazy="joined")
     top = relationship("Top")
     process_step = relationship("ProcessStep")
     project = relationship("Project")
+
+    __table_args__ = (
+        Index("idx_tasks_project_revision", "project_id", "revision"),
+        Index("idx_tasks_project_sort", "project_id", "sort_key"),
+        Index("idx_tasks_project_bauteil", "project_id", "bauteil_id"),
+        Index("idx_tasks_project_stiege", "project_id", "stiege_id"),
+        Index("idx_tasks_project_ebene", "project_id", "ebene_id"),
+        Index("idx_tasks_top_step", "top_id", "process_step_id"),  # lanac koraka jednog TOP-a
+    )
+
+
+class ProjectRevision(Base):
+    """Zadnja dodijeljena revizija taskova po projektu (monotono raste)."""
+    __tablename__ = "project_revisions"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    revision = Column(Integer, nullable=False, default=0)
+
+
+class TaskTombstone(Base):
+    """Trag obrisanog taska – da klijent s toplom kopijom zna šta da izbaci."""
+    __tablename__ = "task_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    task_id = Column(Integer, nullable=False)
+    revision = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_task_tombstones_project_revision", "project_id", "revision"),
+    )
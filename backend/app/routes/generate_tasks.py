@@ -4,10 +4,13 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import exists, and_
-from datetime import date, datetime, timedelta
+from sqlalchemy import func, select
+from datetime import date, datetime
 
+from app.core.effective_model import effective_models_select
 from app.core.protocol import log_protocol
+from app.core.task_bulk import insert_tasks
+from app.core.work_calendar import chain_template, project_calendar
 from app.database import get_db
 from app.models.project import Project
 from app.models.structure import Top, Ebene, Stiege, Bauteil
@@ -28,25 +31,6 @@ def _to_date(v):
         except Exception: return None
     return None
 
-def is_weekend(d: date) -> bool:
-    return d.weekday() >= 5  # 5=Sub, 6=Ned
-
-def next_workday(d: date) -> date:
-    while is_weekend(d):
-        d += timedelta(days=1)
-    return d
-
-def add_workdays(start: date, days: int) -> date:
-    """Vrati zadnji radni dan intervala dužine 'days'.
-       start se računa kao 1. radni dan (inkluzivan)."""
-    d = next_workday(start)
-    remaining = max(1, days) - 1
-    while remaining > 0:
-        d += timedelta(days=1)
-        if not is_weekend(d):
-            remaining -= 1
-    return d
-
 
 @router.post("/projects/{project_id}/generate-tasks", response_model=list[TaskRead])
 async def generate_tasks(project_id: int, request: Request, db: Session = Depends(get_db)):
@@ -69,13 +53,14 @@ async def generate_tasks(project_id: int, request: Request, db: Session = Depend
     if not project:
         raise HTTPException(status_code=404, detail="Projekt nicht gefunden")
 
-    # Svi TOP-ovi u projektu (preko hijerarhije)
-    tops: list[Top] = (
-        db.query(Top)
-        .join(Ebene).join(Stiege).join(Bauteil)
-        .filter(Bauteil.project_id == project_id)
-        .all()
-    )
+    # Svi TOP-ovi u projektu s efektivnim process modelom (Top→Ebene→Stiege→Bauteil,
+    # app/core/effective_model.py) i hijerarhijom – jedan upit
+    tops = db.execute(
+        effective_models_select(
+            Top.name, Ebene.id, Ebene.name, Stiege.id, Stiege.name, Bauteil.id, Bauteil.name,
+            project_id=project_id,
+        )
+    ).all()
     if not tops:
         raise HTTPException(status_code=404, detail="No TOPs found in project.")
 
@@ -87,39 +72,57 @@ async def generate_tasks(project_id: int, request: Request, db: Session = Depend
     start_map = (payload or {}).get("start_map") or {}
     start_map_top: dict[str, str] = (start_map or {}).get("top") or {}
 
-    created_tasks: list[Task] = []
+    # radni dani projekta: vikendi + praznici + zatvaranja (app/core/work_calendar.py)
+    cal = project_calendar(db, project_id)
+
+    model_ids = {row.process_model_id for row in tops if row.process_model_id}
+
+    # modeli + koraci (sortirani i deduplikovani) – dva upita za sve TOP-ove
+    models = dict(
+        db.execute(select(ProcessModel.id, ProcessModel.name).where(ProcessModel.id.in_(model_ids))).all()
+    ) if model_ids else {}
+    steps_by_model: dict[int, list] = {mid: [] for mid in models}
+    if models:
+        for step in db.execute(
+            select(
+                ProcessStep.id, ProcessStep.model_id, ProcessStep.order,
+                ProcessStep.parallel, ProcessStep.duration_days,
+            )
+            .where(ProcessStep.model_id.in_(models.keys()))
+            .order_by(func.coalesce(ProcessStep.order, 10**9), ProcessStep.id)
+        ):
+            steps_by_model[step.model_id].append(step)
+
+    # šablon rasporeda jednom po modelu, instancira se po datumu (app/core/work_calendar.py)
+    templates = {
+        mid: chain_template((step.duration_days or 1, step.parallel) for step in steps)
+        for mid, steps in steps_by_model.items()
+    }
+
+    # već postojeći (top, step) parovi – jedan upit
+    existing = set(
+        db.execute(
+            select(Task.top_id, Task.process_step_id).where(Task.project_id == project.id)
+        ).all()
+    )
+
+    new_rows: list[dict] = []
+    created_traces: list[dict] = []
     skipped_no_model: list[int] = []
     skipped_duplicates: list[tuple[int, int]] = []
     traces: list[dict] = []
 
-    for top in tops:
-        # Hijerarhija (za trace i pronalazak modela)
-        ebene: Ebene | None = db.query(Ebene).filter_by(id=top.ebene_id).first()
-        stiege: Stiege | None = db.query(Stiege).filter_by(id=ebene.stiege_id).first() if ebene else None
-        bauteil: Bauteil | None = db.query(Bauteil).filter_by(id=stiege.bauteil_id).first() if stiege else None
-
-        # Pronađi najbliži process model uzlazno
-        model: ProcessModel | None = None
-        model_source: str | None = None
-        if getattr(top, "process_model_id", None):
-            model = db.query(ProcessModel).filter_by(id=top.process_model_id).first()
-            model_source = "top"
-        elif ebene and getattr(ebene, "process_model_id", None):
-            model = db.query(ProcessModel).filter_by(id=ebene.process_model_id).first()
-            model_source = "ebene"
-        elif stiege and getattr(stiege, "process_model_id", None):
-            model = db.query(ProcessModel).filter_by(id=stiege.process_model_id).first()
-            model_source = "stiege"
-        elif bauteil and getattr(bauteil, "process_model_id", None):
-            model = db.query(ProcessModel).filter_by(id=bauteil.process_model_id).first()
-            model_source = "bauteil"
+    for (top_id, pm_id, model_source, top_name, ebene_id, ebene_name,
+         stiege_id, stiege_name, bauteil_id, bauteil_name) in tops:
+        model_name = models.get(pm_id) if pm_id else None
+        has_model = pm_id in models
 
         trace = {
-            "top": {"id": top.id, "name": getattr(top, "name", f"Top#{top.id}")},
-            "ebene": {"id": ebene.id, "name": getattr(ebene, "name", f"Ebene#{ebene.id}")} if ebene else None,
-            "stiege": {"id": stiege.id, "name": getattr(stiege, "name", f"Stiege#{stiege.id}")} if stiege else None,
-            "bauteil": {"id": bauteil.id, "name": getattr(bauteil, "name", f"Bauteil#{bauteil.id}")} if bauteil else None,
-            "model": {"id": model.id, "name": getattr(model, "name", f"Model#{model.id}")} if model else None,
+            "top": {"id": top_id, "name": top_name},
+            "ebene": {"id": ebene_id, "name": ebene_name},
+            "stiege": {"id": stiege_id, "name": stiege_name},
+            "bauteil": {"id": bauteil_id, "name": bauteil_name},
+            "model": {"id": pm_id, "name": model_name} if has_model else None,
             "model_source": model_source,
             "steps_considered": [],
             "steps_skipped_duplicate": [],
@@ -127,96 +130,67 @@ async def generate_tasks(project_id: int, request: Request, db: Session = Depend
             "reason": None,
         }
 
-        if not model:
-            skipped_no_model.append(top.id)
+        if not has_model:
+            skipped_no_model.append(top_id)
             trace["reason"] = "no_process_model_found"
             traces.append(trace)
             continue
 
-        # Sortiraj i deduplikuj korake
-        steps_sorted: list[ProcessStep] = sorted(
-            model.steps,
-            key=lambda s: (s.order if getattr(s, "order", None) is not None else 10**9, s.id),
-        )
-        seen_step_ids: set[int] = set()
-        unique_steps: list[ProcessStep] = []
-        for step in steps_sorted:
-            sid = int(step.id)
+        steps = steps_by_model[pm_id]
+        for step in steps:
             trace["steps_considered"].append({
-                "id": sid,
-                "name": getattr(step, "name", f"Step#{sid}"),
-                "order": getattr(step, "order", None),
-                "parallel": getattr(step, "parallel", False),
-                "duration_days": getattr(step, "duration_days", None),
+                "id": int(step.id),
+                "name": f"Step#{step.id}",
+                "order": step.order,
+                "parallel": step.parallel,
+                "duration_days": step.duration_days,
             })
-            if sid in seen_step_ids:
-                continue
-            seen_step_ids.add(sid)
-            unique_steps.append(step)
 
-        # Početni datum za ovaj TOP:
-        # 1) mapa iz frontenda  2) project.start_date  3) today
         # Početni datum – samo ako je iz mape; inače preskoči TOP
-        base_str = start_map_top.get(str(top.id))
+        base_str = start_map_top.get(str(top_id))
         if not base_str:
             continue  # bez datuma -> ne generiraj ništa za ovaj TOP
 
         base_date = _to_date(base_str)
         if not base_date:
             continue
-        current_date = next_workday(base_date)      
-
-
-        # Kreiraj taskove po redu
-        for step in unique_steps:
-            # Preskoči duplikate (ako task već postoji)
-            already = db.query(
-                exists().where(
-                    and_(
-                        Task.project_id == project.id,
-                        Task.top_id == top.id,
-                        Task.process_step_id == step.id,
-                    )
-                )
-            ).scalar()
 
-            duration = getattr(step, "duration_days", None) or 1
-            start_soll = next_workday(current_date)             # ⬅️
-            end_soll   = add_workdays(start_soll, duration)     # ⬅️
-
-
-            if already:
-                skipped_duplicates.append((top.id, step.id))
+        # Raspored cijelog lanca (duplikati i dalje pomjeraju kursor)
+        schedule = cal.schedule(templates[pm_id], base_date)
+        for step, (start_soll, end_soll) in zip(steps, schedule):
+            if (top_id, step.id) in existing:
+                skipped_duplicates.append((top_id, step.id))
                 trace["steps_skipped_duplicate"].append({"id": int(step.id)})
-                if not getattr(step, "parallel", False):
-                    current_date = end_soll + timedelta(days=1)
                 continue
 
-            task = Task(
-                top_id=top.id,
-                process_step_id=step.id,
-                start_soll=start_soll,
-                end_soll=end_soll,  # traženo ponašanje
-                project_id=project.id,
-                status="offen",
-            )
-            db.add(task)
-            db.flush()
-
-            trace["tasks_created"].append({
-                "task_id": task.id,
+            new_rows.append({
+                "top_id": top_id,
+                "process_step_id": step.id,
+                "start_soll": start_soll,
+                "end_soll": end_soll,  # traženo ponašanje
+                "status": "offen",
+            })
+            created = {
+                "task_id": None,  # id dolazi iz RETURNING-a
                 "step_id": int(step.id),
                 "start_soll": str(start_soll),
                 "end_soll": str(end_soll),
-                "parallel": bool(getattr(step, "parallel", False)),
-            })
-            created_tasks.append(task)
-
-            if not getattr(step, "parallel", False):
-                current_date = end_soll + timedelta(days=1)
+                "parallel": bool(step.parallel),
+            }
+            trace["tasks_created"].append(created)
+            created_traces.append(created)
 
         traces.append(trace)
 
+    # Svi novi taskovi jednim bulk INSERT … RETURNING (app/core/task_bulk.py)
+    new_ids = insert_tasks(db, project.id, new_rows)
+    for task_id, created in zip(new_ids, created_traces):
+        created["task_id"] = task_id
+    created_tasks = [
+        TaskRead(id=task_id, project_id=project.id, **row)
+        for task_id, row in zip(new_ids, new_rows)
+    ]
+
     db.commit()
 
     details = {
@@ -5,6 +5,10 @@ from app.database import get_db
 from app.models.process import ProcessModel, ProcessStep
 from app.schemas.process import ProcessModelCreate, ProcessModelRead
 from app.core.protocol import log_protocol
+from app.core.structure_rollup import mark_rollup_dirty
+from app.core.project_counters import mark_counters_dirty
+from app.core.task_sync import record_tombstones
+from app.models.task import Task
 
 router = APIRouter()
 
@@ -86,6 +90,12 @@ def delete_model(model_id: int, request: Request, db: Session = Depends(get_db))
     name_before = model.name
     model_id_val = model.id
 
+    # taskovi koraka odlaze kaskadno u bazi → tombstone za delta sync, rollup strukture, brojači
+    old_step_ids = [s.id for s in model.steps]
+    record_tombstones(db, Task.process_step_id.in_(old_step_ids))
+    mark_rollup_dirty(db, Task.process_step_id.in_(old_step_ids))
+    mark_counters_dirty(db, Task.process_step_id.in_(old_step_ids))
+
     db.delete(model)
     db.commit()
 
@@ -133,6 +143,13 @@ def update_process_model(
     # --- update osnovnih polja ---
     model.name = data.name
 
+    # stari koraci (i njihovi taskovi, kaskadno u bazi) odlaze → tombstone za
+    # delta sync, rollup strukture, brojači
+    old_step_ids = [s.id for s in model.steps]
+    record_tombstones(db, Task.process_step_id.in_(old_step_ids))
+    mark_rollup_dirty(db, Task.process_step_id.in_(old_step_ids))
+    mark_counters_dirty(db, Task.process_step_id.in_(old_step_ids))
+
     # obriši stare stepove i dodaj nove
     model.steps.clear()
     for step_data in data.steps:
@@ -19,13 +19,18 @@ from app.models.user import User as UserModel
 from app.models.task import Task as TaskModel
 from app.models.process import ProcessStep as ProcessStepModel
 from app.models.gewerk import Gewerk as GewerkModel
+from app.models.calendar import ProjectClosure as ProjectClosureModel
 
 from app.schemas.project import (
     ProjectCreate,
     ProjectUpdate,
     ProjectRead,      
+    ProjectSummary,
+    ProjectClosureCreate,
+    ProjectClosureRead,
     UserAssign,
 )
+from app.core.task_filters import delayed_condition
 
 
 from app.schemas.user import UserRead
@@ -114,39 +119,96 @@ def create_project(
     return proj
 
 
+def visible_project_ids(db: Session, current_user: UserModel):
+    """
+    SELECT id-eva projekata koje korisnik vidi (isto pravilo za listu i summary):
+      admin → svi; sub → član ILI ima task dodijeljen sebi; ostali → član.
+    """
+    if current_user.role in ("admin", "Admin", "ADMIN"):
+        return select(ProjectModel.id)
+
+    membership = (
+        select(ProjectModel.id)
+        .join(ProjectModel.users)
+        .where(UserModel.id == current_user.id)
+    )
+    if current_user.role == "sub":
+        own_tasks = select(TaskModel.project_id).where(TaskModel.sub_id == current_user.id)
+        return membership.union(own_tasks)
+    return membership
+
+
 @router.get("", response_model=List[ProjectRead], response_model_exclude_none=False, response_model_exclude_unset=False)
 def list_projects(
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user),
 ):
-    # ✅ Admin vidi SVE projekte
-    if current_user.role in ("admin", "Admin", "ADMIN"):
-        rows = db.query(ProjectModel).all()
-        return [ProjectRead.model_validate(r, from_attributes=True) for r in rows]
-
-    if current_user.role == "sub":
-        q_tasks = (
-            db.query(ProjectModel)
-            .join(TaskModel, TaskModel.project_id == ProjectModel.id)
-            .filter(TaskModel.sub_id == current_user.id)
-        )
-        q_membership = (
-            db.query(ProjectModel)
-            .join(ProjectModel.users)
-            .filter(UserModel.id == current_user.id)
-        )
-        rows = q_tasks.union(q_membership).distinct().all()
-        return [ProjectRead.model_validate(r, from_attributes=True) for r in rows]  # ⬅️
-
     rows = (
         db.query(ProjectModel)
-        .join(ProjectModel.users)
-        .filter(UserModel.id == current_user.id)
+        .filter(ProjectModel.id.in_(visible_project_ids(db, current_user)))
+        .order_by(ProjectModel.id)
         .all()
     )
     return [ProjectRead.model_validate(r, from_attributes=True) for r in rows]
 
 
+@router.get("/summary", response_model=List[ProjectSummary])
+def projects_summary(
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user),
+):
+    """
+    Dashboard: svi vidljivi projekti + brojevi taskova u JEDNOM upitu
+    (LEFT JOIN tasks, GROUP BY projekt) – umjesto tasks-count/has-tasks/
+    task-stats poziva po projektu.
+    """
+    today = date.today()
+    T = TaskModel
+    open_ = T.end_ist.is_(None)
+    rows = db.execute(
+        select(
+            ProjectModel.id,
+            ProjectModel.name,
+            ProjectModel.description,
+            ProjectModel.start_date,
+            ProjectModel.image_url,
+            func.count(T.id).label("total"),
+            func.count(T.end_ist).label("done"),
+            func.count(case((and_(T.start_ist.isnot(None), open_), 1))).label("in_progress"),
+            func.count(case((delayed_condition(today), 1))).label("delayed"),
+            func.min(func.coalesce(T.start_ist, T.start_soll)).label("start"),
+            func.max(func.coalesce(T.end_ist, T.end_soll)).label("end"),
+            # sljedeći rok = najraniji end_soll otvorenog taska od danas
+            func.min(case((and_(open_, T.end_soll >= today), T.end_soll))).label("next_milestone"),
+        )
+        .select_from(ProjectModel)
+        .outerjoin(T, T.project_id == ProjectModel.id)
+        .where(ProjectModel.id.in_(visible_project_ids(db, current_user)))
+        .group_by(ProjectModel.id)
+        .order_by(ProjectModel.id)
+    ).all()
+
+    return [
+        ProjectSummary(
+            id=r.id,
+            name=r.name,
+            description=r.description,
+            start_date=r.start_date,
+            image_url=r.image_url,
+            total=r.total,
+            done=r.done,
+            in_progress=r.in_progress,
+            offen=r.total - r.done - r.in_progress,
+            delayed=r.delayed,
+            percent_done=round((r.done / r.total) * 100, 1) if r.total else 0.0,
+            start=r.start,
+            end=r.end,
+            next_milestone=r.next_milestone,
+        )
+        for r in rows
+    ]
+
+
 
 @router.get("/{project_id}", response_model=ProjectRead, response_model_exclude_none=False, response_model_exclude_unset=False)
 def get_project(
@@ -213,6 +275,90 @@ def update_project(
     return db_project
 
 
+# --- Zatvaranja gradilišta (neradni dani za raspored taskova) ---------------
+
+@router.get("/{project_id}/closures", response_model=List[ProjectClosureRead])
+def list_project_closures(project_id: int, db: Session = Depends(get_db)):
+    return db.execute(
+        select(ProjectClosureModel)
+        .where(ProjectClosureModel.project_id == project_id)
+        .order_by(ProjectClosureModel.start, ProjectClosureModel.id)
+    ).scalars().all()
+
+
+@router.post(
+    "/{project_id}/closures",
+    response_model=ProjectClosureRead,
+    status_code=201,
+    dependencies=[Depends(require_admin)],
+)
+def create_project_closure(
+    project_id: int,
+    payload: ProjectClosureCreate,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    project = db.get(ProjectModel, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Projekt nicht gefunden")
+    if payload.end < payload.start:
+        raise HTTPException(status_code=400, detail="Ende vor Start")
+
+    closure = ProjectClosureModel(project_id=project_id, **payload.model_dump())
+    db.add(closure)
+    db.commit()
+    db.refresh(closure)
+
+    log_protocol(
+        db,
+        request,
+        action="project.closure.create",
+        ok=True,
+        status_code=201,
+        details={
+            "project_id": project_id,
+            "project_name": project.name,
+            "closure_id": closure.id,
+            "start": str(closure.start),
+            "end": str(closure.end),
+            "name": closure.name,
+        },
+    )
+    return closure
+
+
+@router.delete("/{project_id}/closures/{closure_id}", status_code=204, dependencies=[Depends(require_admin)])
+def delete_project_closure(
+    project_id: int,
+    closure_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    closure = db.get(ProjectClosureModel, closure_id)
+    if not closure or closure.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Schließzeit nicht gefunden")
+
+    details = {
+        "project_id": project_id,
+        "closure_id": closure_id,
+        "start": str(closure.start),
+        "end": str(closure.end),
+        "name": closure.name,
+    }
+    db.delete(closure)
+    db.commit()
+
+    log_protocol(
+        db,
+        request,
+        action="project.closure.delete",
+        ok=True,
+        status_code=204,
+        details=details,
+    )
+    return
+
+
 # --- Veze projekat ↔ korisnici ---------------------------------------------
 
 @router.get("/{project_id}/users", response_model=List[UserRead])
@@ -8,13 +8,37 @@ from app.crud import structure as crud
 from fastapi.encoders import jsonable_encoder
 from app.schemas.structure import Bauteil as BauteilSchema
 from app.core.protocol import log_protocol
-from app.models.project import Project
 from app.models.process import ProcessModel
+from app.models.task import Task
+from app.core.task_sync import record_tombstones
+from app.core.structure_denorm import refresh_task_structure, tops_under
+from app.core.structure_rollup import mark_rollup_dirty
+from app.core.project_counters import mark_counters_dirty
+from app.core.structure_closure import (
+    delete_node,
+    move_node,
+    node_project_id,
+    propagate_process_model,
+    structure_path,
+)
 
 
 
 router = APIRouter()
 
+_PARENT_MODELS = {"bauteil": Bauteil, "stiege": Stiege, "ebene": Ebene}
+_NOT_FOUND = {"bauteil": "Bauteil nicht gefunden", "stiege": "Stiege nicht gefunden", "ebene": "Ebene nicht gefunden"}
+
+
+def _move_target(db: Session, parent_level: str, parent_id: int, level: str, obj_id: int):
+    """Novi roditelj za premještanje – mora postojati i biti u istom projektu."""
+    parent = db.query(_PARENT_MODELS[parent_level]).get(parent_id)
+    if not parent:
+        raise HTTPException(status_code=404, detail=_NOT_FOUND[parent_level])
+    if node_project_id(db, parent_level, parent_id) != node_project_id(db, level, obj_id):
+        raise HTTPException(status_code=400, detail="Verschieben nur innerhalb desselben Projekts")
+    return parent
+
 
 
 @router.post("/bauteile")
@@ -77,16 +101,7 @@ def update_bauteil(
     db: Session = Depends(get_db),
     propagate: bool = Query(True),
 ):
-    bauteil = (
-        db.query(Bauteil)
-        .options(
-            joinedload(Bauteil.stiegen)
-            .joinedload(Stiege.ebenen)
-            .joinedload(Ebene.tops)
-        )
-        .filter(Bauteil.id == bauteil_id)
-        .first()
-    )
+    bauteil = db.query(Bauteil).filter(Bauteil.id == bauteil_id).first()
     if not bauteil:
         raise HTTPException(status_code=404, detail="Bauteil nicht gefunden")
 
@@ -108,17 +123,16 @@ def update_bauteil(
     if has_start_field:
         bauteil.start_soll = data.start_soll
 
+    # naziv ulazi u sort ključ (i nazive u timelineu) svih taskova ispod
+    if "name" in payload and old_name != bauteil.name:
+        refresh_task_structure(db, Task.top_id.in_(tops_under("bauteil", bauteil.id)))
+
     db.commit()
     db.refresh(bauteil)
 
-    # propagiraj PM na djecu SAMO kad je promijenjen
+    # propagiraj PM na djecu SAMO kad je promijenjen (closure → jedan UPDATE po nivou)
     if propagate and "process_model_id" in payload and data.process_model_id is not None:
-        for stiege in bauteil.stiegen:
-            stiege.process_model_id = data.process_model_id
-            for ebene in stiege.ebenen:
-                ebene.process_model_id = data.process_model_id
-                for top in ebene.tops:
-                    top.process_model_id = data.process_model_id
+        propagate_process_model(db, "bauteil", bauteil.id, data.process_model_id)
         db.commit()
 
     # nazivi starog i novog PM
@@ -145,12 +159,9 @@ def update_bauteil(
 
     pm_name = new_pm_name
 
-    # putanja: Projekt - Bauteil
-    project = db.query(Project).get(bauteil.project_id) if getattr(bauteil, "project_id", None) else None
-    project_name = project.name if project else None
-    bauteil_name = bauteil.name
-
-    bauteil_path = " - ".join([x for x in [project_name, bauteil_name] if x])
+    # putanja: Projekt - Bauteil (closure → jedan upit)
+    path = structure_path(db, "bauteil", bauteil.id)
+    bauteil_path = " - ".join([x for x in [path["project"], path["bauteil"]] if x])
 
     details: dict[str, object] = {
         "bauteil_path": bauteil_path,
@@ -181,12 +192,7 @@ def update_stiege(
     db: Session = Depends(get_db),
     propagate: bool = Query(True),
 ):
-    stiege = (
-        db.query(Stiege)
-        .options(joinedload(Stiege.ebenen).joinedload(Ebene.tops))
-        .filter(Stiege.id == stiege_id)
-        .first()
-    )
+    stiege = db.query(Stiege).filter(Stiege.id == stiege_id).first()
     if not stiege:
         raise HTTPException(status_code=404, detail="Stiege nicht gefunden")
 
@@ -209,15 +215,24 @@ def update_stiege(
     if has_start_field:
         stiege.start_soll = data.start_soll
 
+    # premještanje pod drugi Bauteil
+    old_parent = moved_to = None
+    if data.bauteil_id is not None and data.bauteil_id != stiege.bauteil_id:
+        moved_to = _move_target(db, "bauteil", data.bauteil_id, "stiege", stiege.id)
+        old_parent = db.query(Bauteil).get(stiege.bauteil_id)
+        stiege.bauteil_id = moved_to.id
+        move_node(db, "stiege", stiege.id, moved_to.id)
+
+    # naziv/roditelj ulaze u denormaliziranu strukturu svih taskova ispod
+    if ("name" in payload and old_name != stiege.name) or moved_to is not None:
+        refresh_task_structure(db, Task.top_id.in_(tops_under("stiege", stiege.id)))
+
     db.commit()
     db.refresh(stiege)
 
     # propagiraj process model na Ebenen/Tops SAMO ako je stvarno mijenjan
     if propagate and "process_model_id" in payload and data.process_model_id is not None:
-        for ebene in stiege.ebenen:
-            ebene.process_model_id = data.process_model_id
-            for top in ebene.tops:
-                top.process_model_id = data.process_model_id
+        propagate_process_model(db, "stiege", stiege.id, data.process_model_id)
         db.commit()
 
     # --- nazivi starog i novog PM-a ---
@@ -244,19 +259,16 @@ def update_stiege(
             "new": new_pm_name,
         }
 
+    if moved_to is not None:
+        changes["bauteil"] = {"old": getattr(old_parent, "name", None), "new": moved_to.name}
+
     # ime PM-a za tabelu ispod
     pm_name = new_pm_name
 
-    # složi "putanju": Projekt - Bauteil - Stiege
-    bauteil = db.query(Bauteil).get(stiege.bauteil_id) if getattr(stiege, "bauteil_id", None) else None
-    project = db.query(Project).get(bauteil.project_id) if bauteil and getattr(bauteil, "project_id", None) else None
-
-    project_name = project.name if project else None
-    bauteil_name = bauteil.name if bauteil else None
-    stiege_name = stiege.name
-
+    # složi "putanju": Projekt - Bauteil - Stiege (closure → jedan upit)
+    path = structure_path(db, "stiege", stiege.id)
     stiege_path = " - ".join(
-        [x for x in [project_name, bauteil_name, stiege_name] if x]
+        [x for x in [path["project"], path["bauteil"], path["stiege"]] if x]
     )
 
     # --- details za log ---
@@ -288,12 +300,7 @@ def update_ebene(
     db: Session = Depends(get_db),
     propagate: bool = Query(True),
 ):
-    ebene = (
-        db.query(Ebene)
-        .options(joinedload(Ebene.tops))
-        .filter(Ebene.id == ebene_id)
-        .first()
-    )
+    ebene = db.query(Ebene).filter(Ebene.id == ebene_id).first()
     if not ebene:
         raise HTTPException(status_code=404, detail="Ebene nicht gefunden")
 
@@ -316,13 +323,24 @@ def update_ebene(
     if has_start_field:
         ebene.start_soll = data.start_soll
 
+    # premještanje pod drugu Stiege
+    old_parent = moved_to = None
+    if data.stiege_id is not None and data.stiege_id != ebene.stiege_id:
+        moved_to = _move_target(db, "stiege", data.stiege_id, "ebene", ebene.id)
+        old_parent = db.query(Stiege).get(ebene.stiege_id)
+        ebene.stiege_id = moved_to.id
+        move_node(db, "ebene", ebene.id, moved_to.id)
+
+    # naziv/roditelj ulaze u denormaliziranu strukturu svih taskova ispod
+    if ("name" in payload and old_name != ebene.name) or moved_to is not None:
+        refresh_task_structure(db, Task.top_id.in_(tops_under("ebene", ebene.id)))
+
     db.commit()
     db.refresh(ebene)
 
     # propagiraj process model na TOP-ove SAMO ako je stvarno mijenjan
     if propagate and "process_model_id" in payload and data.process_model_id is not None:
-        for top in ebene.tops:
-            top.process_model_id = data.process_model_id
+        propagate_process_model(db, "ebene", ebene.id, data.process_model_id)
         db.commit()
 
     # --- PM nazivi (stari/novi) za diff ---
@@ -349,21 +367,16 @@ def update_ebene(
             "new": new_pm_name,
         }
 
+    if moved_to is not None:
+        changes["stiege"] = {"old": getattr(old_parent, "name", None), "new": moved_to.name}
+
     # ime PM-a za tabelu ispod
     pm_name = new_pm_name
 
-    # složi putanju Projekt-Bauteil-Stiege-Ebene
-    stiege = db.query(Stiege).get(ebene.stiege_id) if getattr(ebene, "stiege_id", None) else None
-    bauteil = db.query(Bauteil).get(stiege.bauteil_id) if stiege and getattr(stiege, "bauteil_id", None) else None
-    project = db.query(Project).get(bauteil.project_id) if bauteil and getattr(bauteil, "project_id", None) else None
-
-    project_name = project.name if project else None
-    bauteil_name = bauteil.name if bauteil else None
-    stiege_name = stiege.name if stiege else None
-    ebene_name = ebene.name
-
+    # složi putanju Projekt-Bauteil-Stiege-Ebene (closure → jedan upit)
+    path = structure_path(db, "ebene", ebene.id)
     ebene_path = " - ".join(
-        [x for x in [project_name, bauteil_name, stiege_name, ebene_name] if x]
+        [x for x in [path["project"], path["bauteil"], path["stiege"], path["ebene"]] if x]
     )
 
     # --- details za log ---
@@ -424,6 +437,18 @@ def update_top(
     if had_start_field:
         obj.start_soll = data.start_soll
 
+    # premještanje pod drugu Ebene
+    old_parent = moved_to = None
+    if data.ebene_id is not None and data.ebene_id != obj.ebene_id:
+        moved_to = _move_target(db, "ebene", data.ebene_id, "top", obj.id)
+        old_parent = db.query(Ebene).get(obj.ebene_id)
+        obj.ebene_id = moved_to.id
+        move_node(db, "top", obj.id, moved_to.id)
+
+    # naziv/roditelj ulaze u denormaliziranu strukturu svih taskova ispod
+    if ("name" in payload and old_name != obj.name) or moved_to is not None:
+        refresh_task_structure(db, Task.top_id.in_(tops_under("top", obj.id)))
+
     db.commit()
     db.refresh(obj)
 
@@ -451,21 +476,15 @@ def update_top(
             "new": pm_name,
         }
 
+    if moved_to is not None:
+        changes["ebene"] = {"old": getattr(old_parent, "name", None), "new": moved_to.name}
+
     # da li se išta promijenilo (datum, model ili ime)
     any_change = bool(changes) or (old_name != obj.name)
 
-    # složi putanju Projekt - Bauteil - Stiege - Top
-    ebene = db.query(Ebene).get(obj.ebene_id) if getattr(obj, "ebene_id", None) else None
-    stiege = db.query(Stiege).get(ebene.stiege_id) if ebene and getattr(ebene, "stiege_id", None) else None
-    bauteil = db.query(Bauteil).get(stiege.bauteil_id) if stiege and getattr(stiege, "bauteil_id", None) else None
-    project = db.query(Project).get(bauteil.project_id) if bauteil and getattr(bauteil, "project_id", None) else None
-
-    project_name = project.name if project else None
-    bauteil_name = bauteil.name if bauteil else None
-    stiege_name = stiege.name if stiege else None
-    top_name = obj.name
-
-    top_path = " - ".join([x for x in [project_name, bauteil_name, stiege_name, top_name] if x])
+    # složi putanju Projekt - Bauteil - Stiege - Top (closure → jedan upit)
+    path = structure_path(db, "top", obj.id)
+    top_path = " - ".join([x for x in [path["project"], path["bauteil"], path["stiege"], path["top"]] if x])
 
     # --- details koje šaljemo u protokol ---
     if not any_change:
@@ -496,6 +515,11 @@ def delete_bauteil(bauteil_id: int, request: Request, db: Session = Depends(get_
     obj = db.query(Bauteil).get(bauteil_id)
     if not obj:
         raise HTTPException(status_code=404, detail="Bauteil nicht gefunden")
+    # taskovi odlaze kaskadno u bazi → tombstone za delta sync
+    record_tombstones(db, Task.top_id.in_(tops_under("bauteil", bauteil_id)))
+    mark_rollup_dirty(db, Task.top_id.in_(tops_under("bauteil", bauteil_id)))
+    mark_counters_dirty(db, Task.top_id.in_(tops_under("bauteil", bauteil_id)))
+    delete_node(db, "bauteil", bauteil_id)
     db.delete(obj)
     db.commit()
     log_protocol(db, request, action="structure.bauteil.delete", ok=True, status_code=204, details={"bauteil_id": bauteil_id})
@@ -506,6 +530,10 @@ def delete_stiege(stiege_id: int, request: Request, db: Session = Depends(get_db
     obj = db.query(Stiege).get(stiege_id)
     if not obj:
         raise HTTPException(status_code=404, detail="Stiege nicht gefunden")
+    record_tombstones(db, Task.top_id.in_(tops_under("stiege", stiege_id)))
+    mark_rollup_dirty(db, Task.top_id.in_(tops_under("stiege", stiege_id)))
+    mark_counters_dirty(db, Task.top_id.in_(tops_under("stiege", stiege_id)))
+    delete_node(db, "stiege", stiege_id)
     db.delete(obj)
     db.commit()
     log_protocol(db, request, action="structure.stiege.delete", ok=True, status_code=204, details={"stiege_id": stiege_id})
@@ -516,6 +544,10 @@ def delete_ebene(ebene_id: int, request: Request, db: Session = Depends(get_db))
     obj = db.query(Ebene).get(ebene_id)
     if not obj:
         raise HTTPException(status_code=404, detail="Ebene nicht gefunden")
+    record_tombstones(db, Task.top_id.in_(tops_under("ebene", ebene_id)))
+    mark_rollup_dirty(db, Task.top_id.in_(tops_under("ebene", ebene_id)))
+    mark_counters_dirty(db, Task.top_id.in_(tops_under("ebene", ebene_id)))
+    delete_node(db, "ebene", ebene_id)
     db.delete(obj)
     db.commit()
     log_protocol(db, request, action="structure.ebene.delete", ok=True, status_code=204, details={"ebene_id": ebene_id})
@@ -526,6 +558,10 @@ def delete_top(top_id: int, request: Request, db: Session = Depends(get_db)):
     obj = db.query(Top).get(top_id)
     if not obj:
         raise HTTPException(status_code=404, detail="Top nicht gefunden")
+    record_tombstones(db, Task.top_id.in_(tops_under("top", top_id)))
+    mark_rollup_dirty(db, Task.top_id.in_(tops_under("top", top_id)))
+    mark_counters_dirty(db, Task.top_id.in_(tops_under("top", top_id)))
+    delete_node(db, "top", top_id)
     db.delete(obj)
     db.commit()
     log_protocol(db, request, action="structure.top.delete", ok=True, status_code=204, details={"top_id": top_id})
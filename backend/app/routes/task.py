@@ -1,8 +1,9 @@
 
 from fastapi import Request
 from fastapi import APIRouter, Depends, HTTPException, Response, Query, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session, joinedload, load_only
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models.task import Task
 from app.models.aktivitaet_question import TaskCheckAnswer
 from app.schemas.aktivitaet_question import TaskCheckAnswerCreate, TaskCheckAnswerRead
@@ -10,16 +11,44 @@ from app.models.aktivitaet import Aktivitaet
 from app.models.aktivitaet_question import AktivitaetQuestion
 from app.schemas.aktivitaet_question import AktivitaetQuestionRead
 from app.models.structure import Top, Ebene, Stiege, Bauteil
-from app.models.process import ProcessStep, ProcessModel
-from app.models.gewerk import Gewerk
+from app.models.process import ProcessStep
 from app.models.project import Project
 from app.models.user import User 
-from app.schemas.task import TaskCreate, TaskRead, TaskUpdate, TimelineTask
+from app.schemas.task import TaskBatchRequest, TaskCreate, TaskRead, TaskUpdate, TimelineTask
 from app.schemas.bulk import BulkBody, BulkFilters, BulkUpdate
 from typing import List, Dict
 from datetime import date, timedelta, datetime
-from sqlalchemy import func, select, or_, and_, case, cast, Integer
+from sqlalchemy import func, select, update, or_, case, cast, Integer, true
 from app.core.protocol import compute_diff, log_protocol
+from app.core.timeline_columnar import TimelineColumnarEncoder
+from app.core.task_sync import current_revision, revision_values, record_tombstones
+from app.core.structure_rollup import mark_rollup_dirty
+from app.core.project_counters import mark_counters_dirty, project_counts
+from app.core.task_table import (
+    DEFAULT_SORT as TABLE_DEFAULT_SORT,
+    DEFAULT_LIMIT as TABLE_DEFAULT_LIMIT,
+    MAX_LIMIT as TABLE_MAX_LIMIT,
+    SORT_COLUMNS as TABLE_SORT_COLUMNS,
+    table_page,
+)
+from app.core.task_filters import task_filter_criteria
+from app.core.work_calendar import chain_template, ensure_work_calendar, project_calendar, shifted_day_expr
+from app.core.task_propagation import propagate_successors
+from app.core.task_bulk import insert_tasks, update_tasks
+from app.core.effective_model import effective_model, effective_models_select
+from app.core.structure_denorm import project_structure_names, task_location_names
+from app.core.natural_sort import natural_key
+from app.core.task_export import stream_csv, stream_xlsx, xlsx_available
+from app.core.task_stats import (
+    project_stats as compute_project_stats,
+    project_status_stats,
+    progress_curve,
+    snapshot_project_stats,
+    snapshot_stats,
+    stats_history,
+)
+from app.deps import require_admin
+from app.models.task import TaskTombstone
 from pydantic import BaseModel
 from typing import Optional
 
@@ -27,29 +56,6 @@ from typing import Optional
 today = date.today()
 router = APIRouter()
 
-def _task_location_str_from_top(top) -> str | None:
-    """
-    Vrati string: 'Bauteil • Stiege • Ebene • Top' ili None ako nema hijerarhije.
-    """
-    if not top:
-        return None
-    ebene = top.ebene
-    stiege = ebene.stiege if ebene else None
-    bauteil = stiege.bauteil if stiege else None
-
-    parts: list[str] = []
-    if bauteil and bauteil.name:
-        parts.append(bauteil.name)
-    if stiege and stiege.name:
-        parts.append(stiege.name)
-    if ebene and ebene.name:
-        parts.append(ebene.name)
-    if top.name:
-        parts.append(top.name)
-
-    return " • ".join(parts) if parts else None
-
-
 def _to_date(v):
     if v is None: return None
     if isinstance(v, date) and not isinstance(v, datetime): return v
@@ -60,40 +66,16 @@ def _to_date(v):
         except Exception: return None
     return None
 
-def is_weekend(d: date) -> bool:
-    return d.weekday() >= 5  # 5=Sub, 6=Ned
-
-def next_workday(d: date) -> date:
-    while is_weekend(d):
-        d += timedelta(days=1)
-    return d
-
-def add_workdays(start: date, days: int) -> date:
-    """Vrati zadnji radni dan intervala dužine 'days'.
-       start se računa kao 1. radni dan (inkluzivan)."""
-    d = next_workday(start)
-    remaining = max(1, days) - 1
-    while remaining > 0:
-        d += timedelta(days=1)
-        if not is_weekend(d):
-            remaining -= 1
-    return d
-
-
-# We'll create a condition for delayed tasks
-  # Condition 1: task is not done (end_ist is null) and end_soll < today
-  # Condition 2: task is done but end_ist > end_soll
-delayed_condition = or_(
-    and_(Task.end_ist.is_(None), Task.end_soll < today),
-    Task.end_ist > Task.end_soll
-)
 
-STATUS_CHOICES = ("Erledigt", "In Bearbeitung", "Offen")
 
 @router.get("/projects/{project_id}/tasks-count")
-def tasks_count(project_id: int, db: Session = Depends(get_db)):
-    total = db.query(func.count()).select_from(Task).filter(Task.project_id == project_id).scalar() or 0
-    return {"total": int(total)}
+def tasks_count(
+    project_id: int,
+    sub_id: Optional[int] = Query(None, description="samo taskovi ovog suba (0 = bez suba)"),
+    db: Session = Depends(get_db),
+):
+    # iz project_counters (app/core/project_counters.py) – bez COUNT(*) nad taskovima
+    return project_counts(db, project_id, sub_id)
 
 
 @router.post("/tasks", response_model=TaskRead, status_code=201)
@@ -113,11 +95,62 @@ def list_tasks(db: Session = Depends(get_db)):
 from fastapi import Response
 import time
 
-@router.get("/projects/{project_id}/tasks-timeline", response_model=List[TimelineTask])
-def project_tasks_timeline(
-    project_id: int,
-    response: Response,
-    db: Session = Depends(get_db),
+def _timeline_options():
+    """Eager-load opcije za TimelineTask redove (timeline + delta sync)."""
+    return (
+        joinedload(Task.process_step).joinedload(ProcessStep.gewerk),
+        joinedload(Task.process_step).joinedload(ProcessStep.model),
+        joinedload(Task.sub),
+        load_only(
+            Task.id, Task.project_id, Task.top_id, Task.process_step_id,
+            Task.bauteil_id, Task.stiege_id, Task.ebene_id,
+            Task.start_soll, Task.end_soll, Task.start_ist, Task.end_ist,
+            Task.beschreibung, Task.sub_id
+        ),
+    )
+
+
+def _timeline_row(t: Task, names: dict[str, dict[int, str]]) -> dict:
+    """
+    Jedan red za /tasks-timeline (isti ključevi kao TimelineTask).
+    `names` = project_structure_names() – nazivi po denormaliziranim id-evima.
+    """
+    top_name = names["top"].get(t.top_id)
+
+    step = t.process_step
+    model = step.model if step else None
+    gewerk_obj = step.gewerk if step else None
+
+    wohnung = top_name or (f"Top-{t.top_id}" if t.top_id is not None else None)
+    farbe = getattr(gewerk_obj, "color", "#cccccc")
+    gewerk_name = getattr(gewerk_obj, "name", "Unbekannt")
+    sub_user = t.sub if t.sub_id else None
+
+    return dict(
+        id=t.id,
+        task=step.activity if step else None,
+        wohnung=wohnung,
+        start_soll=t.start_soll,
+        end_soll=t.end_soll,
+        start_ist=t.start_ist,
+        end_ist=t.end_ist,
+        farbe=farbe,
+        gewerk_name=gewerk_name,
+        top=top_name,
+        ebene=names["ebene"].get(t.ebene_id),
+        stiege=names["stiege"].get(t.stiege_id),
+        bauteil=names["bauteil"].get(t.bauteil_id),
+        process_step_id=step.id if step else None,
+        process_model=(model.name if model else None),
+        beschreibung=t.beschreibung,
+        sub_id=sub_user.id if sub_user else None,
+        sub_name=sub_user.name if sub_user else None,
+        top_id=t.top_id,
+        project_id=t.project_id,
+    )
+
+
+def timeline_query_filters(
     gewerk: List[str] = Query(None),
     startDate: str = Query(None),
     endDate: str = Query(None),
@@ -129,100 +162,52 @@ def project_tasks_timeline(
     stiege: List[str] = Query(None),
     bauteil: List[str] = Query(None),
     activity: List[str] = Query(None),
-    processModel: List[str] = Query(None)
+    processModel: List[str] = Query(None),
+    topIds: List[int] = Query(None, alias="topId"),
+) -> BulkFilters:
+    """Query parametri timeline filtera → BulkFilters (timeline, tasks-tabelle)."""
+    return BulkFilters(
+        gewerk=gewerk or [],
+        status=statuses or [],
+        startDate=datetime.strptime(startDate, "%Y-%m-%d").date() if startDate else None,
+        endDate=datetime.strptime(endDate, "%Y-%m-%d").date() if endDate else None,
+        delayed=delayed,
+        taskName=taskName,
+        tops=top or [],
+        ebenen=ebene or [],
+        stiegen=stiege or [],
+        bauteile=bauteil or [],
+        activities=activity or [],
+        processModels=processModel or [],
+        topIds=topIds or None,
+    )
+
+
+@router.get("/projects/{project_id}/tasks-timeline", response_model=List[TimelineTask])
+def project_tasks_timeline(
+    project_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    filters: BulkFilters = Depends(timeline_query_filters),
+    fmt: str = Query("rows", alias="format"),  # "rows" | "columnar"
 ):
     t0 = time.perf_counter()
+    columnar = fmt == "columnar"
 
-    # Osnovni query s joinovima
+    # Osnovni query – struktura NIJE joinana (nazivi idu preko denormaliziranih id-eva)
     q = (
         db.query(Task)
         .filter(Task.project_id == project_id)
-        .options(
-            joinedload(Task.top)
-                .joinedload(Top.ebene)
-                .joinedload(Ebene.stiege)
-                .joinedload(Stiege.bauteil),
-            joinedload(Task.process_step).joinedload(ProcessStep.gewerk),
-            joinedload(Task.process_step).joinedload(ProcessStep.model),
-            joinedload(Task.sub),
-            load_only(
-                Task.id, Task.project_id, Task.top_id, Task.process_step_id,
-                Task.start_soll, Task.end_soll, Task.start_ist, Task.end_ist,
-                Task.beschreibung, Task.sub_id
-            ),
-        )
+        .options(*_timeline_options())
     )
 
-    # Primjeni filtere
-    if gewerk:
-        q = q.join(Task.process_step).join(ProcessStep.gewerk).filter(Gewerk.name.in_(gewerk))
-    
-    if startDate:
-        start_date = datetime.strptime(startDate, "%Y-%m-%d").date()
-        q = q.filter(Task.end_soll >= start_date)
-    
-    if endDate:
-        end_date = datetime.strptime(endDate, "%Y-%m-%d").date()
-        q = q.filter(Task.start_soll <= end_date)
-    
-    if statuses:
-        status_conditions = []
-        if "Erledigt" in statuses:
-            status_conditions.append(Task.end_ist.isnot(None))
-        if "In Bearbeitung" in statuses:
-            status_conditions.append(and_(Task.start_ist.isnot(None), Task.end_ist.is_(None)))
-        if "Offen" in statuses:
-            status_conditions.append(and_(Task.start_ist.is_(None), Task.end_ist.is_(None)))
-
-        if status_conditions:
-            q = q.filter(or_(*status_conditions))
-    
-    if delayed:
-        today = date.today()
-        q = q.filter(
-            or_(
-                and_(Task.end_ist.is_(None), Task.end_soll < today),
-                Task.end_ist > Task.end_soll
-            )
-        )
-    
-    if taskName:
-        q = q.join(Task.process_step).filter(ProcessStep.activity.ilike(f"%{taskName}%"))
-    
-    if top:
-        q = q.join(Task.top).filter(Top.name.in_(top))
-    
-    if ebene:
-        q = q.join(Task.top).join(Top.ebene).filter(Ebene.name.in_(ebene))
-    
-    if stiege:
-        q = q.join(Task.top).join(Top.ebene).join(Ebene.stiege).filter(Stiege.name.in_(stiege))
-    
-    if bauteil:
-        q = q.join(Task.top).join(Top.ebene).join(Ebene.stiege).join(Stiege.bauteil).filter(Bauteil.name.in_(bauteil))
-    
-    if activity:
-        q = q.join(Task.process_step).filter(ProcessStep.activity.in_(activity))
-    
-    if processModel:
-        q = q.join(Task.process_step).join(ProcessStep.model).filter(ProcessModel.name.in_(processModel))
-    
+    # Primjeni filtere (zajednički compiler – bez dodatnih joinova)
+    q = q.filter(*task_filter_criteria(filters))
+
     # 🔽🔽🔽 SORT 🔽🔽🔽
-    q = (
-        q.outerjoin(Task.top)
-         .outerjoin(Top.ebene)
-         .outerjoin(Ebene.stiege)
-         .outerjoin(Stiege.bauteil)
-         .order_by(
-             Bauteil.name.is_(None),  # prvo oni koji imaju bauteil
-             Bauteil.name,            # A, B, C...
-             Stiege.name.is_(None),
-             Stiege.name,             # Stiege 1, Stiege 2...
-             Ebene.name.is_(None),
-             Ebene.name,              # Ebene 1, Ebene 2...
-             Top.name                 # Top 1, Top 2, Top 10 (po abecedi/stringu)
-         )
-    )
+    # prirodni redoslijed Bauteil/Stiege/Ebene/Top ("Top 2" < "Top 10") iz
+    # denormaliziranog ključa → index (project_id, sort_key), bez joina i sorta
+    q = q.order_by(Task.sort_key, Task.id)
     # 🔼🔼🔼 End SORT 🔼🔼🔼
 
     q = q.execution_options(stream_results=True)
@@ -233,72 +218,100 @@ def project_tasks_timeline(
     t_fetch_ms = (time.perf_counter() - t_fetch_start) * 1000.0
 
     t_build_start = time.perf_counter()
+    names = project_structure_names(db, project_id)
     result: list[TimelineTask] = []
+    encoder = TimelineColumnarEncoder() if columnar else None
     for t in tasks:
-        top = t.top
-        ebene = top.ebene if top else None
-        stiege = ebene.stiege if ebene else None
-        bauteil = stiege.bauteil if stiege else None
-
-        step = t.process_step
-        model = step.model if step else None
-        gewerk_obj = step.gewerk if step else None
-
-        wohnung = (top.name if (top and top.name) else (f"Top-{top.id}" if top else None))
-        farbe = getattr(gewerk_obj, "color", "#cccccc")
-        gewerk_name = getattr(gewerk_obj, "name", "Unbekannt")
-        sub_user = t.sub if t.sub_id else None
-
-        result.append(TimelineTask(
-            id=t.id,
-            task=step.activity if step else None,
-            wohnung=wohnung,
-            start_soll=t.start_soll,
-            end_soll=t.end_soll,
-            start_ist=t.start_ist,
-            end_ist=t.end_ist,
-            farbe=farbe,
-            gewerk_name=gewerk_name,
-            top=top.name if top else None,
-            ebene=ebene.name if ebene else None,
-            stiege=stiege.name if stiege else None,
-            bauteil=bauteil.name if bauteil else None,
-            process_step_id=step.id if step else None,
-            process_model=(model.name if model else None),
-            beschreibung=t.beschreibung,
-            sub_id=sub_user.id if sub_user else None,
-            sub_name=sub_user.name if sub_user else None,
-            top_id=t.top_id,
-            project_id=t.project_id,
-        ))
+        row = _timeline_row(t, names)
+        if encoder is not None:
+            encoder.append(row)
+        else:
+            result.append(TimelineTask(**row))
     t_build_ms = (time.perf_counter() - t_build_start) * 1000.0
 
-    response.headers["X-Items"] = str(len(result))
-    response.headers["X-FetchMs"] = f"{t_fetch_ms:.1f}"
-    response.headers["X-BuildMs"] = f"{t_build_ms:.1f}"
+    # revizija s kojom klijent poslije zove /tasks/changes?since=...
+    revision = current_revision(db, project_id)
+
+    timing_headers = {
+        "X-Items": str(len(tasks)),
+        "X-FetchMs": f"{t_fetch_ms:.1f}",
+        "X-BuildMs": f"{t_build_ms:.1f}",
+        "X-Revision": str(revision),
+    }
 
+    # kolonarni format zaobilazi response_model (drugi oblik payloada)
+    if encoder is not None:
+        payload = encoder.payload()
+        payload["revision"] = revision
+        return ORJSONResponse(payload, headers=timing_headers)
+
+    response.headers.update(timing_headers)
     return result
 
 
+@router.get("/projects/{project_id}/tasks/changes")
+def project_task_changes(
+    project_id: int,
+    since: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Delta sync: taskovi promijenjeni/obrisani nakon revizije `since`.
+    Klijent prvo primijeni `deletes`, pa `upserts` (TimelineTask redovi),
+    i zapamti `revision` za sljedeći poziv.
+    """
+    revision = current_revision(db, project_id)
+
+    # klijent ima reviziju koju server ne poznaje (npr. druga baza) → sve ispočetka
+    if since > revision:
+        return {
+            "project_id": project_id,
+            "since": since,
+            "revision": revision,
+            "full_resync": True,
+            "upserts": [],
+            "deletes": [],
+        }
+
+    tasks = (
+        db.query(Task)
+        .filter(Task.project_id == project_id, Task.revision > since)
+        .options(*_timeline_options())
+        .order_by(Task.revision, Task.id)
+        .all()
+    )
+    names = project_structure_names(db, project_id)
+    upserts = [_timeline_row(t, names) for t in tasks]
+
+    # SQLite može ponovo iskoristiti id obrisanog taska → takav id nije "delete"
+    upsert_ids = {t.id for t in tasks}
+    deletes = [
+        task_id
+        for (task_id,) in db.query(TaskTombstone.task_id)
+        .filter(TaskTombstone.project_id == project_id, TaskTombstone.revision > since)
+        .order_by(TaskTombstone.revision)
+        .distinct()
+        if task_id not in upsert_ids
+    ]
+
+    return {
+        "project_id": project_id,
+        "since": since,
+        "revision": revision,
+        "full_resync": False,
+        "upserts": upserts,
+        "deletes": deletes,
+    }
+
+
 @router.get("/projects/{project_id}/has-tasks", response_model=bool)
 def has_tasks(project_id: int, db: Session = Depends(get_db)):
-    count = db.query(Task).filter(Task.project_id == project_id).count()
-    return count > 0
+    return project_counts(db, project_id)["total"] > 0
 
 
 def find_process_model(top: Top, db: Session):
-    if top.process_model_id:
-        return db.query(ProcessModel).filter_by(id=top.process_model_id).first()
-    ebene = db.query(Ebene).filter_by(id=top.ebene_id).first()
-    if ebene and ebene.process_model_id:
-        return db.query(ProcessModel).filter_by(id=ebene.process_model_id).first()
-    stiege = db.query(Stiege).filter_by(id=ebene.stiege_id).first() if ebene else None
-    if stiege and stiege.process_model_id:
-        return db.query(ProcessModel).filter_by(id=stiege.process_model_id).first()
-    bauteil = db.query(Bauteil).filter_by(id=stiege.bauteil_id).first() if stiege else None
-    if bauteil and bauteil.process_model_id:
-        return db.query(ProcessModel).filter_by(id=bauteil.process_model_id).first()
-    return None
+    # najbliži model uzlazno Top→Ebene→Stiege→Bauteil – jedan upit (app/core/effective_model.py)
+    return effective_model(db, top.id)
 
 
 
@@ -320,24 +333,21 @@ async def sync_tasks(project_id: int, request: Request, db: Session = Depends(ge
     purge_top_ids = (payload or {}).get("purge_top_ids") or []
     top_ids = filters.get("topIds") or []
 
-    # 2) svi topovi u projektu (suženo po filterima)
-    tops_q = (
-        db.query(Top)
-        .join(Ebene)
-        .join(Stiege)
-        .join(Bauteil)
-        .filter(Bauteil.project_id == project_id)
+    # 2) svi topovi u projektu (suženo po filterima) s efektivnim process modelom
+    #    i nazivima hijerarhije za log – jedan upit
+    tops_q = effective_models_select(
+        Top.name, Ebene.name, Stiege.name, Bauteil.name, project_id=project_id,
     )
     if top_ids:
         try:
             top_ids = [int(x) for x in top_ids]
         except Exception:
             pass
-        tops_q = tops_q.filter(Top.id.in_(top_ids))
-    tops = tops_q.all()
+        tops_q = tops_q.where(Top.id.in_(top_ids))
+    tops = db.execute(tops_q).all()
 
     # ograniči purge na već filtrirane TOP-ove (sigurnosna brana)
-    allowed_top_ids = {t.id for t in tops}
+    allowed_top_ids = {t.top_id for t in tops}
     safe_purge_ids = [
         tid for tid in purge_top_ids
         if tid in allowed_top_ids and str(tid) not in start_map_top
@@ -345,35 +355,74 @@ async def sync_tasks(project_id: int, request: Request, db: Session = Depends(ge
 
     # PURGE: obriši sve taskove za topove bez datuma (ili kojima je datum obrisan)
     if safe_purge_ids:
-        db.query(Task).filter(
+        purge_criteria = (
             Task.project_id == project_id,
-            Task.top_id.in_(safe_purge_ids)
-        ).delete(synchronize_session=False)
+            Task.top_id.in_(safe_purge_ids),
+        )
+        record_tombstones(db, *purge_criteria)
+        mark_rollup_dirty(db, *purge_criteria)
+        mark_counters_dirty(db, *purge_criteria)
+        db.query(Task).filter(*purge_criteria).delete(synchronize_session=False)
+
+    # koraci svih modela – jedan upit (model bez koraka ne pravi ništa)
+    steps_by_model: dict[int, list] = {}
+    wanted = {t.process_model_id for t in tops if t.process_model_id}
+    if wanted:
+        for step in db.execute(
+            select(
+                ProcessStep.id, ProcessStep.model_id, ProcessStep.order,
+                ProcessStep.activity, ProcessStep.parallel, ProcessStep.duration_days,
+            )
+            .where(ProcessStep.model_id.in_(wanted))
+            .order_by(ProcessStep.order, ProcessStep.id)
+        ):
+            steps_by_model.setdefault(step.model_id, []).append(step)
+
+    # redoslijed koraka + šablon rasporeda jednom po modelu (app/core/work_calendar.py)
+    for pm_id, steps in steps_by_model.items():
+        steps_by_model[pm_id] = sorted(
+            steps,
+            key=lambda s: (s.order if s.order is not None else s.id),
+        )
+    templates = {
+        pm_id: chain_template((step.duration_days or 1, step.parallel) for step in steps)
+        for pm_id, steps in steps_by_model.items()
+    }
 
-    created_tasks: list[Task] = []
-    updated_task_ids: list[int] = []
+    # postojeći taskovi tih TOP-ova (poslije purge-a) – jedan upit
+    tasks_by_top: dict[int, dict[int, tuple]] = {}
+    if tops:
+        for row in db.execute(
+            select(
+                Task.id, Task.top_id, Task.process_step_id,
+                Task.start_soll, Task.end_soll, Task.start_ist,
+            )
+            .where(Task.top_id.in_(tops_q.with_only_columns(Top.id).scalar_subquery()))
+            .order_by(Task.id)
+        ):
+            tasks_by_top.setdefault(row.top_id, {})[row.process_step_id] = row
+
+    # radni dani projekta: vikendi + praznici + zatvaranja (app/core/work_calendar.py)
+    cal = project_calendar(db, project_id)
+
+    new_rows: list[dict] = []
+    updated_rows: list[dict] = []
     all_changes: list[dict] = []
 
-    # 3) za svaki TOP regeneriraj/generiraj taskove iz process modela
-    for top in tops:
-        model = find_process_model(top, db)
-        if not model:
+    # 3) za svaki TOP regeneriraj/generiraj taskove iz process modela (diff u memoriji)
+    for (top_id, pm_id, _, top_name, ebene_name, stiege_name, bauteil_name) in tops:
+        steps = steps_by_model.get(pm_id)
+        if not steps:
             continue
 
-        # hijerarhija radi loga
-        ebene = db.query(Ebene).get(top.ebene_id) if getattr(top, "ebene_id", None) else None
-        stiege = ebene.stiege if ebene else None
-        bauteil = stiege.bauteil if stiege else None
-
-        existing_tasks = db.query(Task).filter_by(top_id=top.id).all()
-        existing_task_map = {t.process_step_id: t for t in existing_tasks}
+        existing_task_map = tasks_by_top.get(top_id, {})
 
         # ******** NOVO – fallback za nove TOP-ove ********
-        base_str = start_map_top.get(str(top.id))
+        base_str = start_map_top.get(str(top_id))
 
         # ako mapa NEMA datum za ovaj top
         if not base_str:
-            if existing_tasks:
+            if existing_task_map:
                 # ima već taskove → ne diramo (nema razloga mijenjati bez datuma)
                 continue
             # nema taskova → pokušaj koristiti start_date projekta
@@ -387,7 +436,7 @@ async def sync_tasks(project_id: int, request: Request, db: Session = Depends(ge
                 base_date = date.fromisoformat(base_str[:10])
             except Exception:
                 # loš format → ako ima taskove, preskoči; ako nema, opet probaj projekt
-                if existing_tasks:
+                if existing_task_map:
                     continue
                 if project.start_date:
                     base_date = project.start_date
@@ -395,94 +444,79 @@ async def sync_tasks(project_id: int, request: Request, db: Session = Depends(ge
                     continue
         # ******** kraj NOVOG dijela ********
 
-        current_date = next_workday(base_date)
+        schedule = cal.schedule(templates[pm_id], base_date)
 
-        steps = sorted(
-            model.steps,
-            key=lambda s: (s.order if s.order is not None else s.id),
-        )
-
-        for step in steps:
-            duration = step.duration_days or 1
-            start_soll = next_workday(current_date)
-            end_soll = add_workdays(start_soll, duration)
-
-            location = {
-                "project": project.name,
-                "bauteil": bauteil.name if bauteil else None,
-                "stiege": stiege.name if stiege else None,
-                "ebene": ebene.name if ebene else None,
-                "top": top.name,
-            }
+        # hijerarhija radi loga
+        location = {
+            "project": project.name,
+            "bauteil": bauteil_name,
+            "stiege": stiege_name,
+            "ebene": ebene_name,
+            "top": top_name,
+        }
 
+        for step, (start_soll, end_soll) in zip(steps, schedule):
             task = existing_task_map.get(step.id)
-            change_entry: dict | None = None
 
             if not task:
                 # 👉 NOVI TASK ZA OVAJ KORAK
-                task = Task(
-                    project_id=project_id,
-                    top_id=top.id,
-                    process_step_id=step.id,
-                    start_soll=start_soll,
-                    end_soll=end_soll,
-                )
-                db.add(task)
-                created_tasks.append(task)
-
-                change_entry = {
+                new_rows.append({
+                    "top_id": top_id,
+                    "process_step_id": step.id,
+                    "start_soll": start_soll,
+                    "end_soll": end_soll,
+                    "status": "offen",
+                })
+                all_changes.append({
                     "task_id": None,
                     "task_name": step.activity,
                     "location": location,
                     "start_soll": {"old": None, "new": str(start_soll)},
                     "end_soll": {"old": None, "new": str(end_soll)},
-                }
-            else:
-                # 👉 postojeći task – update samo ako još nije krenuo
-                if task.start_ist is None:
-                    start_changed = task.start_soll != start_soll
-                    end_changed = task.end_soll != end_soll
-
-                    if start_changed or end_changed:
-                        change_entry = {
-                            "task_id": task.id,
-                            "task_name": task.process_step.activity if task.process_step else None,
-                            "location": location,
-                            "start_soll": {
-                                "old": str(task.start_soll) if task.start_soll else None,
-                                "new": str(start_soll),
-                            } if start_changed else None,
-                            "end_soll": {
-                                "old": str(task.end_soll) if task.end_soll else None,
-                                "new": str(end_soll),
-                            } if end_changed else None,
-                        }
-
-                        task.start_soll = start_soll
-                        task.end_soll = end_soll
-                        updated_task_ids.append(task.id)
-                        db.add(task)
-
-            if change_entry:
-                all_changes.append(change_entry)
-
-            if not getattr(step, "parallel", False):
-                current_date = end_soll + timedelta(days=1)
+                })
+                continue
 
+            # 👉 postojeći task – update samo ako još nije krenuo
+            if task.start_ist is not None:
+                continue
+            start_changed = task.start_soll != start_soll
+            end_changed = task.end_soll != end_soll
+            if not (start_changed or end_changed):
+                continue
+
+            all_changes.append({
+                "task_id": task.id,
+                "task_name": step.activity,
+                "location": location,
+                "start_soll": {
+                    "old": str(task.start_soll) if task.start_soll else None,
+                    "new": str(start_soll),
+                } if start_changed else None,
+                "end_soll": {
+                    "old": str(task.end_soll) if task.end_soll else None,
+                    "new": str(end_soll),
+                } if end_changed else None,
+            })
+            updated_rows.append({"id": task.id, "start_soll": start_soll, "end_soll": end_soll})
+
+    # novi taskovi jednim INSERT … RETURNING, izmjene jednim executemany UPDATE-om
+    # (app/core/task_bulk.py – revizija, rollup i brojači kao kod ORM upisa)
+    new_ids = insert_tasks(db, project_id, new_rows)
+    update_tasks(db, project_id, updated_rows)
+    created_tasks = [
+        TaskRead(id=task_id, project_id=project_id, **row)
+        for task_id, row in zip(new_ids, new_rows)
+    ]
 
     # 4) commit jednom i log + response IZVAN petlje
     db.commit()
 
-    # refresh za nove taskove radi response_model-a
-    for t in created_tasks:
-        db.refresh(t)
-
     details = {
         "project_id": project_id,
         "project_name": project.name,
         "purged_top_ids": safe_purge_ids,
-        "created_ids": [t.id for t in created_tasks],
-        "updated_ids": updated_task_ids,
+        "created_ids": new_ids,
+        "updated_ids": [row["id"] for row in updated_rows],
         "changes": all_changes,
     }
 
@@ -506,81 +540,27 @@ async def sync_tasks(project_id: int, request: Request, db: Session = Depends(ge
 
 @router.get("/projects/{project_id}/task-stats")
 def project_task_stats(project_id: int, db: Session = Depends(get_db)):
-    # Učitaj sve taskove po projektu direktno
-    tasks = db.query(Task).filter(Task.project_id == project_id).all()
-
-    # Ukupan broj taskova
-    total = len(tasks)
-    done = sum(1 for t in tasks if t.status == "done")
-    in_progress = sum(1 for t in tasks if t.status == "in_progress")
-    offen = sum(1 for t in tasks if t.status == "offen")
-    percent_done = round((done / total) * 100, 1) if total else 0
-
-    # Grupisanje po gewerk (ako postoji)
-    gewerk_stats = {}
-    for task in tasks:
-        if not task.process_step or not task.process_step.gewerk:
-            continue  # preskoči ako fali veza
-
-        name = task.process_step.gewerk.name
-
-        if name not in gewerk_stats:
-            gewerk_stats[name] = {"done": 0, "in_progress": 0, "offen": 0}
-
-        if task.status in gewerk_stats[name]:
-            gewerk_stats[name][task.status] += 1
-
-    return {
-        "total": total,
-        "done": done,
-        "in_progress": in_progress,
-        "offen": offen,
-        "percent_done": percent_done,
-        "by_gewerk": [
-            {"gewerk": name, **counts} for name, counts in gewerk_stats.items()
-        ]
-    }
+    # brojanje po Task.status + po gewerku – jedan GROUP BY (app/core/task_stats.py)
+    return project_status_stats(db, project_id)
 
 
 
 @router.get("/projects/{project_id}/progress-curve")
-def get_progress_curve(project_id: int, db: Session = Depends(get_db)):
-    tasks = db.query(Task).filter(Task.project_id == project_id).all()
-
-    data = {}
-
-    for task in tasks:
-        # Soll = planirano
-        soll = task.start_soll or task.end_soll
-        if soll:
-            week = soll.isocalendar()[1]
-            year = soll.isocalendar()[0]
-            key = f"{year}-KW{week}"
-            data.setdefault(key, {"soll": 0, "ist": 0})
-            data[key]["soll"] += 1
-
-        # Ist = stvarno završeno
-        ist = task.end_ist or task.start_ist
-        if ist:
-            week = ist.isocalendar()[1]
-            year = ist.isocalendar()[0]
-            key = f"{year}-KW{week}"
-            data.setdefault(key, {"soll": 0, "ist": 0})
-            data[key]["ist"] += 1
-
-    sorted_keys = sorted(data.keys())
-
-    return {
-        "labels": sorted_keys,
-        "soll": [data[k]["soll"] for k in sorted_keys],
-        "ist": [data[k]["ist"] for k in sorted_keys],
-    }
+def get_progress_curve(
+    project_id: int,
+    bucket: str = Query("week"),            # day | week | month
+    series: Optional[str] = Query(None),    # gewerk | bauteil
+    db: Session = Depends(get_db),
+):
+    # periodi + kumulativne Soll/Ist krive u jednom GROUP BY (app/core/task_stats.py)
+    return progress_curve(db, project_id, bucket=bucket, series=series)
 
 @router.put("/tasks/{task_id}", response_model=TaskRead)
 def update_task(
     task_id: int,
     request: Request,
     task_data: TaskUpdate,
+    propagate: bool = Query(True, description="nasljednike u TOP-u pomjeriti ako task kasni"),
     db: Session = Depends(get_db),
 ):
     # 1) nađi task
@@ -596,6 +576,11 @@ def update_task(
     for attr, value in updates.items():
         setattr(task, attr, value)
 
+    # 3b) pomjeren kraj → kasniji koraci istog TOP-a (app/core/task_propagation.py)
+    propagated: list[dict] = []
+    if propagate and ("end_ist" in diff or "end_soll" in diff):
+        propagated = propagate_successors(db, task)
+
     db.commit()
     db.refresh(task)
 
@@ -614,20 +599,11 @@ def update_task(
     except Exception:
         task_name = None
 
-    # hijerarhija: bauteil / stiege / ebene / top
-    top = getattr(task, "top", None)
-    ebene = top.ebene if top else None
-    stiege = ebene.stiege if ebene else None
-    bauteil = stiege.bauteil if stiege else None
+    # hijerarhija: bauteil / stiege / ebene / top (jedan upit)
     sub_user = task.sub if task.sub_id else None
     sub_name = sub_user.name if sub_user else None
 
-    location = {
-        "bauteil": bauteil.name if bauteil else None,
-        "stiege": stiege.name if stiege else None,
-        "ebene": ebene.name if ebene else None,
-        "top": top.name if top else None,
-    }
+    location = task_location_names(db, task)
 
     # 5) log u istom “dizajnu” kao ostalo
     log_protocol(
@@ -645,13 +621,81 @@ def update_task(
             "changes": diff,
             "sub_id": task.sub_id,
             "sub_name": sub_name,
-
+            **({"propagated": propagated} if propagated else {}),
         },
     )
 
     return task
 
 
+@router.post("/tasks/batch", response_model=List[TaskRead])
+def batch_update_tasks(
+    body: TaskBatchRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """
+    Više patch-eva (različita polja po tasku, npr. drag & drop više taskova
+    u Gantt-u) u jednoj transakciji: jedan SELECT, jedan flush, jedan commit
+    i jedan zbirni zapis u protokolu. Ako neki task ne postoji → ništa se
+    ne mijenja (404).
+    """
+    ids = {item.id for item in body.items}
+    tasks = {
+        t.id: t
+        for t in db.query(Task)
+        .filter(Task.id.in_(ids))
+        .options(joinedload(Task.process_step))
+    }
+    missing = sorted(ids - tasks.keys())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tasks nicht gefunden: {missing}")
+
+    # diff na osnovu STARIH vrijednosti; više patch-eva istog taska se slaže redom
+    diffs: Dict[int, dict] = {}
+    for item in body.items:
+        task = tasks[item.id]
+        updates = item.dict(exclude_unset=True, exclude={"id"})
+        for field, change in compute_diff(task, updates).items():
+            prev = diffs.setdefault(task.id, {}).get(field)
+            diffs[task.id][field] = {"old": prev["old"] if prev else change["old"], "new": change["new"]}
+        for attr, value in updates.items():
+            setattr(task, attr, value)
+
+    db.flush()
+
+    # odgovor + log iz flushanih objekata (poslije commita bi svaki task
+    # bio expired → po jedan SELECT)
+    result = [TaskRead.model_validate(tasks[i]) for i in sorted(ids)]
+    log_tasks = [
+        {
+            "task_id": t.id,
+            "project_id": t.project_id,
+            "task_name": t.process_step.activity if t.process_step else None,
+            "location": t.location,
+            "changes": diffs.get(t.id, {}),
+        }
+        for t in (tasks[i] for i in sorted(ids))
+        if diffs.get(t.id)
+    ]
+    db.commit()
+
+    log_protocol(
+        db,
+        request,
+        action="task.batch_update",
+        ok=True,
+        status_code=200,
+        details={
+            "project_ids": sorted({t.project_id for t in tasks.values()}),
+            "count": len(log_tasks),
+            "tasks": log_tasks,
+        },
+    )
+
+    return result
+
+
 @router.delete("/tasks/{task_id}")
 def delete_task(
     task_id: int,
@@ -673,18 +717,8 @@ def delete_task(
     step = task.process_step
     task_name = step.activity if step else None
 
-    # hijerarhija (bauteil / stiege / ebene / top)
-    top = task.top
-    ebene = top.ebene if top else None
-    stiege = ebene.stiege if ebene else None
-    bauteil = stiege.bauteil if stiege else None
-
-    location = {
-        "bauteil": bauteil.name if bauteil else None,
-        "stiege": stiege.name if stiege else None,
-        "ebene": ebene.name if ebene else None,
-        "top": top.name if top else None,
-    }
+    # hijerarhija (bauteil / stiege / ebene / top) – jedan upit
+    location = task_location_names(db, task)
 
     # --- obriši task ---
     db.delete(task)
@@ -717,6 +751,45 @@ def list_subs(db: Session = Depends(get_db)):
 
 
 
+COPY_START_SOLL = "__COPY__start_soll"
+COPY_END_SOLL = "__COPY__end_soll"
+
+
+def _bulk_ist_value(value, soll_col, ist_col, copy_token: str):
+    """
+    start_ist/end_ist iz BulkUpdate → (izraz za SET, uslov "task se mijenja").
+    `__COPY__*_soll` kopira Soll kolonu u bazi (tamo gdje Soll postoji);
+    datum važi za sve taskove; neispravan datum → (None, None).
+    """
+    if isinstance(value, str) and value == copy_token:
+        return func.coalesce(soll_col, ist_col), soll_col.isnot(None)
+    d = _to_date(value)
+    if d:
+        return d, true()
+    return None, None
+
+
+def _log_task_rows(db: Session, rows) -> list[dict]:
+    """
+    Lista taskova za protokol iz RETURNING redova (id, location,
+    process_step_id) + jedan upit za nazive aktivnosti.
+    """
+    step_ids = {r.process_step_id for r in rows if r.process_step_id is not None}
+    activity_by_step = dict(
+        db.execute(
+            select(ProcessStep.id, ProcessStep.activity).where(ProcessStep.id.in_(step_ids))
+        ).all()
+    ) if step_ids else {}
+    return [
+        {
+            "id": r.id,
+            "name": activity_by_step.get(r.process_step_id),
+            "location": r.location,
+        }
+        for r in sorted(rows, key=lambda r: r.id)
+    ]
+
+
 @router.patch("/projects/{project_id}/tasks/bulk")
 def bulk_update_tasks(
     project_id: int,
@@ -724,118 +797,33 @@ def bulk_update_tasks(
     body: BulkBody,
     db: Session = Depends(get_db),
 ):
-    # Bazni query za sve taskove u projektu + eager load za strukturu
-    q = (
-        db.query(Task)
-        .filter(Task.project_id == project_id)
-        .options(
-            joinedload(Task.top)
-            .joinedload(Top.ebene)
-            .joinedload(Ebene.stiege)
-            .joinedload(Stiege.bauteil),
-            joinedload(Task.process_step),
-        )
-    )
-
-    # Po ID-jevima
-    if body.ids:
-        q = q.filter(Task.id.in_(body.ids))
-
-    # Po filterima (isto kao u /tasks-timeline) + topIds
-    f = body.filters
-    if f:
-        if getattr(f, "topIds", None):
-            q = q.filter(Task.top_id.in_(f.topIds))
-        if f.gewerk:
-            q = q.join(Task.process_step).join(ProcessStep.gewerk).filter(
-                Gewerk.name.in_(f.gewerk)
-            )
-        if f.status:
-            conds = []
-            if "Erledigt" in f.status:
-                conds.append(Task.end_ist.isnot(None))
-            if "In Bearbeitung" in f.status:
-                conds.append(
-                    and_(Task.start_ist.isnot(None), Task.end_ist.is_(None))
-                )
-            if "Offen" in f.status:
-                conds.append(
-                    and_(Task.start_ist.is_(None), Task.end_ist.is_(None))
-                )
-            if conds:
-                q = q.filter(or_(*conds))
-        if f.startDate:
-            q = q.filter(Task.end_soll >= f.startDate)
-        if f.endDate:
-            q = q.filter(Task.start_soll <= f.endDate)
-        if f.delayed:
-            today = date.today()
-            q = q.filter(
-                or_(
-                    and_(Task.end_ist.is_(None), Task.end_soll < today),
-                    Task.end_ist > Task.end_soll,
-                )
-            )
-        if f.taskName:
-            q = q.join(Task.process_step).filter(
-                ProcessStep.activity.ilike(f"%{f.taskName}%")
-            )
-        if f.tops:
-            q = q.join(Task.top).filter(Top.name.in_(f.tops))
-        if f.ebenen:
-            q = (
-                q.join(Task.top)
-                .join(Top.ebene)
-                .filter(Ebene.name.in_(f.ebenen))
-            )
-        if f.stiegen:
-            q = (
-                q.join(Task.top)
-                .join(Top.ebene)
-                .join(Ebene.stiege)
-                .filter(Stiege.name.in_(f.stiegen))
-            )
-        if f.bauteile:
-            q = (
-                q.join(Task.top)
-                .join(Top.ebene)
-                .join(Ebene.stiege)
-                .join(Stiege.bauteil)
-                .filter(Bauteil.name.in_(f.bauteile))
-            )
-        if f.activities:
-            q = q.join(Task.process_step).filter(
-                ProcessStep.activity.in_(f.activities)
-            )
-        if f.processModels:
-            q = (
-                q.join(Task.process_step)
-                .join(ProcessStep.model)
-                .filter(ProcessModel.name.in_(f.processModels))
-            )
-
+    """
+    Jedan UPDATE … WHERE <filter> … RETURNING za sve varijante (➕ Sub,
+    „Fertig“, datumi/status). Log podaci dolaze iz RETURNING-a + jednog
+    upita za nazive aktivnosti – bez učitavanja taskova.
+    """
     # Ako nema update dijela – nema posla
     if not body.update:
         return {"betroffen": 0}
 
     u = body.update
-    updated_ids: list[int] = []
 
     # flag da li je ovo baš „Fertig“-tipka (copy start/end_soll + status=done)
     is_mark_done = (
         isinstance(getattr(u, "start_ist", None), str)
-        and u.start_ist == "__COPY__start_soll"
+        and u.start_ist == COPY_START_SOLL
         and isinstance(getattr(u, "end_ist", None), str)
-        and u.end_ist == "__COPY__end_soll"
+        and u.end_ist == COPY_END_SOLL
         and getattr(u, "status", None) == "done"
         and getattr(u, "sub_id", None) is None
     )
+    # Samo sub_id → ➕ Sub button
+    is_assign_sub = u.sub_id is not None and all(
+        getattr(u, k, None) is None for k in ("start_ist", "end_ist", "status")
+    )
 
-    # 1) Samo sub_id → ➕ Sub button
-    if (
-        u.sub_id is not None
-        and all(getattr(u, k, None) is None for k in ("start_ist", "end_ist", "status"))
-    ):
+    sub_user = None
+    if is_assign_sub:
         sub_user = db.query(User).get(u.sub_id)
         if not sub_user:
             raise HTTPException(
@@ -847,121 +835,75 @@ def bulk_update_tasks(
                 detail="Angegebener Benutzer ist kein Subunternehmen",
             )
 
-        tasks = q.all()
-        if not tasks:
-            return {"betroffen": 0}
-
-        ids = [t.id for t in tasks]
-        db.query(Task).filter(Task.id.in_(ids)).update(
-            {"sub_id": u.sub_id}, synchronize_session=False
-        )
-        db.commit()
-
-        # lijepa lista taskova sa strukturom
-        log_tasks = []
-        for t in tasks:
-            loc_str = _task_location_str_from_top(t.top)
-            name = t.process_step.activity if t.process_step else None
-            log_tasks.append(
-                {
-                    "id": t.id,
-                    "name": name,
-                    "location": loc_str,
-                }
-            )
+    # SET dio; task je "promijenjen" ako se bar jedna kolona postavlja
+    # (copy samo gdje Soll postoji – isto kao ranije po tasku)
+    values: dict = {}
+    changed: list = []
+    for col, soll_col, ist_col, token in (
+        ("start_ist", Task.start_soll, Task.start_ist, COPY_START_SOLL),
+        ("end_ist", Task.end_soll, Task.end_ist, COPY_END_SOLL),
+    ):
+        if getattr(u, col, None) is not None:
+            expr, cond = _bulk_ist_value(getattr(u, col), soll_col, ist_col, token)
+            if expr is not None:
+                values[col] = expr
+                changed.append(cond)
+    if getattr(u, "status", None) is not None:
+        values["status"] = u.status
+        changed.append(true())
+    if getattr(u, "sub_id", None) is not None:
+        values["sub_id"] = u.sub_id
+        changed.append(true())
+
+    if not values:
+        return {"betroffen": 0}
 
-        log_protocol(
-            db,
-            request,
-            action="task.bulk.assign_sub",
-            ok=True,
-            status_code=200,
-            details={
-                "project_id": project_id,
-                "sub_id": u.sub_id,
-                "sub_name": getattr(sub_user, "name", None)
-                or getattr(sub_user, "email", None)
-                or f"Sub #{sub_user.id}",
-                "count": len(log_tasks),
-                "tasks": log_tasks,
-            },
-        )
+    # Po ID-jevima + filterima (isti compiler kao /tasks-timeline) + topIds
+    criteria = [
+        *task_filter_criteria(body.filters, project_id=project_id, ids=body.ids),
+        or_(*changed),
+    ]
 
-        return {"betroffen": len(ids)}
+    # set-based → rollup strukture i brojači se preračunaju pri commitu
+    mark_rollup_dirty(db, *criteria)
+    mark_counters_dirty(db, *criteria)
+
+    rows = db.execute(
+        update(Task)
+        .where(*criteria)
+        .values({**values, **revision_values(db, project_id)})
+        .returning(Task.id, Task.location, Task.process_step_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
 
-    # 2) Ostali slučajevi (uklj. „Fertig“-tipka)
-    tasks = q.all()
-    log_tasks: list[dict] = []
+    if not rows:
+        return {"betroffen": 0}
 
-    for t in tasks:
-        changed = False
-
-        # start_ist
-        if getattr(u, "start_ist", None) is not None:
-            if isinstance(u.start_ist, str) and u.start_ist == "__COPY__start_soll":
-                if t.start_soll:
-                    t.start_ist = t.start_soll
-                    changed = True
-            else:
-                d = _to_date(u.start_ist)
-                if d:
-                    t.start_ist = d
-                    changed = True
-
-        # end_ist
-        if getattr(u, "end_ist", None) is not None:
-            if isinstance(u.end_ist, str) and u.end_ist == "__COPY__end_soll":
-                if t.end_soll:
-                    t.end_ist = t.end_soll
-                    changed = True
-            else:
-                d = _to_date(u.end_ist)
-                if d:
-                    t.end_ist = d
-                    changed = True
-
-        # status
-        if getattr(u, "status", None) is not None:
-            t.status = u.status
-            changed = True
-
-        # sub_id (kombinovano sa gore navedenim)
-        if getattr(u, "sub_id", None) is not None:
-            t.sub_id = u.sub_id
-            changed = True
-
-        if changed:
-            updated_ids.append(t.id)
-            db.add(t)
-
-            loc_str = _task_location_str_from_top(t.top)
-            name = t.process_step.activity if t.process_step else None
-            log_tasks.append(
-                {
-                    "id": t.id,
-                    "name": name,
-                    "location": loc_str,
-                }
-            )
+    log_tasks = _log_task_rows(db, rows)
 
-    db.commit()
+    if is_assign_sub:
+        action = "task.bulk.assign_sub"
+        details = {
+            "project_id": project_id,
+            "sub_id": u.sub_id,
+            "sub_name": getattr(sub_user, "name", None)
+            or getattr(sub_user, "email", None)
+            or f"Sub #{sub_user.id}",
+            "count": len(log_tasks),
+            "tasks": log_tasks,
+        }
+    else:
+        action = "task.bulk.mark_done" if is_mark_done else "task.bulk.update"
+        details = {
+            "project_id": project_id,
+            "count": len(log_tasks),
+            "tasks": log_tasks,
+        }
 
-    # log u protokol
-    if updated_ids:
-        log_protocol(
-            db,
-            request,
-            action="task.bulk.mark_done" if is_mark_done else "task.bulk.update",
-            ok=True,
-            status_code=200,
-            details={
-                "project_id": project_id,
-                "count": len(updated_ids),
-                "tasks": log_tasks,
-            },
-        )
+    log_protocol(db, request, action=action, ok=True, status_code=200, details=details)
 
-    return {"betroffen": len(updated_ids)}
+    return {"betroffen": len(rows)}
 
 
 
@@ -979,46 +921,26 @@ class SkipWindowFilters(BaseModel):
     activity: Optional[list[str]] = None
     processModel: Optional[list[str]] = None
 
+def _skip_window_bulk_filters(f: Optional[SkipWindowFilters]) -> Optional[BulkFilters]:
+    if f is None:
+        return None
+    return BulkFilters(
+        topIds=f.topIds,
+        tops=f.top or [],
+        ebenen=f.ebene or [],
+        stiegen=f.stiege or [],
+        bauteile=f.bauteil or [],
+        gewerk=f.gewerk or [],
+        activities=f.activity or [],
+        processModels=f.processModel or [],
+    )
+
 class SkipWindowRequest(BaseModel):
     start: date
     end: date
     skip_weekends: bool = True
     filters: Optional[SkipWindowFilters] = None
 
-def _ranges_overlap(a_start: date | None, a_end: date | None,
-                    b_start: date, b_end: date) -> bool:
-    if a_start is None or a_end is None:
-        return False
-    return a_start <= b_end and b_start <= a_end
-
-def _count_weekend_days(start: date, end: date) -> int:
-    if end < start:
-        return 0
-    days = (end - start).days + 1
-    wend = 0
-    for i in range(days):
-        d = start + timedelta(days=i)
-        if d.weekday() >= 5:  # 5=Sat, 6=Sun
-            wend += 1
-    return wend
-
-def _overlaps(a_start: date | None, a_end: date | None, b_start: date, b_end: date) -> bool:
-    if not a_start or not a_end:
-        return False
-    # intervali inkluzivni po danima
-    return not (a_end < b_start or a_start > b_end)
-
-def _next_monday(d: date) -> tuple[date, int]:
-    """
-    Ako d padne na vikend, vraća prvi ponedjeljak i koliko je dana pomaknuto.
-    Inače vraća (d, 0).
-    """
-    if d.weekday() < 5:
-        return d, 0
-    # subota=5 -> +2, nedjelja=6 -> +1
-    add = 7 - d.weekday()
-    return d + timedelta(days=add), add
-
 @router.post("/projects/{project_id}/schedule/skip-window")
 def schedule_skip_window(
     project_id: int,
@@ -1026,6 +948,11 @@ def schedule_skip_window(
     request: Request,
     db: Session = Depends(get_db),
 ):
+    """
+    Pomjeri Soll datume taskova koji preklapaju prozor za dužinu prozora –
+    jedan UPDATE … RETURNING (preklapanje i pomak u SQL-u). Sa skip_weekends
+    datum koji padne na vikend ili praznik ide na prvi radni dan (calendar_days).
+    """
     # 0) validacije
     if payload.end < payload.start:
         raise HTTPException(status_code=400, detail="Ende vor Start")
@@ -1035,110 +962,49 @@ def schedule_skip_window(
     if shift_days <= 0:
         return {"moved": 0, "days_shifted": 0}
 
-    # helper: ako padne na vikend, pomjeri na ponedjeljak i vrati koliko je pomaknuto
-    def _bump_if_weekend(d: date) -> tuple[date, int]:
-        wd = d.weekday()  # 0=Mon ... 5=Sat 6=Sun
-        if wd < 5:
-            return d, 0
-        add = 7 - wd  # Sat->2, Sun->1
-        return d + timedelta(days=add), add
+    # 2) filteri (uklj. topIds) – isti compiler kao /tasks-timeline;
+    #    pomjeramo samo taskove sa oba Soll datuma koji PREKLAPAJU prozor
+    criteria = [
+        *task_filter_criteria(_skip_window_bulk_filters(payload.filters), project_id=project_id),
+        Task.start_soll.isnot(None),
+        Task.end_soll.isnot(None),
+        Task.start_soll <= payload.end,
+        Task.end_soll >= payload.start,
+    ]
 
-    # 2) bazni query + eager load za strukturu
-    q = (
-        db.query(Task)
-        .filter(Task.project_id == project_id)
-        .options(
-            joinedload(Task.top)
-            .joinedload(Top.ebene)
-            .joinedload(Ebene.stiege)
-            .joinedload(Stiege.bauteil),
-            joinedload(Task.process_step),
+    # kalendar mora pokriti stare i pomjerene datume
+    bounds = db.execute(
+        select(
+            func.min(Task.start_soll), func.min(Task.end_soll),
+            func.max(Task.start_soll), func.max(Task.end_soll),
+        ).where(*criteria)
+    ).one()
+    if bounds[0] is None:
+        return {"moved": 0, "days_shifted": shift_days}
+    ensure_work_calendar(db, min(bounds[:2]), max(bounds[2:]) + timedelta(days=shift_days))
+
+    # set-based → rollup strukture i brojači se preračunaju pri commitu
+    mark_rollup_dirty(db, *criteria)
+    mark_counters_dirty(db, *criteria)
+
+    rows = db.execute(
+        update(Task)
+        .where(*criteria)
+        .values(
+            start_soll=shifted_day_expr(Task.start_soll, shift_days, payload.skip_weekends),
+            end_soll=shifted_day_expr(Task.end_soll, shift_days, payload.skip_weekends),
+            **revision_values(db, project_id),
         )
-    )
-
-    # 3) filteri (uklj. topIds)
-    f = payload.filters
-    if f:
-        if getattr(f, "topIds", None):
-            q = q.filter(Task.top_id.in_(f.topIds))
-        if getattr(f, "top", None):
-            q = q.join(Task.top).filter(Top.name.in_(f.top))
-        if getattr(f, "ebene", None):
-            q = q.join(Task.top).join(Top.ebene).filter(Ebene.name.in_(f.ebene))
-        if getattr(f, "stiege", None):
-            q = (
-                q.join(Task.top)
-                .join(Top.ebene)
-                .join(Ebene.stiege)
-                .filter(Stiege.name.in_(f.stiege))
-            )
-        if getattr(f, "bauteil", None):
-            q = (
-                q.join(Task.top)
-                .join(Top.ebene)
-                .join(Ebene.stiege)
-                .join(Stiege.bauteil)
-                .filter(Bauteil.name.in_(f.bauteil))
-            )
-        if getattr(f, "gewerk", None):
-            q = (
-                q.join(Task.process_step)
-                .join(ProcessStep.gewerk)
-                .filter(Gewerk.name.in_(f.gewerk))
-            )
-        if getattr(f, "activity", None):
-            q = q.join(Task.process_step).filter(
-                ProcessStep.activity.in_(f.activity)
-            )
-        if getattr(f, "processModel", None):
-            q = (
-                q.join(Task.process_step)
-                .join(ProcessStep.model)
-                .filter(ProcessModel.name.in_(f.processModel))
-            )
-
-    moved = 0
-    log_tasks: list[dict] = []
-
-    for t in q.all():
-        s = t.start_soll
-        e = t.end_soll
-        if not s and not e:
-            continue
-
-        # pomjeramo samo one koji PREKLAPAJU prozor
-        if _ranges_overlap(s, e, payload.start, payload.end):
-            ns = s + timedelta(days=shift_days) if s else None
-            ne = e + timedelta(days=shift_days) if e else None
-
-            # vikendi po želji
-            if payload.skip_weekends:
-                if ns:
-                    ns, _ = _bump_if_weekend(ns)
-                if ne:
-                    ne, _ = _bump_if_weekend(ne)
-
-            t.start_soll = ns
-            t.end_soll = ne
-            moved += 1
-
-            loc_str = _task_location_str_from_top(t.top)
-            name = t.process_step.activity if t.process_step else None
-            log_tasks.append(
-                {
-                    "id": t.id,
-                    "name": name,
-                    "location": loc_str,
-                }
-            )
-
+        .returning(Task.id, Task.location, Task.process_step_id)
+        .execution_options(synchronize_session=False)
+    ).all()
     db.commit()
 
-    project = db.query(Project).get(project_id)
-    project_name = project.name if project else None
-
-    # log u protokol
+    moved = len(rows)
     if moved:
+        project_name = db.execute(
+            select(Project.name).where(Project.id == project_id)
+        ).scalar()
         log_protocol(
             db,
             request,
@@ -1154,8 +1020,7 @@ def schedule_skip_window(
                 "moved": moved,
                 "days_shifted": shift_days,
                 "filters": payload.filters.dict() if payload.filters else None,
-                "tasks": log_tasks,
-
+                "tasks": _log_task_rows(db, rows),
             },
         )
 
@@ -1172,96 +1037,61 @@ def project_stats(
     response: Response = None,
 ):
     if response is not None:
-        response.headers["X-Stats-Impl"] = "task.py-v2"  # 👈 marker
-    q = (
-        db.query(Task)
-        .join(Task.process_step, isouter=True)
-        .join(ProcessStep.gewerk, isouter=True)
-        .options(
-            joinedload(Task.process_step).joinedload(ProcessStep.gewerk),
-            load_only(
-                Task.id, Task.project_id, Task.start_soll, Task.end_soll,
-                Task.start_ist, Task.end_ist
-            ),
-        )
-        .filter(Task.project_id == project_id)
-    )
-    tasks: list[Task] = q.all()
+        response.headers["X-Stats-Impl"] = "task.py-v3"  # 👈 marker
 
-    DEFAULT_G = "Allgemein"
+    # prošli dan → dnevni snimak (indeksirani lookup), ako postoji
+    if until and until < date.today():
+        snap = snapshot_project_stats(db, project_id, until)
+        if snap is not None:
+            if response is not None:
+                response.headers["X-Stats-Source"] = "snapshot"
+            return snap
 
-    # ⚠️ fallback na "Allgemein" umjesto "" (prazno)
-    def gname_of(t: Task) -> str:
-        try:
-            name = (t.process_step.gewerk.name or "").strip()
-        except Exception:
-            name = ""
-        return name or DEFAULT_G
-
-    # skup SVIH gewerka u projektu – uvijek formiraj listu lijevo
-    all_gewerke: set[str] = set()
-    for t in tasks:
-        all_gewerke.add(gname_of(t))  # ⚠️ već normalizirano
-
-    total = done = in_prog = offen = 0
-    by_gewerk: dict[str, dict] = {}
-
-    for t in tasks:
-        s_soll, e_soll = t.start_soll, t.end_soll
-        s_ist,  e_ist  = t.start_ist,  t.end_ist
-
-        if until:
-            # preskoči čisto buduće taskove bez IST-a
-            if (not s_ist) and (not e_ist) and (s_soll and s_soll > until):
-                continue
+    if response is not None:
+        response.headers["X-Stats-Source"] = "live"
+    # klasifikacija (done/in_progress/offen, opcionalno na dan `until`) je
+    # CASE u bazi, grupisano po gewerku – vidi app/core/task_stats.py
+    return compute_project_stats(db, project_id, until)
 
-            if e_ist and e_ist <= until:
-                cls = "done"
-            elif s_ist and s_ist <= until and (not e_ist or e_ist > until):
-                cls = "in_progress"
-            else:
-                if (s_soll is None) or (s_soll and s_soll <= until):
-                    cls = "offen"
-                else:
-                    continue
-        else:
-            if e_ist:
-                cls = "done"
-            elif s_ist and not e_ist:
-                cls = "in_progress"
-            else:
-                cls = "offen"
 
-        total += 1
-        if cls == "done":
-            done += 1
-        elif cls == "in_progress":
-            in_prog += 1
-        else:
-            offen += 1
+@router.get("/projects/{project_id}/stats/history")
+def project_stats_history(
+    project_id: int,
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    db: Session = Depends(get_db),
+):
+    # trend iz dnevnih snimaka (done/in_progress/offen po danu)
+    return stats_history(db, project_id, start, end)
 
-        gname = gname_of(t)  # ⚠️ uvijek normalizirano ime
-        if gname not in by_gewerk:
-            by_gewerk[gname] = {"gewerk": gname, "done": 0, "in_progress": 0, "offen": 0}
-        by_gewerk[gname][cls] += 1
 
-    # ⚠️ osiguraj 0/0/0 zapise i za gewerke bez taskova u “until” rezu
-    for gname in sorted(all_gewerke):
-        by_gewerk.setdefault(gname, {"gewerk": gname, "done": 0, "in_progress": 0, "offen": 0})
+@router.post("/projects/{project_id}/stats/snapshot", dependencies=[Depends(require_admin)])
+def create_stats_snapshot(
+    project_id: int,
+    request: Request,
+    day: Optional[date] = Query(None),
+    db: Session = Depends(get_db),
+):
+    project = db.query(Project).get(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Projekt nicht gefunden")
 
-    percent_done = round((done / total) * 100, 2) if total else 0.0
+    day = day or date.today()
+    if day > date.today():
+        raise HTTPException(status_code=400, detail="Snapshot nur für heute oder die Vergangenheit")
 
-    # (po želji sortiraj po imenu)
-    by_gewerk_list = sorted(by_gewerk.values(), key=lambda r: r["gewerk"].lower())
+    rows = snapshot_stats(db, day, project_ids=[project_id])
+    db.commit()
 
-    return {
-        "total": total,
-        "done": done,
-        "in_progress": in_prog,
-        "offen": offen,
-        "percent_done": percent_done,
-        "by_gewerk": by_gewerk_list,  # ⚠️ nikad prazni string kao ime
-    }
+    log_protocol(
+        db,
+        request,
+        action="stats.snapshot",
+        ok=True,
+        status_code=200,
+        details={"project_id": project_id, "project_name": project.name, "day": str(day), "rows": rows},
+    )
+    return {"day": str(day), "rows": rows}
 
 
 @router.post(
@@ -1357,95 +1187,152 @@ def get_questions_for_task(
 
 
 
+def _table_row(t: Task, names: dict[str, dict[int, str]], answers: List[TaskCheckAnswer]) -> dict:
+    """Jedan red za ProjectTasksTable (TaskRow + check_answers)."""
+    step = t.process_step
+    # ⬇️ ovdje normalno pristupamo modelu, bez joinedload-a
+    model = step.model if step else None
+    gewerk = step.gewerk if step else None
+    sub_user = t.sub if t.sub_id else None
+
+    return {
+        "id": t.id,
+        "task": step.activity if step else None,
+        "beschreibung": t.beschreibung,
+        "gewerk_name": gewerk.name if gewerk else None,
+        "bauteil": names["bauteil"].get(t.bauteil_id),
+        "stiege": names["stiege"].get(t.stiege_id),
+        "ebene": names["ebene"].get(t.ebene_id),
+        "top": names["top"].get(t.top_id),
+        "process_model": model.name if model else None,
+        "start_soll": t.start_soll,
+        "end_soll": t.end_soll,
+        "start_ist": t.start_ist,
+        "end_ist": t.end_ist,
+        "status": t.status,  # "offen" / "in_progress" / "done"
+        "sub_name": sub_user.name if sub_user else None,
+        "check_answers": [
+            {
+                "id": a.id,
+                "label": a.label,
+                "field_type": a.field_type,  # "boolean" | "text" | "image"
+                "bool_value": a.bool_value,
+                "text_value": a.text_value,
+                "image_path": a.image_path,
+                "created_at": a.created_at.isoformat() if a.created_at else None,
+            }
+            for a in answers
+        ],
+    }
+
+
 @router.get("/projects/{project_id}/tasks-tabelle")
 def project_tasks_table(
     project_id: int,
     db: Session = Depends(get_db),
+    filters: BulkFilters = Depends(timeline_query_filters),
+    sort: str = Query(TABLE_DEFAULT_SORT),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(TABLE_DEFAULT_LIMIT, ge=1, le=TABLE_MAX_LIMIT),
+    cursor: Optional[str] = Query(None),
 ):
     """
-    Vrati listu taskova za projekat + sve check-answers po tasku,
-    za frontend komponentu ProjectTasksTable.
+    Jedna stranica taskova za ProjectTasksTable (+ check-answers samo za
+    taskove te stranice). Sort po bilo kojoj koloni (`sort`/`order`), timeline
+    filteri, keyset paging: `next_cursor` → `?cursor=` za sljedeću stranicu.
+    Prva stranica (bez kursora) nosi i `options` za filtere strukture.
     """
+    if sort not in TABLE_SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Unbekannte Sortierspalte: {sort}")
+
+    criteria = task_filter_criteria(filters, project_id=project_id)
 
-    # 1) Učitaj sve taskove za projekat sa strukturom, gewerkom i sub-om
-    tasks: List[Task] = (
+    # 1) stranica taskova sa gewerkom i sub-om
+    q = (
         db.query(Task)
-        .filter(Task.project_id == project_id)
+        .filter(*criteria)
         .options(
-            joinedload(Task.top)
-                .joinedload(Top.ebene)
-                .joinedload(Ebene.stiege)
-                .joinedload(Stiege.bauteil),
             joinedload(Task.process_step).joinedload(ProcessStep.gewerk),
             # ⬆️ namjerno NEMA ProcessStep.model u joinedload-u
             joinedload(Task.sub),
         )
-        .all()
     )
+    try:
+        tasks, next_cursor = table_page(q, sort, order == "desc", limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ungültiger Cursor")
 
-    # 2) Učitaj sve odgovore (TaskCheckAnswer) za ove taskove
-    task_ids = [t.id for t in tasks] or [-1]
+    # ukupno: bez filtera iz project_counters, inače COUNT s istim filterima
+    if len(criteria) == 1:
+        total = project_counts(db, project_id)["total"]
+    else:
+        total = db.execute(select(func.count(Task.id)).where(*criteria)).scalar() or 0
 
-    answers = (
-        db.query(TaskCheckAnswer)
-        .filter(TaskCheckAnswer.task_id.in_(task_ids))
-        .all()
-    )
+    # nazivi strukture preko denormaliziranih id-eva (bez joina po tasku)
+    names = project_structure_names(db, project_id)
 
-    # grupiši odgovore po task_id
+    # 2) odgovori (TaskCheckAnswer) samo za taskove ove stranice
     answers_by_task: Dict[int, List[TaskCheckAnswer]] = {}
-    for a in answers:
-        answers_by_task.setdefault(a.task_id, []).append(a)
-
-    # 3) Složi JSON kao što frontend očekuje (TaskRow + check_answers)
-    rows = []
-    for t in tasks:
-        top = t.top
-        ebene = top.ebene if top else None
-        stiege = ebene.stiege if ebene else None
-        bauteil = stiege.bauteil if stiege else None
-
-        step = t.process_step
-        # ⬇️ ovdje normalno pristupamo modelu, bez joinedload-a
-        model = step.model if step else None
-        gewerk = step.gewerk if step else None
-        sub_user = t.sub if t.sub_id else None
-
-        row = {
-            "id": t.id,
-            "task": step.activity if step else None,
-            "beschreibung": t.beschreibung,
-            "gewerk_name": gewerk.name if gewerk else None,
-            "bauteil": bauteil.name if bauteil else None,
-            "stiege": stiege.name if stiege else None,
-            "ebene": ebene.name if ebene else None,
-            "top": top.name if top else None,
-            "process_model": model.name if model else None,
-            "start_soll": t.start_soll,
-            "end_soll": t.end_soll,
-            "start_ist": t.start_ist,
-            "end_ist": t.end_ist,
-            "status": t.status,  # "offen" / "in_progress" / "done"
-            "sub_name": sub_user.name if sub_user else None,
-            "check_answers": [],
+    if tasks:
+        answers = (
+            db.query(TaskCheckAnswer)
+            .filter(TaskCheckAnswer.task_id.in_([t.id for t in tasks]))
+            .order_by(TaskCheckAnswer.id)
+            .all()
+        )
+        for a in answers:
+            answers_by_task.setdefault(a.task_id, []).append(a)
+
+    # 3) JSON kao što frontend očekuje (TaskRow + check_answers)
+    result = {
+        "items": [_table_row(t, names, answers_by_task.get(t.id, [])) for t in tasks],
+        "total": int(total),
+        "next_cursor": next_cursor,
+        "sort": sort,
+        "order": order,
+    }
+    if not cursor:
+        result["options"] = {
+            level: sorted(set(by_id.values()), key=lambda n: (natural_key(n) or "", n))
+            for level, by_id in names.items()
         }
+    return result
 
-        # dodaj check_answers
-        ca_list = answers_by_task.get(t.id, [])
-        for a in ca_list:
-            row["check_answers"].append(
-                {
-                    "id": a.id,
-                    "label": a.label,
-                    "field_type": a.field_type,  # "boolean" | "text" | "image"
-                    "bool_value": a.bool_value,
-                    "text_value": a.text_value,
-                    "image_path": a.image_path,
-                    "created_at": a.created_at.isoformat() if a.created_at else None,
-                }
-            )
 
-        rows.append(row)
+@router.get("/projects/{project_id}/tasks-export")
+def export_tasks_table(
+    project_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    filters: BulkFilters = Depends(timeline_query_filters),
+    fmt: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+):
+    """
+    Tabela taskova (struktura, gewerk, datumi, sub, check-answers po pitanju)
+    kao CSV ili XLSX – server-side, u dijelovima (app/core/task_export.py).
+    """
+    project = db.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Projekt nicht gefunden")
+    if fmt == "xlsx" and not xlsx_available():
+        raise HTTPException(status_code=501, detail="XLSX-Export nicht verfügbar (openpyxl fehlt)")
+
+    log_protocol(
+        db, request, action="task.export", ok=True, status_code=200,
+        details={"project_id": project_id, "format": fmt},
+    )
 
-    return rows
+    filename = f"aufgaben_projekt_{project_id}_{date.today().isoformat()}.{fmt}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if fmt == "xlsx":
+        return StreamingResponse(
+            stream_xlsx(SessionLocal, project_id, filters),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers=headers,
+        )
+    return StreamingResponse(
+        stream_csv(SessionLocal, project_id, filters),
+        media_type="text/csv; charset=utf-8",
+        headers=headers,
+    )
 
@@ -1,19 +1,33 @@
 # app/routes/task_structure.py
 from fastapi import APIRouter, Depends, Query, HTTPException, Request
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import Session
 from datetime import datetime, date
-from typing import Optional, Dict, Tuple, List
+from typing import Optional, Dict, Tuple, List, Union
 from app.database import get_db
-from app.models import Task, Top, Ebene, Stiege, Bauteil, ProcessStep, Gewerk, ProcessModel
-from app.schemas.structure_timeline import StructureTimelineResponse, StructSegment, StructActivity
+from app.models import Task, Top, Ebene, Stiege, Bauteil, ProcessStep, Gewerk, StructureActivityRollup as R
+from app.schemas.structure_timeline import (
+    StructureTimelineResponse,
+    StructureTimelineLevelsResponse,
+    StructSegment,
+    StructActivity,
+)
+from app.schemas.bulk import BulkFilters
+from app.core.task_filters import task_filter_criteria
+from app.core.natural_sort import natural_key
+from app.core.structure_rollup import activity_expr, rollup_delayed
 
 router = APIRouter()
 
-def _eff_start(t: Task):
-    return t.start_ist or t.start_soll
-def _eff_end(t: Task):
-    return t.end_ist or t.end_soll
+# segment = denormalizirana kolona taska (app/core/structure_denorm.py) ili gewerk koraka
+SEGMENT_COLUMNS = {
+    "top": Task.top_id,
+    "ebene": Task.ebene_id,
+    "stiege": Task.stiege_id,
+    "bauteil": Task.bauteil_id,
+    "gewerk": Gewerk.id,
+}
+
 
 def _parse_date(s: Optional[str]) -> Optional[date]:
     if not s:
@@ -23,7 +37,255 @@ def _parse_date(s: Optional[str]) -> Optional[date]:
     except ValueError:
         return None
 
-@router.get("/projects/{project_id}/structure-timeline", response_model=StructureTimelineResponse)
+
+def _aggregate_columns(today: date):
+    """
+    Agregati po grupi (segment, aktivnost):
+      start/end  = MIN/MAX efektivnih datuma (IST ako postoji, inače SOLL)
+      total/done = COUNT(*) / COUNT(end_ist)
+      delayed    = barem jedan task kasni (gotov poslije end_soll ili otvoren a end_soll prošao)
+      gewerk_id  = MIN(Gewerk.id) → jedan gewerk po grupi; naziv i boja se
+                   čitaju iz njega (_with_gewerk), pa su uvijek par
+    """
+    late = or_(
+        and_(Task.end_ist.isnot(None), Task.end_ist > Task.end_soll),
+        and_(Task.end_ist.is_(None), Task.end_soll < today),
+    )
+    return (
+        func.min(func.coalesce(Task.start_ist, Task.start_soll)).label("start"),
+        func.max(func.coalesce(Task.end_ist, Task.end_soll)).label("end"),
+        func.count(Task.id).label("total"),
+        func.count(Task.end_ist).label("done"),
+        func.max(case((late, 1), else_=0)).label("delayed"),
+        func.min(Gewerk.id).label("gewerk_id"),
+    )
+
+
+def _with_gewerk(q):
+    """Agregat s gewerk_id → isti redovi + gewerk/color tog gewerka (join nazad na Gewerk)."""
+    sq = q.subquery()
+    return (
+        select(
+            *[c for c in sq.c if c.key != "gewerk_id"],
+            Gewerk.name.label("gewerk"),
+            Gewerk.color.label("color"),
+        )
+        .select_from(sq)
+        .outerjoin(Gewerk, Gewerk.id == sq.c.gewerk_id)
+    )
+
+
+# nivoi koji se mogu čitati iz rolluppa (Ebene + roditelji preko malih tabela strukture)
+ROLLUP_SEGMENTS = {
+    "ebene": R.ebene_id,
+    "stiege": Ebene.stiege_id,
+    "bauteil": Stiege.bauteil_id,
+}
+
+
+def _rollup_query(project_id: int, level: str, today: date):
+    """Isti (segment, aktivnost) agregat kao nad taskovima, ali iz structure_activity_rollup."""
+    seg_col = ROLLUP_SEGMENTS[level]
+    q = select(
+        seg_col.label("segment_id"),
+        R.activity.label("activity"),
+        func.min(R.start).label("start"),
+        func.max(R.end).label("end"),
+        func.sum(R.total).label("total"),
+        func.sum(R.done).label("done"),
+        rollup_delayed(today).label("delayed"),
+        func.min(R.gewerk_id).label("gewerk_id"),
+    ).select_from(R)
+    if level != "ebene":
+        q = q.join(Ebene, Ebene.id == R.ebene_id)
+    if level == "bauteil":
+        q = q.join(Stiege, Stiege.id == Ebene.stiege_id)
+    return _with_gewerk(q.where(R.project_id == project_id).group_by(seg_col, R.activity))
+
+
+def _segment_meta(db: Session, project_id: int, level: str) -> Dict[int, Tuple[str, Optional[str]]]:
+    """{segment_id: (naziv, putanja)} – jedan upit nad malim tabelama strukture."""
+    if level == "gewerk":
+        return {gid: (name, None) for gid, name in db.execute(select(Gewerk.id, Gewerk.name))}
+
+    if level == "top":
+        rows = db.execute(
+            select(Top.id, Top.name, Ebene.name, Stiege.name, Bauteil.name)
+            .join(Ebene, Ebene.id == Top.ebene_id)
+            .join(Stiege, Stiege.id == Ebene.stiege_id)
+            .join(Bauteil, Bauteil.id == Stiege.bauteil_id)
+            .where(Bauteil.project_id == project_id)
+        )
+        # ispod Top npr: "Bauteil-1 - Stiege-1 - EG"
+        meta = {}
+        for sid, name, eb, st, bt in rows:
+            parts = [p for p in (bt, st, eb) if p]
+            meta[sid] = (name, " - ".join(parts) if parts else None)
+        return meta
+
+    if level == "bauteil":
+        rows = db.execute(
+            select(Bauteil.id, Bauteil.name).where(Bauteil.project_id == project_id)
+        )
+        return {sid: (name, None) for sid, name in rows}
+
+    if level == "stiege":
+        rows = db.execute(
+            select(Stiege.id, Stiege.name, Bauteil.name)
+            .join(Bauteil, Bauteil.id == Stiege.bauteil_id)
+            .where(Bauteil.project_id == project_id)
+        )
+        # ispod Stiege npr: "Bauteil-1"
+        return {sid: (name, bt) for sid, name, bt in rows}
+
+    rows = db.execute(
+        select(Ebene.id, Ebene.name, Stiege.name, Bauteil.name)
+        .join(Stiege, Stiege.id == Ebene.stiege_id)
+        .join(Bauteil, Bauteil.id == Stiege.bauteil_id)
+        .where(Bauteil.project_id == project_id)
+    )
+    # ispod Ebene želimo npr: "Bauteil-1 - Stiege-1"
+    meta = {}
+    for sid, name, st, bt in rows:
+        parts = [p for p in (bt, st) if p]
+        meta[sid] = (name, " - ".join(parts) if parts else None)
+    return meta
+
+
+def _struct_activity(row) -> StructActivity:
+    total = row.total or 0
+    done = row.done or 0
+    return StructActivity(
+        activity=row.activity,
+        start=row.start,
+        end=row.end,
+        total_tasks=total,
+        done_tasks=done,
+        progress=(done / total) if total else 0.0,
+        delayed=bool(row.delayed),
+        gewerk=row.gewerk,
+        color=row.color,
+    )
+
+
+def _segments(level: str, by_segment: Dict[int, List[StructActivity]], meta) -> List[StructSegment]:
+    segments: List[StructSegment] = []
+    for seg_id, acts in by_segment.items():
+        seg_name, path = meta.get(seg_id, (None, None))
+        segments.append(
+            StructSegment(
+                level=level,
+                id=seg_id,
+                name=seg_name,
+                structure_path=path,
+                activities=sorted(
+                    acts, key=lambda a: (a.start or date.max, a.activity)
+                ),
+            )
+        )
+    return sorted(segments, key=lambda s: (natural_key(s.name) or "", s.id))
+
+
+# ---------- level=all: jedan prolaz, viši nivoi iz parcijala nižih ----------
+
+ALL_LEVELS = ("top", "ebene", "stiege", "bauteil", "gewerk")
+
+# roll-up lanac iznad TOP-a (svaki nivo se slaže iz prethodnog)
+_ROLLUP = ("ebene", "stiege", "bauteil")
+
+# parcijala = [start, end, total, done, delayed, gewerk_id]
+
+
+def _merge(acc: Optional[list], part) -> list:
+    """Spoji parcijalu u akumulator (MIN/MAX/SUM/OR → asocijativno)."""
+    if acc is None:
+        return list(part)
+    start, end, total, done, late, gewerk_id = part
+    if start is not None and (acc[0] is None or start < acc[0]):
+        acc[0] = start
+    if end is not None and (acc[1] is None or end > acc[1]):
+        acc[1] = end
+    acc[2] += total
+    acc[3] += done
+    if late > acc[4]:
+        acc[4] = late
+    if gewerk_id is not None and (acc[5] is None or gewerk_id < acc[5]):
+        acc[5] = gewerk_id
+    return acc
+
+
+def _structure_levels(db: Session, project_id: int, filters: BulkFilters, today: date) -> Dict[str, List[StructSegment]]:
+    """
+    Jedan GROUP BY na najfinijem zrnu (top, gewerk, aktivnost); ebene/stiege/
+    bauteil su funkcija TOP-a pa ne povećavaju broj grupa. Nivoi se onda
+    slažu hijerarhijski: TOP iz redova, Ebene iz TOP parcijala, Stiege iz
+    Ebene, Bauteil iz Stiege (+ Gewerk direktno iz redova). MIN/MAX/SUM su
+    asocijativni → isti rezultat kao zaseban GROUP BY po nivou; naziv i boja
+    gewerka (MIN id) se na kraju čitaju jednim upitom nad gewerke.
+    """
+    activity = activity_expr()
+    q = (
+        select(
+            Task.top_id, Task.ebene_id, Task.stiege_id, Task.bauteil_id, Gewerk.id,
+            activity, *_aggregate_columns(today),
+        )
+        .select_from(Task)
+        .outerjoin(ProcessStep, ProcessStep.id == Task.process_step_id)
+        .outerjoin(Gewerk, Gewerk.id == ProcessStep.gewerk_id)
+        .where(Task.project_id == project_id)
+        .where(*task_filter_criteria(filters, today=today))
+        .group_by(Task.top_id, Task.ebene_id, Task.stiege_id, Task.bauteil_id, Gewerk.id, activity)
+    )
+
+    # ključ parcijale: (segment_id, parent ids..., aktivnost) – roditelji idu uz TOP
+    tops: Dict[tuple, list] = {}
+    gewerke: Dict[tuple, list] = {}
+    for top_id, ebene_id, stiege_id, bauteil_id, gewerk_id, act, *part in db.execute(q).tuples():
+        if top_id is not None:
+            key = (top_id, ebene_id, stiege_id, bauteil_id, act)
+            tops[key] = _merge(tops.get(key), part)
+        if gewerk_id is not None:
+            gewerke[(gewerk_id, act)] = _merge(gewerke.get((gewerk_id, act)), part)
+
+    partials: Dict[str, Dict[tuple, list]] = {"top": tops, "gewerk": gewerke}
+    lower = tops
+    for lvl in _ROLLUP:
+        higher: Dict[tuple, list] = {}
+        for key, part in lower.items():
+            # (top, ebene, stiege, bauteil, act) → (ebene, stiege, bauteil, act) → ...
+            hkey = key[1:]
+            if hkey[0] is not None:
+                higher[hkey] = _merge(higher.get(hkey), part)
+        partials[lvl] = lower = higher
+
+    # gewerk_id parcijala → (naziv, boja); viši nivoi su iz TOP parcijala
+    gewerk_ids = {p[5] for p in tops.values() if p[5] is not None} | {key[0] for key in gewerke}
+    gewerk_meta = {
+        gid: (name, color)
+        for gid, name, color in db.execute(
+            select(Gewerk.id, Gewerk.name, Gewerk.color).where(Gewerk.id.in_(gewerk_ids))
+        )
+    } if gewerk_ids else {}
+
+    levels: Dict[str, List[StructSegment]] = {}
+    for lvl in ALL_LEVELS:
+        by_segment: Dict[int, List[StructActivity]] = {}
+        for key, (start, end, total, done, late, gewerk_id) in partials[lvl].items():
+            gname, color = gewerk_meta.get(gewerk_id, (None, None))
+            by_segment.setdefault(key[0], []).append(StructActivity(
+                activity=key[-1], start=start, end=end,
+                total_tasks=total, done_tasks=done,
+                progress=(done / total) if total else 0.0,
+                delayed=bool(late), gewerk=gname, color=color,
+            ))
+        levels[lvl] = _segments(lvl, by_segment, _segment_meta(db, project_id, lvl) if by_segment else {})
+    return levels
+
+
+@router.get(
+    "/projects/{project_id}/structure-timeline",
+    response_model=Union[StructureTimelineResponse, StructureTimelineLevelsResponse],
+)
 def structure_timeline(
     project_id: int,
     level: str = Query("ebene"),   
@@ -42,180 +304,61 @@ def structure_timeline(
     processModels: Optional[List[str]] = Query(None),
     db: Session = Depends(get_db),
 ):
-    if level not in ("ebene", "stiege", "bauteil"):
+    if level != "all" and level not in SEGMENT_COLUMNS:
         level = "ebene"
     start_d = _parse_date(startDate)
     end_d   = _parse_date(endDate)
-    # bazni upit
-    q = (
-        db.query(Task)
-        .join(Task.process_step, isouter=True)
-        .join(Task.top, isouter=True)
-        .join(Top.ebene, isouter=True)
-        .join(Ebene.stiege, isouter=True)
-        .join(Stiege.bauteil, isouter=True)
-        .options(
-            joinedload(Task.process_step).joinedload(ProcessStep.gewerk),
-            joinedload(Task.top).joinedload(Top.ebene).joinedload(Ebene.stiege).joinedload(Stiege.bauteil),
-        )
-        .filter(Task.project_id == project_id)
-    )
-
-    # *isti* filteri kao u /tasks-timeline (prilagodi prema tvojoj implementaciji)
-    if topIds:
-        q = q.filter(Task.top_id.in_(topIds))
-    if tops:
-        q = q.filter(Top.name.in_(tops))
-    if gewerk:
-        q = q.join(ProcessStep.gewerk).filter(Gewerk.name.in_(gewerk))
-    if status:
-        conds = []
-        if "Erledigt" in status:
-            conds.append(Task.end_ist.isnot(None))
-        if "In Bearbeitung" in status:
-            conds.append(and_(Task.start_ist.isnot(None), Task.end_ist.is_(None)))
-        if "Offen" in status:
-            conds.append(and_(Task.start_ist.is_(None), Task.end_ist.is_(None)))
-        if conds:
-            q = q.filter(or_(*conds))
-    if start_d:
-        q = q.filter(Task.end_soll >= start_d)
-    if end_d:
-        q = q.filter(Task.start_soll <= end_d)
-    if delayed:
-        today = date.today()
-        q = q.filter(or_(
-            and_(Task.end_ist.is_(None), Task.end_soll < today),
-            Task.end_ist > Task.end_soll
-        ))
-    if taskName:
-        q = q.filter(ProcessStep.activity.ilike(f"%{taskName}%"))
-    if ebenen:
-        q = q.filter(Ebene.name.in_(ebenen))
-    if stiegen:
-        q = q.filter(Stiege.name.in_(stiegen))
-    if bauteile:
-        q = q.filter(Bauteil.name.in_(bauteile))
-    if activities:
-        q = q.filter(ProcessStep.activity.in_(activities))
-    if processModels:
-        q = q.join(ProcessStep.model).filter(ProcessModel.name.in_(processModels))
-
-    tasks: List[Task] = q.all()
-
-    # grupiranje: ključ = (segment_id, segment_name, activity)
-    from collections import defaultdict
-    groups: Dict[Tuple[int, str, str], List[Task]] = defaultdict(list)
-    segment_meta: Dict[Tuple[int, str], Optional[str]] = {} 
-
-    def segment_of(t: Task):
-        if level == "ebene":
-            return (t.top.ebene.id, t.top.ebene.name) if t.top and t.top.ebene else (None, None)
-        if level == "stiege":
-            return (t.top.ebene.stiege.id, t.top.ebene.stiege.name) if t.top and t.top.ebene and t.top.ebene.stiege else (None, None)
-        # bauteil
-        st = t.top.ebene.stiege if (t.top and t.top.ebene) else None
-        bt = st.bauteil if st else None
-        return (bt.id, bt.name) if bt else (None, None)
-
-    for t in tasks:
-        seg_id, seg_name = segment_of(t)
-        if not seg_id:
-            continue
-        act = t.process_step.activity if t.process_step else "(ohne Aktivität)"
-        groups[(seg_id, seg_name, act)].append(t)
-
-        # 👇 NOVO: izračunaj "putanju" za dati segment
-        seg_key = (seg_id, seg_name)
-        if seg_key not in segment_meta:
-            top = t.top
-            ebene = top.ebene if top else None
-            stiege = ebene.stiege if ebene else None
-            bauteil = stiege.bauteil if stiege else None
-
-            path: Optional[str] = None
-
-            if level == "ebene":
-                # ispod Ebene želimo npr: "Bauteil-1 - Stiege-1"
-                bt_name = bauteil.name if bauteil else None
-                st_name = stiege.name if stiege else None
-                parts = [p for p in (bt_name, st_name) if p]
-                path = " - ".join(parts) if parts else None
-
-            elif level == "stiege":
-                # ispod Stiege npr: "Bauteil-1"
-                bt_name = bauteil.name if bauteil else None
-                path = bt_name
-
-            elif level == "bauteil":
-                # ako hoćeš, ovdje možeš kasnije dodati projekt, za sad ništa
-                path = None
-
-            segment_meta[seg_key] = path
-
-    # složi odgovor
-    by_segment: Dict[Tuple[int, str], List[StructActivity]] = defaultdict(list)
     today = date.today()
 
-    for (seg_id, seg_name, act), arr in groups.items():
-        # efektivni start/end preko svih taskova u grupi
-        starts = [ _eff_start(t) for t in arr if _eff_start(t) ]
-        ends   = [ _eff_end(t)   for t in arr if _eff_end(t)   ]
-        start = min(starts) if starts else None
-        end   = max(ends)   if ends   else None
-
-        total = len(arr)
-        done  = sum(1 for t in arr if t.end_ist is not None)
-        progress = (done / total) if total else 0.0
-
-        # delayed: ako je barem jedan realni task “u minusu”
-        any_delayed = any(
-            (t.end_ist and t.end_soll and t.end_ist > t.end_soll) or
-            (not t.end_ist and t.end_soll and today > t.end_soll)
-            for t in arr
-        )
-
-         # ➜ uzmi gewerk + color iz ProcessStep.gewerk (prvi koji postoji u grupi)
-        gewerk_names = [
-            t.process_step.gewerk.name
-            for t in arr
-            if t.process_step and t.process_step.gewerk
-        ]
-        gewerk_colors = [
-            t.process_step.gewerk.color
-            for t in arr
-            if t.process_step and t.process_step.gewerk and t.process_step.gewerk.color
-        ]
-        gewerk_name = gewerk_names[0] if gewerk_names else None
-        gewerk_color = gewerk_colors[0] if gewerk_colors else None
-
-        by_segment[(seg_id, seg_name)].append(StructActivity(
-            activity=act, start=start, end=end,
-            total_tasks=total, done_tasks=done,
-            progress=progress, delayed=any_delayed,
-            gewerk=gewerk_name, color=gewerk_color
-        ))
+    # *isti* filteri kao u /tasks-timeline (zajednički compiler)
+    filters = BulkFilters(
+        gewerk=gewerk or [],
+        status=status or [],
+        startDate=start_d,
+        endDate=end_d,
+        delayed=delayed,
+        taskName=taskName,
+        tops=tops or [],
+        ebenen=ebenen or [],
+        stiegen=stiegen or [],
+        bauteile=bauteile or [],
+        activities=activities or [],
+        processModels=processModels or [],
+        topIds=topIds or None,
+    )
 
-    segments: List[StructSegment] = []
-    for (seg_id, seg_name), acts in by_segment.items():
-        seg_key = (seg_id, seg_name)
-        path = segment_meta.get(seg_key)
+    if level == "all":
+        return StructureTimelineLevelsResponse(
+            project_id=project_id,
+            level="all",
+            levels=_structure_levels(db, project_id, filters, today),
+        )
 
-        segments.append(
-            StructSegment(
-                level=level,
-                id=seg_id,
-                name=seg_name,
-                structure_path=path,  # 👈 NOVO
-                activities=sorted(
-                    acts, key=lambda a: (a.start or date.max, a.activity)
-                ),
-            )
+    criteria = task_filter_criteria(filters, today=today)
+    if not criteria and level in ROLLUP_SEGMENTS:
+        # bez filtera → održavani rollup, O(Ebene × aktivnosti)
+        q = _rollup_query(project_id, level, today)
+    else:
+        # GROUP BY (segment, aktivnost) u bazi → vraća samo agregirane redove,
+        # trošak raste sa segmenti × aktivnosti, ne sa brojem taskova
+        seg_col = SEGMENT_COLUMNS[level]
+        activity = activity_expr()
+        q = _with_gewerk(
+            select(seg_col.label("segment_id"), activity.label("activity"), *_aggregate_columns(today))
+            .select_from(Task)
+            .outerjoin(ProcessStep, ProcessStep.id == Task.process_step_id)
+            .outerjoin(Gewerk, Gewerk.id == ProcessStep.gewerk_id)
+            .where(Task.project_id == project_id, seg_col.isnot(None))
+            .where(*criteria)
+            .group_by(seg_col, activity)
         )
 
+    by_segment: Dict[int, List[StructActivity]] = {}
+    for row in db.execute(q):
+        by_segment.setdefault(row.segment_id, []).append(_struct_activity(row))
+
     return StructureTimelineResponse(
         project_id=project_id,
         level=level,
-        segments=sorted(segments, key=lambda s: s.name.lower())
+        segments=_segments(level, by_segment, _segment_meta(db, project_id, level)),
     )
-
@@ -16,6 +16,18 @@ class ProjectRead(BaseModel):
     image_url: Optional[str] = None
     model_config = ConfigDict(from_attributes=True)
 
+class ProjectSummary(ProjectRead):
+    """GET /projects/summary – projekt + brojevi taskova za Dashboard."""
+    total: int = 0
+    done: int = 0
+    in_progress: int = 0
+    offen: int = 0
+    delayed: int = 0
+    percent_done: float = 0.0
+    start: Optional[date] = None           # najraniji start (IST, inače SOLL)
+    end: Optional[date] = None             # najkasniji kraj (IST, inače SOLL)
+    next_milestone: Optional[date] = None  # najraniji end_soll otvorenog taska od danas
+
 class ProjectUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
@@ -35,3 +47,14 @@ class Project(BaseModel):
 class UserAssign(BaseModel):
     email: str
 
+
+class ProjectClosureCreate(BaseModel):
+    """Zatvaranje gradilišta (npr. Betriebsurlaub) – [start, end] inkluzivno."""
+    start: date
+    end: date
+    name: Optional[str] = None
+
+class ProjectClosureRead(ProjectClosureCreate):
+    id: int
+    project_id: int
+    model_config = ConfigDict(from_attributes=True)
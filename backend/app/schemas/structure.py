@@ -58,6 +58,7 @@ class StiegeUpdate(BaseModel):
     name: Optional[str] = None
     process_model_id: Optional[int] = None
     start_soll: date | None = None
+    bauteil_id: Optional[int] = None  # premještanje pod drugi Bauteil (isti projekt)
 
 class BauteilUpdate(BaseModel):
     name: Optional[str] = None
@@ -68,8 +69,10 @@ class EbeneUpdate(BaseModel):
     name: Optional[str] = None
     process_model_id: Optional[int] = None
     start_soll: date | None = None
+    stiege_id: Optional[int] = None  # premještanje pod drugu Stiege (isti projekt)
 
 class TopUpdate(BaseModel):
     name: Optional[str] = None
     process_model_id: Optional[int] = None
     start_soll: date | None = None
+    ebene_id: Optional[int] = None  # premještanje pod drugu Ebene (isti projekt)
@@ -1,6 +1,6 @@
 # app/schemas/structure_timeline.py
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import date
 
 class StructActivity(BaseModel):
@@ -15,7 +15,7 @@ class StructActivity(BaseModel):
     color: Optional[str] = None
 
 class StructSegment(BaseModel):
-    level: str            # "ebene" | "stiege" | "bauteil"
+    level: str            # "top" | "ebene" | "stiege" | "bauteil" | "gewerk"
     id: int
     name: str
     structure_path: Optional[str] = None
@@ -23,5 +23,11 @@ class StructSegment(BaseModel):
 
 class StructureTimelineResponse(BaseModel):
     project_id: int
-    level: str            # "ebene" | "stiege" | "bauteil"
+    level: str            # "top" | "ebene" | "stiege" | "bauteil" | "gewerk"
     segments: List[StructSegment]
+
+class StructureTimelineLevelsResponse(BaseModel):
+    """level=all → svi nivoi u jednom odgovoru (prebacivanje zooma bez novog poziva)."""
+    project_id: int
+    level: str            # "all"
+    levels: Dict[str, List[StructSegment]]
@@ -1,6 +1,6 @@
 # app/schemas/task.py
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, ConfigDict, Field, AliasChoices
 
 # === CREATE ===
@@ -37,6 +37,16 @@ class TaskUpdate(BaseModel):
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
 
+# === BATCH (POST /tasks/batch) ===
+class TaskBatchItem(TaskUpdate):
+    """Patch jednog taska – ista polja kao TaskUpdate + id."""
+    id: int
+
+
+class TaskBatchRequest(BaseModel):
+    items: List[TaskBatchItem] = Field(min_length=1, max_length=2000)
+
+
 # === READ ===
 class TaskRead(TaskCreate):
     id: int
@@ -0,0 +1,125 @@
+# migrate_sqlite.py
+# Dodaje nove kolone/indekse u postojeću SQLite bazu (idempotentno).
+# Nove TABELE pravi Base.metadata.create_all() pri startu backenda,
+# ali SQLite/create_all ne dodaje kolone u postojeće tabele – to radi ova skripta.
+import sqlite3, sys, time
+from pathlib import Path
+
+from app.core.natural_sort import natural_key
+
+DB = "test.db"  # ➜ promijeni ako se tvoja datoteka zove drukčije (npr. app.db)
+
+db_path = Path(__file__).with_name(DB)
+if not db_path.exists():
+    print(f"[ERROR] DB file not found: {db_path}")
+    sys.exit(1)
+
+print(f"[INFO] Using DB: {db_path}")
+
+con = sqlite3.connect(str(db_path))
+con.create_function("natural_key", 1, natural_key, deterministic=True)
+cur = con.cursor()
+
+# (tabela, kolona, DDL) – DDL ide u "ALTER TABLE <tabela> ADD COLUMN ..."
+columns = [
+  # delta sync taskova (/projects/{id}/tasks/changes)
+  ("tasks", "updated_at", "updated_at DATETIME"),
+  ("tasks", "revision",   "revision INTEGER NOT NULL DEFAULT 0"),
+  # prirodni sort ključevi strukture + složeni ključ na tasku
+  ("bauteile", "sort_key", "sort_key VARCHAR"),
+  ("stiegen",  "sort_key", "sort_key VARCHAR"),
+  ("ebenen",   "sort_key", "sort_key VARCHAR"),
+  ("tops",     "sort_key", "sort_key VARCHAR"),
+  ("tasks",    "sort_key", "sort_key VARCHAR"),
+  # denormalizirana struktura na tasku (app/core/structure_denorm.py)
+  ("tasks", "bauteil_id", "bauteil_id INTEGER REFERENCES bauteile(id) ON DELETE CASCADE"),
+  ("tasks", "stiege_id",  "stiege_id INTEGER REFERENCES stiegen(id) ON DELETE CASCADE"),
+  ("tasks", "ebene_id",   "ebene_id INTEGER REFERENCES ebenen(id) ON DELETE CASCADE"),
+  ("tasks", "location",   "location VARCHAR"),
+]
+
+# backfill nakon dodavanja kolona (idempotentno)
+backfills = [
+  "UPDATE tasks SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL",
+  # natural_key() je Python funkcija registrovana na konekciji (vidi dolje)
+  "UPDATE bauteile SET sort_key = natural_key(name) WHERE sort_key IS NULL AND name IS NOT NULL",
+  "UPDATE stiegen  SET sort_key = natural_key(name) WHERE sort_key IS NULL AND name IS NOT NULL",
+  "UPDATE ebenen   SET sort_key = natural_key(name) WHERE sort_key IS NULL AND name IS NOT NULL",
+  "UPDATE tops     SET sort_key = natural_key(name) WHERE sort_key IS NULL AND name IS NOT NULL",
+  # isti format kao app/core/structure_denorm.py (separator char(31))
+  """
+  UPDATE tasks SET sort_key = (
+    SELECT (CASE WHEN b.sort_key IS NULL THEN '1' ELSE '0' || b.sort_key END) || char(31)
+        || (CASE WHEN s.sort_key IS NULL THEN '1' ELSE '0' || s.sort_key END) || char(31)
+        || (CASE WHEN e.sort_key IS NULL THEN '1' ELSE '0' || e.sort_key END) || char(31)
+        || (CASE WHEN t.sort_key IS NULL THEN '1' ELSE '0' || t.sort_key END)
+    FROM tops t
+    JOIN ebenen e   ON e.id = t.ebene_id
+    JOIN stiegen s  ON s.id = e.stiege_id
+    JOIN bauteile b ON b.id = s.bauteil_id
+    WHERE t.id = tasks.top_id
+  )
+  WHERE sort_key IS NULL
+  """,
+  # roditelji TOP-a + putanja "Bauteil • Stiege • Ebene • Top" (prazni nazivi se preskaču)
+  """
+  UPDATE tasks SET
+    bauteil_id = x.bauteil_id,
+    stiege_id  = x.stiege_id,
+    ebene_id   = x.ebene_id,
+    location   = x.location
+  FROM (
+    SELECT t.id AS top_id, b.id AS bauteil_id, s.id AS stiege_id, e.id AS ebene_id,
+           nullif(substr(
+               coalesce(' • ' || nullif(b.name, ''), '')
+            || coalesce(' • ' || nullif(s.name, ''), '')
+            || coalesce(' • ' || nullif(e.name, ''), '')
+            || coalesce(' • ' || nullif(t.name, ''), ''), 4), '') AS location
+    FROM tops t
+    JOIN ebenen e   ON e.id = t.ebene_id
+    JOIN stiegen s  ON s.id = e.stiege_id
+    JOIN bauteile b ON b.id = s.bauteil_id
+  ) AS x
+  WHERE x.top_id = tasks.top_id AND tasks.ebene_id IS NULL
+  """,
+]
+
+indexes = [
+  "CREATE INDEX IF NOT EXISTS idx_tasks_project_revision ON tasks(project_id, revision)",
+  "CREATE INDEX IF NOT EXISTS idx_tasks_project_sort     ON tasks(project_id, sort_key)",
+  "CREATE INDEX IF NOT EXISTS idx_tasks_project_bauteil  ON tasks(project_id, bauteil_id)",
+  "CREATE INDEX IF NOT EXISTS idx_tasks_project_stiege   ON tasks(project_id, stiege_id)",
+  "CREATE INDEX IF NOT EXISTS idx_tasks_project_ebene    ON tasks(project_id, ebene_id)",
+  "CREATE INDEX IF NOT EXISTS idx_tasks_top_step         ON tasks(top_id, process_step_id)",
+]
+
+def existing_columns(table: str) -> set[str]:
+    return {row[1] for row in cur.execute(f"PRAGMA table_info({table})")}
+
+def table_exists(table: str) -> bool:
+    return cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+    ).fetchone() is not None
+
+t0 = time.time()
+print("[INFO] Adding columns (idempotent)...")
+for table, col, ddl in columns:
+    if not table_exists(table):
+        print(f"[SKIP] {table} ne postoji (create_all će je napraviti)")
+        continue
+    if col in existing_columns(table):
+        continue
+    cur.execute(f"ALTER TABLE {table} ADD COLUMN {ddl}")
+    print(f"[OK] {table}.{col}")
+
+print("[INFO] Backfill...")
+for sql in backfills:
+    cur.execute(sql)
+
+print("[INFO] Creating indexes (idempotent)...")
+for sql in indexes:
+    cur.execute(sql)
+
+con.commit()
+con.close()
+print(f"[DONE] Migration done in {time.time()-t0:.2f}s")
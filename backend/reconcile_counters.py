@@ -0,0 +1,39 @@
+# reconcile_counters.py
+# Provjera/popravka brojača taskova po projektu (project_counters,
+# app/core/project_counters.py) – noćni job nakon snapshot_stats.py.
+#
+#   python reconcile_counters.py           → provjeri i ponovo složi ako ima razlika
+#   python reconcile_counters.py --check   → samo provjeri (exit 1 ako ima razlika)
+#
+# Redovi od jučer ("delayed" zavisi od datuma) se također računaju kao razlika.
+import sys, time
+
+import app.models  # noqa: F401  (registruj sve modele)
+from app.database import Base, SessionLocal, engine
+from app.core.project_counters import reconcile_project_counters, stale_counter_rows
+
+
+def run(check_only: bool) -> int:
+    # tabela možda još ne postoji (backend nije pokretan)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    t0 = time.time()
+    try:
+        diff = stale_counter_rows(db)
+        print(f"[INFO] Redovi brojača koji ne odgovaraju taskovima: {diff}")
+        if check_only:
+            return 1 if diff else 0
+
+        if diff:
+            rows = reconcile_project_counters(db)
+            db.commit()
+            print(f"[OK] Brojači ponovo složeni: {rows} redova ({time.time()-t0:.2f}s)")
+        else:
+            print(f"[OK] Brojači ok ({time.time()-t0:.2f}s)")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(run(check_only="--check" in sys.argv[1:]))
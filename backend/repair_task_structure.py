@@ -0,0 +1,93 @@
+# repair_task_structure.py
+# Provjera/popravka denormalizirane strukture (app/core/structure_denorm.py,
+# app/core/structure_closure.py):
+#   - sort_key na Bauteil/Stiege/Ebene/Top  == natural_key(name)
+#   - structure_closure == parovi (predak, potomak) iz FK-ova strukture
+#   - Task.bauteil_id/stiege_id/ebene_id/location/sort_key == vrijednosti iz TOP-a
+#   - structure_activity_rollup == agregat taskova (app/core/structure_rollup.py)
+#
+#   python repair_task_structure.py           → provjeri i popravi
+#   python repair_task_structure.py --check   → samo provjeri (exit 1 ako ima razlika)
+import sys, time
+
+from sqlalchemy import except_, func, select
+
+import app.models  # noqa: F401  (registruj sve modele)
+from app.database import Base, SessionLocal, engine
+from app.core.natural_sort import natural_key
+from app.core.structure_closure import closure_select, rebuild_structure_closure
+from app.core.structure_denorm import refresh_task_structure, stale_task_criteria
+from app.core.structure_rollup import ensure_rollup_schema, rebuild_structure_rollup, stale_rollup_rows
+from app.models.structure import Bauteil, Stiege, Ebene, Top, StructureClosure
+from app.models.task import Task
+
+
+def run(check_only: bool) -> int:
+    # project_revisions/task_tombstones možda još ne postoje (backend nije pokretan)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    t0 = time.time()
+    try:
+        # rollup iz starije sheme → prazna nova tabela (provjera ispod je onda prijavi)
+        ensure_rollup_schema(db)
+
+        # 1) sort_key strukture (računa se u Pythonu → provjera u Pythonu)
+        stale_nodes = 0
+        for cls in (Bauteil, Stiege, Ebene, Top):
+            for obj in db.query(cls).all():
+                expected = natural_key(obj.name)
+                if obj.sort_key != expected:
+                    stale_nodes += 1
+                    if not check_only:
+                        # mapper event bi ga postavio tek na promjeni naziva → direktno
+                        obj.sort_key = expected
+        print(f"[INFO] Struktura s pogrešnim sort_key: {stale_nodes}")
+
+        if not check_only and stale_nodes:
+            db.flush()
+
+        # 2) closure tabela (razlika u oba smjera)
+        actual = select(
+            StructureClosure.project_id, StructureClosure.ancestor_kind, StructureClosure.ancestor_id,
+            StructureClosure.descendant_kind, StructureClosure.descendant_id, StructureClosure.depth,
+        )
+        expected = select(closure_select().subquery())
+        diff = 0
+        for a, b in ((expected, actual), (actual, expected)):
+            diff += db.execute(select(func.count()).select_from(except_(a, b).subquery())).scalar() or 0
+        print(f"[INFO] Closure redovi koji ne odgovaraju strukturi: {diff}")
+
+        if not check_only and diff:
+            rebuild_structure_closure(db)
+
+        # 3) taskovi
+        stale = stale_task_criteria()
+        stale_tasks = db.execute(select(func.count(Task.id)).where(stale)).scalar() or 0
+        print(f"[INFO] Taskovi s neispravnom strukturom: {stale_tasks}")
+
+        # 4) rollup aktivnosti (provjera tek nakon popravke taskova, jer zavisi od ebene_id)
+        if not check_only and stale_tasks:
+            fixed = refresh_task_structure(db, stale)
+            db.flush()
+        else:
+            fixed = 0
+        rollup_diff = stale_rollup_rows(db)
+        print(f"[INFO] Rollup redovi koji ne odgovaraju taskovima: {rollup_diff}")
+
+        if check_only:
+            return 1 if (stale_nodes or diff or stale_tasks or rollup_diff) else 0
+
+        if rollup_diff:
+            rebuild_structure_rollup(db)
+        db.commit()
+        print(
+            f"[OK] Popravljeno: {stale_nodes} čvorova, closure {'ponovo složen' if diff else 'ok'}, "
+            f"{fixed} taskova, rollup {'ponovo složen' if rollup_diff else 'ok'} ({time.time()-t0:.2f}s)"
+        )
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(run(check_only="--check" in sys.argv[1:]))
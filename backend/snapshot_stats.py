@@ -0,0 +1,54 @@
+# snapshot_stats.py
+# Dnevni snimak statistike projekata (project_stats_snapshots) za brze
+# /stats?until=<prošli dan> i trend (/projects/{id}/stats/history).
+#
+#   python snapshot_stats.py                    → snimi jučerašnji dan (noćni job, cron / Task Scheduler)
+#   python snapshot_stats.py --day 2025-06-30   → snimi zadani dan
+#   python snapshot_stats.py --backfill 30      → snimi zadnjih 30 dana (do jučer)
+#
+# Ponavljanje je sigurno – snimak istog dana se zamjenjuje.
+import sys, time
+from datetime import date, timedelta
+
+import app.models  # noqa: F401  (registruj sve modele)
+from app.database import Base, SessionLocal, engine
+from app.core.task_stats import snapshot_stats
+
+
+def _arg(name: str):
+    args = sys.argv[1:]
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args):
+            return args[i + 1]
+    return None
+
+
+def run() -> int:
+    # tabela možda još ne postoji (backend nije pokretan)
+    Base.metadata.create_all(bind=engine)
+
+    yesterday = date.today() - timedelta(days=1)
+    if _arg("--day"):
+        days = [date.fromisoformat(_arg("--day"))]
+    elif _arg("--backfill"):
+        n = int(_arg("--backfill"))
+        days = [yesterday - timedelta(days=i) for i in range(n - 1, -1, -1)]
+    else:
+        days = [yesterday]
+
+    db = SessionLocal()
+    t0 = time.time()
+    try:
+        for d in days:
+            rows = snapshot_stats(db, d)
+            print(f"[INFO] {d}: {rows} redova")
+        db.commit()
+        print(f"[OK] Snimljeno {len(days)} dan(a) ({time.time()-t0:.2f}s)")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -1,5 +1,8 @@
 @echo off
 cd /d C:\DATA\FastAPI-React\backend
 
+REM SHEMA: dodaj nove kolone/indekse u postojecu bazu (idempotentno)
+"C:\DATA\FastAPI-React\backend\venv\Scripts\python.exe" migrate_sqlite.py >> backend_log.txt 2>&1
+
 REM START BACKEND U LOG FAJL DA VIDIMO AKO IMA GRESKE
 "C:\DATA\FastAPI-React\backend\venv\Scripts\python.exe" -m uvicorn app.main:app --host 0.0.0.0 --port 8001 >> backend_log.txt 2>&1
@@ -0,0 +1,98 @@
+# tests/conftest.py
+"""
+Zajednički fixture-i: SQLite u memoriji + mala aplikacija samo s rutama
+taskova (app.main se NE importuje – on pri importu radi create_all i
+ensure_* nad ./test.db).
+
+SessionLocal se veže na memorijsku bazu, pa get_db i svi listeneri
+(revizije, denormalizirana struktura, rollup, brojači) rade kao u produkciji.
+"""
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401 – registruje sve tabele
+from app.core import task_sync, structure_denorm, structure_closure, structure_rollup, project_counters  # noqa: F401
+from app.database import Base, SessionLocal
+from app.models.gewerk import Gewerk
+from app.models.process import ProcessModel, ProcessStep
+from app.models.project import Project
+from app.models.structure import Top, Ebene, Stiege, Bauteil
+from app.models.task import Task
+from app.routes import task as task_routes
+from app.routes.task_structure import router as structure_router
+
+
+@pytest.fixture
+def engine():
+    eng = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=eng)
+    old_bind = SessionLocal.kw["bind"]
+    SessionLocal.configure(bind=eng)
+    yield eng
+    SessionLocal.configure(bind=old_bind)
+    eng.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(engine):
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(task_routes.router)
+    app.include_router(structure_router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def project(db):
+    """
+    Projekt 2 Bauteil × 2 Stiege × 2 Ebene × 2 Top, model s 3 koraka
+    (3 gewerka) i po jedan task po (Top, korak). Vraća project_id.
+    """
+    gewerke = [Gewerk(name=n) for n in ("Elektro", "Sanitär", "Maler")]
+    model = ProcessModel(name="Wohnung")
+    for i, (activity, gewerk) in enumerate(zip(("Leitungen", "Rohre", "Anstrich"), gewerke)):
+        model.steps.append(ProcessStep(activity=activity, gewerk=gewerk, duration_days=2, order=i))
+    p = Project(name="Testprojekt", start_date=date(2025, 3, 3))
+    db.add_all([*gewerke, model, p])
+    db.flush()
+
+    tops = []
+    for b in ("BT 1", "BT 2"):
+        bauteil = Bauteil(name=b, project_id=p.id)
+        for s in ("Stiege 1", "Stiege 2"):
+            stiege = Stiege(name=s)
+            bauteil.stiegen.append(stiege)
+            for e in ("EG", "OG 1"):
+                ebene = Ebene(name=e)
+                stiege.ebenen.append(ebene)
+                for t in ("Top 1", "Top 2"):
+                    top = Top(name=t)
+                    ebene.tops.append(top)
+                    tops.append(top)
+        db.add(bauteil)
+    db.flush()
+
+    for n, top in enumerate(tops):
+        for i, step in enumerate(model.steps):
+            start = date(2025, 3, 3 + n % 5 + 2 * i)
+            db.add(Task(
+                project_id=p.id, top_id=top.id, process_step_id=step.id,
+                start_soll=start, end_soll=date(start.year, start.month, start.day + 1),
+                status="offen",
+            ))
+    db.commit()
+    return p.id
@@ -0,0 +1,121 @@
+# tests/test_structure_timeline.py
+"""
+/structure-timeline: gewerk i boja aktivnosti moraju doći iz ISTOG gewerka
+(MIN(Gewerk.id) grupe) – i kad je ista aktivnost u grupi vezana za više
+gewerka, na svakom nivou, u level=all i iz rolluppa (bez filtera), koji mora
+dati iste redove kao filtrirani GROUP BY.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import inspect, text
+
+from app.core.structure_rollup import ensure_structure_rollup, stale_rollup_rows
+from app.models.gewerk import Gewerk
+from app.models.process import ProcessModel, ProcessStep
+from app.models.structure import StructureActivityRollup, Top
+from app.models.task import Task
+
+LEVELS = ["top", "ebene", "stiege", "bauteil", "gewerk"]
+
+# uz filter ide GROUP BY nad taskovima (bez filtera ebene/stiege/bauteil čitaju rollup)
+ALL_MODELS = {"processModels": ["Wohnung", "Wohnung B"]}
+
+
+@pytest.fixture
+def two_gewerke(db, project):
+    """
+    "Leitungen" još jednom, u drugom modelu i s drugim gewerkom, na svakom
+    TOP-u projekta. MIN(naziv) je novi gewerk, MIN(boja) Elektro → nezavisni
+    MIN-ovi bi dali par koji ne postoji.
+    """
+    elektro = db.query(Gewerk).filter_by(name="Elektro").one()
+    elektro.color = "#ff0000"
+    abdichtung = Gewerk(name="Abdichtung", color="#ffffff")
+    model = ProcessModel(name="Wohnung B")
+    model.steps.append(ProcessStep(activity="Leitungen", gewerk=abdichtung, duration_days=1, order=0))
+    db.add_all([abdichtung, model])
+    db.flush()
+    assert elektro.id < abdichtung.id
+
+    for top_id, in db.query(Top.id).filter(Top.id.in_(
+        db.query(Task.top_id).filter(Task.project_id == project)
+    )):
+        db.add(Task(
+            project_id=project, top_id=top_id, process_step_id=model.steps[0].id,
+            start_soll=date(2025, 4, 1), end_soll=date(2025, 4, 1), status="offen",
+        ))
+    db.commit()
+    return {g.name: g.color for g in db.query(Gewerk)}
+
+
+def _activities(segments):
+    for seg in segments:
+        yield from seg["activities"]
+
+
+def _check_pairs(activities, colors):
+    seen = False
+    for act in activities:
+        if act["gewerk"] is not None:
+            assert colors[act["gewerk"]] == act["color"], act
+        if act["activity"] == "Leitungen":
+            seen = True
+            assert (act["gewerk"], act["color"]) in {("Elektro", "#ff0000"), ("Abdichtung", "#ffffff")}
+    assert seen
+
+
+@pytest.mark.parametrize("level", LEVELS)
+def test_filtered_gewerk_and_color_are_a_pair(client, project, two_gewerke, level):
+    r = client.get(f"/projects/{project}/structure-timeline", params={"level": level, **ALL_MODELS})
+    assert r.status_code == 200
+    activities = list(_activities(r.json()["segments"]))
+    _check_pairs(activities, two_gewerke)
+    if level != "gewerk":
+        # obje gewerke u grupi → MIN(id) = Elektro
+        assert {(a["gewerk"], a["color"]) for a in activities if a["activity"] == "Leitungen"} == {
+            ("Elektro", "#ff0000")
+        }
+
+
+def test_all_levels_gewerk_and_color_are_a_pair(client, project, two_gewerke):
+    r = client.get(f"/projects/{project}/structure-timeline", params={"level": "all", **ALL_MODELS})
+    assert r.status_code == 200
+    levels = r.json()["levels"]
+    for level in LEVELS:
+        _check_pairs(_activities(levels[level]), two_gewerke)
+
+    single = client.get(f"/projects/{project}/structure-timeline", params={"level": "ebene", **ALL_MODELS})
+    assert levels["ebene"] == single.json()["segments"]
+
+
+@pytest.mark.parametrize("level", ["ebene", "stiege", "bauteil"])
+def test_rollup_matches_filtered_group_by(client, project, two_gewerke, level):
+    rollup = client.get(f"/projects/{project}/structure-timeline", params={"level": level})
+    filtered = client.get(f"/projects/{project}/structure-timeline", params={"level": level, **ALL_MODELS})
+    assert rollup.status_code == filtered.status_code == 200
+    _check_pairs(_activities(rollup.json()["segments"]), two_gewerke)
+    assert rollup.json() == filtered.json()
+
+
+def test_ensure_rebuilds_rollup_from_old_schema(engine, db, project, two_gewerke):
+    """Rollup tabela sa starim kolonama gewerk/color se pri startu napravi iznova i popuni."""
+    with engine.begin() as conn:
+        StructureActivityRollup.__table__.drop(conn)
+        conn.execute(text(
+            "CREATE TABLE structure_activity_rollup (id INTEGER PRIMARY KEY, project_id INTEGER NOT NULL,"
+            " ebene_id INTEGER NOT NULL, activity VARCHAR, start DATE, \"end\" DATE,"
+            " total INTEGER NOT NULL, done INTEGER NOT NULL, late_done INTEGER NOT NULL,"
+            " open_end_min DATE, gewerk VARCHAR, color VARCHAR)"
+        ))
+        conn.execute(text(
+            "INSERT INTO structure_activity_rollup (project_id, ebene_id, activity, total, done, late_done)"
+            " VALUES (:p, 1, 'Leitungen', 1, 0, 0)"
+        ), {"p": project})
+
+    ensure_structure_rollup(db)
+
+    columns = {c["name"] for c in inspect(engine).get_columns("structure_activity_rollup")}
+    assert "gewerk_id" in columns and "gewerk" not in columns
+    assert db.query(StructureActivityRollup).count() > 0
+    assert stale_rollup_rows(db) == 0
@@ -0,0 +1,160 @@
+# tests/test_task_filters.py
+"""
+Filteri taskova (app/core/task_filters.py) ne smiju dodavati joinove:
+za kombinirane filtere strukture i koraka se svaki upit endpointa provjeri
+preko EXPLAIN QUERY PLAN – svaka tabela strukture/koraka smije biti
+pristupljena najviše jednom po upitu odnosno podupitu.
+"""
+import re
+from collections import Counter
+from datetime import date
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.orm import aliased
+
+from app.models.process import ProcessStep
+from app.models.task import Task
+
+CHECKED_TABLES = {
+    "tops", "ebenen", "stiegen", "bauteile", "process_steps", "gewerke", "process_models",
+}
+
+# čvorovi plana koji otvaraju novi doseg (podupit, CTE, UNION …)
+SCOPE_PREFIXES = (
+    "LIST SUBQUERY", "SCALAR SUBQUERY", "CORRELATED", "MATERIALIZE", "CO-ROUTINE",
+    "COMPOUND", "UNION", "LEFT-MOST SUBQUERY", "MULTI-INDEX OR",
+)
+
+TABLE_ACCESS = re.compile(r"^(?:SCAN|SEARCH) (\w+)")
+ANON_ALIAS = re.compile(r"_\d+$")  # SQLAlchemy: process_steps_1 → process_steps
+
+STRUCTURE_AND_STEP = {
+    "top": ["Top 1"],
+    "ebene": ["EG"],
+    "stiege": ["Stiege 1"],
+    "bauteil": ["BT 1"],
+    "gewerk": ["Elektro"],
+    "activity": ["Leitungen"],
+    "processModel": ["Wohnung"],
+}
+
+
+@pytest.fixture
+def statements(engine):
+    """Svi SQL upiti poslani bazi dok je fixture aktivan."""
+    captured: list[tuple[str, object]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")):
+            captured.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    yield captured
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+def duplicate_accesses(engine, statements) -> list[tuple[str, str, int]]:
+    """(upit, tabela, broj pristupa) gdje je tabela više puta u istom dosegu."""
+    found = []
+    with engine.connect() as conn:
+        for sql, params in statements:
+            plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params).all()
+            nodes = {node_id: (parent, detail) for node_id, parent, _, detail in plan}
+
+            def scope_of(node_id):
+                parent = nodes[node_id][0]
+                while parent in nodes and not nodes[parent][1].startswith(SCOPE_PREFIXES):
+                    parent = nodes[parent][0]
+                return parent
+
+            per_scope = Counter()
+            for node_id, (_, detail) in nodes.items():
+                m = TABLE_ACCESS.match(detail)
+                if m:
+                    table = ANON_ALIAS.sub("", m.group(1))
+                    if table in CHECKED_TABLES:
+                        per_scope[(scope_of(node_id), table)] += 1
+            found.extend(
+                (sql, table, n) for (_, table), n in per_scope.items() if n > 1
+            )
+    return found
+
+
+def test_timeline_filters_join_each_table_once(client, engine, project, statements):
+    r = client.get(f"/projects/{project}/tasks-timeline", params=STRUCTURE_AND_STEP)
+    assert r.status_code == 200
+    assert len(r.json()) == 1  # BT 1 / Stiege 1 / EG / Top 1, korak "Leitungen"
+
+    assert statements
+    assert duplicate_accesses(engine, statements) == []
+
+
+@pytest.mark.parametrize("level", ["top", "ebene", "stiege", "bauteil", "gewerk", "all"])
+def test_structure_timeline_filters_join_each_table_once(client, engine, project, statements, level):
+    params = {
+        "level": level,
+        "tops": ["Top 1"],
+        "ebenen": ["EG"],
+        "stiegen": ["Stiege 1"],
+        "bauteile": ["BT 1"],
+        "gewerk": ["Elektro"],
+        "activities": ["Leitungen"],
+        "processModels": ["Wohnung"],
+    }
+    r = client.get(f"/projects/{project}/structure-timeline", params=params)
+    assert r.status_code == 200
+
+    assert statements
+    assert duplicate_accesses(engine, statements) == []
+
+
+def test_bulk_update_filters_join_each_table_once(client, engine, project, statements):
+    filters = {
+        "tops": ["Top 1"],
+        "ebenen": ["EG"],
+        "stiegen": ["Stiege 1"],
+        "bauteile": ["BT 1"],
+        "gewerk": ["Elektro"],
+        "activities": ["Leitungen"],
+        "processModels": ["Wohnung"],
+    }
+    r = client.patch(
+        f"/projects/{project}/tasks/bulk",
+        json={"filters": filters, "update": {"status": "done"}},
+    )
+    assert r.status_code == 200
+    assert r.json()["betroffen"] == 1
+
+    assert duplicate_accesses(engine, statements) == []
+
+
+def test_skip_window_filters_join_each_table_once(client, engine, project, statements):
+    filters = {
+        "top": ["Top 1"],
+        "ebene": ["EG"],
+        "stiege": ["Stiege 1"],
+        "bauteil": ["BT 1"],
+        "gewerk": ["Elektro"],
+        "activity": ["Leitungen"],
+        "processModel": ["Wohnung"],
+    }
+    r = client.post(
+        f"/projects/{project}/schedule/skip-window",
+        json={"start": str(date(2025, 3, 1)), "end": str(date(2025, 3, 31)), "filters": filters},
+    )
+    assert r.status_code == 200
+    assert r.json()["moved"] == 1
+
+    assert duplicate_accesses(engine, statements) == []
+
+
+def test_duplicate_join_is_detected(engine, project, statements, db):
+    """Kontrola samog testa: dvostruki join iste tabele u jednom dosegu se prepoznaje."""
+    step2 = aliased(ProcessStep)
+    db.execute(
+        select(Task.id)
+        .join(ProcessStep, ProcessStep.id == Task.process_step_id)
+        .join(step2, step2.id == Task.process_step_id)
+    ).all()
+    assert [table for _, table, _ in duplicate_accesses(engine, statements)] == ["process_steps"]
@@ -0,0 +1,228 @@
+# tests/test_task_stats.py
+"""
+/stats i /task-stats (app/core/task_stats.py, jedan GROUP BY) moraju dati
+isti JSON kao ranije klasifikovanje task po task u Pythonu – uklj. gewerke
+bez naziva ("Allgemein"), redoslijed by_gewerk i zaokruživanje percent_done.
+Referentne funkcije ispod su prijašnja implementacija ruta.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.orm import joinedload
+
+from app.models.gewerk import Gewerk
+from app.models.process import ProcessModel, ProcessStep
+from app.models.project import Project
+from app.models.task import Task
+
+D = date  # kraće u tabeli ispod
+
+# (gewerk koraka, Task.status, start_soll, start_ist, end_ist)
+# gewerk None = korak bez gewerka; "—" = task bez koraka (nepostojeći process_step_id)
+TASKS = [
+    ("Sanitär", "done",        D(2025, 1, 6),  D(2025, 1, 6),  D(2025, 1, 10)),
+    ("Elektro", "in_progress", D(2025, 1, 13), D(2025, 1, 14), None),
+    (" Maler ", "offen",       D(2025, 2, 3),  None,           None),
+    ("Maler",   "done",        D(2025, 1, 20), D(2025, 1, 21), D(2025, 2, 14)),
+    ("",        "offen",       D(2025, 1, 8),  None,           None),
+    ("   ",     "in_progress", D(2025, 1, 9),  D(2025, 1, 9),  None),
+    (None,      "done",        D(2025, 1, 2),  D(2025, 1, 2),  D(2025, 1, 3)),
+    ("—",       "offen",       D(2025, 1, 15), None,           None),
+    ("Elektro", "done",        None,           None,           D(2025, 1, 31)),
+    ("Sanitär", "offen",       None,           None,           None),
+    ("Elektro", "offen",       D(2026, 6, 1),  None,           None),   # samo budući plan
+    ("Dach",    "blocked",     D(2026, 7, 1),  None,           None),   # nepoznat status
+    ("Elektro", None,          D(2025, 3, 3),  D(2025, 3, 4),  D(2025, 3, 20)),
+    ("Sanitär", "in_progress", D(2025, 2, 10), D(2025, 2, 12), D(2025, 4, 1)),
+]
+
+UNTIL = [None, D(2024, 12, 31), D(2025, 1, 9), D(2025, 1, 31), D(2025, 2, 12), D(2025, 12, 31)]
+
+
+# ---------- prijašnja implementacija (task po task) ----------
+
+def old_stats(tasks: list[Task], until) -> dict:
+    def gname_of(t: Task) -> str:
+        try:
+            name = (t.process_step.gewerk.name or "").strip()
+        except Exception:
+            name = ""
+        return name or "Allgemein"
+
+    all_gewerke = {gname_of(t) for t in tasks}
+    total = done = in_prog = offen = 0
+    by_gewerk: dict[str, dict] = {}
+
+    for t in tasks:
+        s_soll, s_ist, e_ist = t.start_soll, t.start_ist, t.end_ist
+        if until:
+            if (not s_ist) and (not e_ist) and (s_soll and s_soll > until):
+                continue
+            if e_ist and e_ist <= until:
+                cls = "done"
+            elif s_ist and s_ist <= until and (not e_ist or e_ist > until):
+                cls = "in_progress"
+            elif (s_soll is None) or (s_soll and s_soll <= until):
+                cls = "offen"
+            else:
+                continue
+        else:
+            if e_ist:
+                cls = "done"
+            elif s_ist and not e_ist:
+                cls = "in_progress"
+            else:
+                cls = "offen"
+
+        total += 1
+        if cls == "done":
+            done += 1
+        elif cls == "in_progress":
+            in_prog += 1
+        else:
+            offen += 1
+
+        gname = gname_of(t)
+        by_gewerk.setdefault(gname, {"gewerk": gname, "done": 0, "in_progress": 0, "offen": 0})
+        by_gewerk[gname][cls] += 1
+
+    for gname in sorted(all_gewerke):
+        by_gewerk.setdefault(gname, {"gewerk": gname, "done": 0, "in_progress": 0, "offen": 0})
+
+    return {
+        "total": total,
+        "done": done,
+        "in_progress": in_prog,
+        "offen": offen,
+        "percent_done": round((done / total) * 100, 2) if total else 0.0,
+        "by_gewerk": sorted(by_gewerk.values(), key=lambda r: r["gewerk"].lower()),
+    }
+
+
+def old_task_stats(tasks: list[Task]) -> dict:
+    total = len(tasks)
+    done = sum(1 for t in tasks if t.status == "done")
+    in_progress = sum(1 for t in tasks if t.status == "in_progress")
+    offen = sum(1 for t in tasks if t.status == "offen")
+
+    gewerk_stats: dict[str, dict] = {}
+    for t in tasks:
+        if not t.process_step or not t.process_step.gewerk:
+            continue
+        name = t.process_step.gewerk.name
+        gewerk_stats.setdefault(name, {"done": 0, "in_progress": 0, "offen": 0})
+        if t.status in gewerk_stats[name]:
+            gewerk_stats[name][t.status] += 1
+
+    return {
+        "total": total,
+        "done": done,
+        "in_progress": in_progress,
+        "offen": offen,
+        "percent_done": round((done / total) * 100, 1) if total else 0,
+        "by_gewerk": [{"gewerk": name, **counts} for name, counts in gewerk_stats.items()],
+    }
+
+
+# ---------- podaci ----------
+
+@pytest.fixture
+def stats_project(db, engine, project):
+    """Drugi projekt (bez strukture) s taskovima iz TASKS; `project` daje TOP za FK."""
+    top_id = db.query(Task.top_id).filter(Task.project_id == project).first()[0]
+
+    model = ProcessModel(name="Stats")
+    steps: dict = {}
+    for gewerk_name, *_ in TASKS:
+        if gewerk_name == "—" or gewerk_name in steps:
+            continue
+        gewerk = None
+        if gewerk_name is not None:
+            gewerk = db.query(Gewerk).filter_by(name=gewerk_name).first() or Gewerk(name=gewerk_name)
+        steps[gewerk_name] = ProcessStep(activity=f"Schritt {len(steps)}", gewerk=gewerk)
+        model.steps.append(steps[gewerk_name])
+    p = Project(name="Statistik")
+    db.add_all([model, p])
+    db.flush()
+    missing_step = max(s.id for s in steps.values()) + 100
+
+    rows = [
+        {
+            "project_id": p.id,
+            "top_id": top_id,
+            "process_step_id": missing_step if g == "—" else steps[g].id,
+            "status": status,
+            "start_soll": start_soll,
+            "end_soll": start_soll,
+            "start_ist": start_ist,
+            "end_ist": end_ist,
+        }
+        for g, status, start_soll, start_ist, end_ist in TASKS
+    ]
+    db.commit()
+
+    # task bez koraka postoji samo uz isključene FK-ove
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA foreign_keys=OFF"))
+        conn.execute(insert(Task), rows)
+        conn.commit()
+        conn.execute(text("PRAGMA foreign_keys=ON"))
+    return p.id
+
+
+def _tasks(db, project_id) -> list[Task]:
+    db.expire_all()
+    return (
+        db.query(Task)
+        .options(joinedload(Task.process_step).joinedload(ProcessStep.gewerk))
+        .filter(Task.project_id == project_id)
+        .order_by(Task.id)
+        .all()
+    )
+
+
+# ---------- testovi ----------
+
+@pytest.mark.parametrize("until", UNTIL)
+def test_stats_matches_per_task_classification(client, db, stats_project, until):
+    params = {"until": until.isoformat()} if until else {}
+    r = client.get(f"/projects/{stats_project}/stats", params=params)
+    assert r.status_code == 200
+    assert r.json() == old_stats(_tasks(db, stats_project), until)
+
+
+def test_stats_covers_every_class_and_default_gewerk(client, db, stats_project):
+    body = client.get(f"/projects/{stats_project}/stats", params={"until": "2025-01-31"}).json()
+    assert body["done"] and body["in_progress"] and body["offen"]
+    assert body["total"] < len(TASKS)  # budući taskovi se ne broje
+    names = [g["gewerk"] for g in body["by_gewerk"]]
+    assert "Allgemein" in names and "" not in names and "Maler" in names
+    assert names == sorted(names, key=str.lower)
+
+
+def test_task_stats_matches_per_task_classification(client, db, stats_project):
+    r = client.get(f"/projects/{stats_project}/task-stats")
+    assert r.status_code == 200
+    body = r.json()
+    assert body == old_task_stats(_tasks(db, stats_project))
+    # redoslijed = prvi task gewerka, prazni/whitespace nazivi ostaju kakvi jesu
+    assert [g["gewerk"] for g in body["by_gewerk"]] == [
+        "Sanitär", "Elektro", " Maler ", "Maler", "", "   ", "Dach",
+    ]
+
+
+def test_percent_done_rounding(client, db, stats_project):
+    stats = client.get(f"/projects/{stats_project}/stats").json()
+    task_stats = client.get(f"/projects/{stats_project}/task-stats").json()
+    assert stats["percent_done"] == round(stats["done"] / stats["total"] * 100, 2)
+    assert task_stats["percent_done"] == round(task_stats["done"] / task_stats["total"] * 100, 1)
+    assert stats["percent_done"] != round(stats["percent_done"], 1)  # 2 decimale se vide
+
+
+def test_empty_project(client, db):
+    p = Project(name="Leer")
+    db.add(p)
+    db.commit()
+    assert client.get(f"/projects/{p.id}/stats").json() == old_stats([], None)
+    assert client.get(f"/projects/{p.id}/task-stats").json() == old_task_stats([])
@@ -0,0 +1,174 @@
+# tests/test_work_calendar.py
+"""
+WorkCalendar (app/core/work_calendar.py) protiv naivnog računanja dan po
+dan – uklj. datume prije/poslije izgrađenog opsega (kalendar raste sam).
+"""
+import random
+import sys
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from app.core import work_calendar
+from app.core.work_calendar import WorkCalendar, austria_holidays, chain_template
+
+CLOSURES = [(date(2000, 8, 7), date(2000, 8, 18)), (date(1998, 12, 21), date(1999, 1, 8))]
+
+
+def naive_is_workday(d: date, closures=()) -> bool:
+    if d.weekday() >= 5 or d in austria_holidays(d.year):
+        return False
+    return not any(start <= d <= end for start, end in closures)
+
+
+def naive_next_workday(d: date, closures=()) -> date:
+    while not naive_is_workday(d, closures):
+        d += timedelta(days=1)
+    return d
+
+
+def naive_add_workdays(start: date, days: int, closures=()) -> date:
+    d = naive_next_workday(start, closures)
+    for _ in range(max(1, days) - 1):
+        d = naive_next_workday(d + timedelta(days=1), closures)
+    return d
+
+
+def naive_count_workdays(start: date, end: date, closures=()) -> int:
+    return sum(
+        naive_is_workday(start + timedelta(days=i), closures)
+        for i in range((end - start).days + 1)
+    )
+
+
+def fresh(closures=()) -> WorkCalendar:
+    return WorkCalendar(date(2000, 1, 1), date(2001, 12, 31), closures)
+
+
+@pytest.mark.parametrize("d, expected", [
+    (date(1999, 6, 5), date(1999, 6, 7)),      # subota prije opsega → ponedjeljak
+    (date(1999, 12, 31), date(1999, 12, 31)),  # zadnji dan prije opsega je radni
+    (date(1999, 12, 25), date(1999, 12, 27)),  # Christtag (sub) + Stefanitag (ned)
+    (date(1980, 1, 1), date(1980, 1, 2)),      # daleko unazad
+])
+def test_next_workday_before_range(d, expected):
+    assert fresh().next_workday(d) == expected
+
+
+def test_add_workdays_across_start_of_range():
+    # 31.12.1999 (pet) + Neujahr (sub) → 31.12., 3.1., 4.1.
+    assert fresh().add_workdays(date(1999, 12, 31), 3) == date(2000, 1, 4)
+
+
+def test_before_range_matches_naive():
+    rng = random.Random(46)
+    for closures in ((), CLOSURES):
+        for _ in range(300):
+            cal = fresh(closures)  # svaki put svjež → svaki poziv mora rasti unazad
+            d = date(1995, 1, 1) + timedelta(days=rng.randrange(5 * 365))
+            n = rng.randint(1, 40)
+            end = d + timedelta(days=rng.randrange(400))
+            assert cal.next_workday(d) == naive_next_workday(d, closures)
+            assert fresh(closures).add_workdays(d, n) == naive_add_workdays(d, n, closures)
+            assert fresh(closures).count_workdays(d, end) == naive_count_workdays(d, end, closures)
+            assert fresh(closures).is_workday(d) == naive_is_workday(d, closures)
+
+
+def test_forward_growth_and_sub_workdays():
+    cal = fresh()
+    end = date(2004, 3, 10)
+    assert cal.add_workdays(date(2003, 12, 20), 30) == naive_add_workdays(date(2003, 12, 20), 30)
+    start = cal.sub_workdays(end, 15)
+    assert naive_add_workdays(start, 15) == cal.prev_workday(end)
+    assert fresh().prev_workday(date(1999, 1, 3)) == date(1998, 12, 31)
+
+
+def naive_schedule(start: date, steps, closures=()) -> list[tuple[date, date]]:
+    res, cursor = [], start
+    for duration, parallel in steps:
+        s = naive_next_workday(cursor, closures)
+        e = naive_add_workdays(s, duration or 1, closures)
+        res.append((s, e))
+        if not parallel:
+            cursor = e + timedelta(days=1)
+    return res
+
+
+STEPS = [(3, False), (2, True), (4, False), (None, False), (1, True)]
+
+
+def test_schedule_before_range_matches_naive():
+    start = date(1999, 12, 20)
+    assert list(fresh().schedule(chain_template(STEPS), start)) == naive_schedule(start, STEPS)
+
+
+def test_shared_calendar_concurrent_growth():
+    """Kao keširani kalendar u threadpoolu: više niti istovremeno raste unazad i unaprijed."""
+    old_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # česte promjene niti usred rasta
+    try:
+        for round_no in range(5):
+            cal = fresh(CLOSURES)
+            rng = random.Random(round_no)
+            cases = [
+                (date(1960, 1, 1) + timedelta(days=rng.randrange(80 * 365)), rng.randint(1, 60))
+                for _ in range(200)
+            ]
+            errors: list = []
+            barrier = threading.Barrier(8)
+
+            def work(part):
+                barrier.wait()
+                for d, n in part:
+                    got = (cal.next_workday(d), cal.add_workdays(d, n), cal.is_workday(d))
+                    want = (
+                        naive_next_workday(d, CLOSURES),
+                        naive_add_workdays(d, n, CLOSURES),
+                        naive_is_workday(d, CLOSURES),
+                    )
+                    if got != want:
+                        errors.append((d, n, got, want))
+
+            threads = [threading.Thread(target=work, args=(cases[i::8],)) for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert errors == []
+    finally:
+        sys.setswitchinterval(old_interval)
+
+
+def test_shared_schedule_memo_concurrent(monkeypatch):
+    """Memo rasporeda dijele niti; mali memo → često brisanje usred upisa i rasta drugih niti."""
+    monkeypatch.setattr(work_calendar, "SCHEDULE_MEMO_SIZE", 4)
+    template = chain_template(STEPS)
+    old_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for round_no in range(5):
+            cal = fresh(CLOSURES)
+            rng = random.Random(round_no)
+            starts = [date(1960, 1, 1) + timedelta(days=rng.randrange(100 * 365)) for _ in range(40)]
+            expected = {s: naive_schedule(s, STEPS, CLOSURES) for s in starts}
+            errors: list = []
+            barrier = threading.Barrier(8)
+
+            def work(offset):
+                barrier.wait()
+                for i in range(len(starts) * 2):
+                    s = starts[(i + offset) % len(starts)]
+                    got = list(cal.schedule(template, s))
+                    if got != expected[s]:
+                        errors.append((s, got))
+
+            threads = [threading.Thread(target=work, args=(5 * i,)) for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert errors == []
+            assert len(cal._schedules) <= 4
+    finally:
+        sys.setswitchinterval(old_interval)
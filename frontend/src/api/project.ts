@@ -16,6 +16,24 @@ export async function fetchProjects(cfg: AxiosRequestConfig = {}) {
   return data;
 }
 
+// GET /projects/summary – vidljivi projekti + brojevi taskova (jedan poziv za Dashboard)
+export type ProjectSummaryDTO = ProjectDTO & {
+  total: number;
+  done: number;
+  in_progress: number;
+  offen: number;
+  delayed: number;
+  percent_done: number;
+  start?: string | null;
+  end?: string | null;
+  next_milestone?: string | null;
+};
+
+export async function fetchProjectSummary(cfg: AxiosRequestConfig = {}) {
+  const { data } = await api.get<ProjectSummaryDTO[]>("/projects/summary", cfg);
+  return data;
+}
+
 // POST /projects  (multipart: name, description, start_date?, image?)
 export async function createProject(
   form: FormData,
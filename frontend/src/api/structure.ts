@@ -13,8 +13,10 @@ export type StructActivity = {
   gewerk?: string;
 };
 
+export type StructLevel = "top" | "ebene" | "stiege" | "bauteil" | "gewerk";
+
 export type StructSegment = {
-  level: "ebene" | "stiege" | "bauteil";
+  level: StructLevel;
   id: number;
   name: string;
   structure_path?: string;
@@ -23,12 +25,19 @@ export type StructSegment = {
 
 export type StructureTimelineResponse = {
   project_id: number;
-  level: "ebene" | "stiege" | "bauteil";
+  level: StructLevel;
   segments: StructSegment[];
 };
 
+// level=all → svi nivoi odjednom (prebacivanje nivoa bez novog poziva)
+export type StructureTimelineLevelsResponse = {
+  project_id: number;
+  level: "all";
+  levels: Record<StructLevel, StructSegment[]>;
+};
+
 type Params = Partial<{
-  level: "ebene" | "stiege" | "bauteil";
+  level: StructLevel;
   gewerk: string[];
   status: string[];
   startDate: string;
@@ -44,10 +53,7 @@ type Params = Partial<{
   processModels: string[];
 }>;
 
-export async function fetchStructureTimeline(
-  projectId: number,
-  p: Params = {}
-) {
+function buildParams(level: StructLevel | "all", p: Params) {
   const params = new URLSearchParams();
 
   const set = (k: string, v?: string | number | boolean | null) => {
@@ -62,7 +68,7 @@ export async function fetchStructureTimeline(
     }
   };
 
-  set("level", p.level ?? "ebene");
+  set("level", level);
   set("startDate", p.startDate);
   set("endDate", p.endDate);
   set("delayed", typeof p.delayed === "boolean" ? p.delayed : undefined);
@@ -77,10 +83,29 @@ export async function fetchStructureTimeline(
   addAll("bauteile", p.bauteile);
   addAll("activities", p.activities);
   addAll("processModels", p.processModels);
+  return params;
+}
 
+export async function fetchStructureTimeline(
+  projectId: number,
+  p: Params = {}
+) {
+  const params = buildParams(p.level ?? "ebene", p);
   const url = `/projects/${projectId}/structure-timeline`;
   const { data } = await axios.get<StructureTimelineResponse>(
     `${url}?${params.toString()}`
   );
   return data;
 }
+
+export async function fetchStructureTimelineAll(
+  projectId: number,
+  p: Omit<Params, "level"> = {}
+) {
+  const params = buildParams("all", p);
+  const url = `/projects/${projectId}/structure-timeline`;
+  const { data } = await axios.get<StructureTimelineLevelsResponse>(
+    `${url}?${params.toString()}`
+  );
+  return data;
+}
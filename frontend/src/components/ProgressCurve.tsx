@@ -14,10 +14,21 @@ import {
 
 ChartJS.register(LineElement, PointElement, LinearScale, CategoryScale, Filler, Tooltip, Legend);
 
+type Bucket = "day" | "week" | "month";
+
+const BUCKET_LABELS: Record<Bucket, string> = {
+  day: "Tag",
+  week: "Woche",
+  month: "Monat",
+};
+
 interface ProgressData {
-  labels: string[]; // ISO datumi: "YYYY-MM-DD"
-  soll: number[];   // per-day ili već kumulativno (mi ćemo ih kumulirati za svaki slučaj)
+  bucket?: Bucket;
+  labels: string[]; // "YYYY-KWn" | "YYYY-MM-DD" | "YYYY-MM"
+  soll: number[];   // po periodu
   ist: number[];
+  soll_cum?: number[]; // kumulativno (backend)
+  ist_cum?: number[];
 }
 
 const toCumulative = (arr: number[]) =>
@@ -29,24 +40,27 @@ const toCumulative = (arr: number[]) =>
 
 const ProgressCurve: React.FC<{ projectId: number }> = ({ projectId }) => {
   const [progress, setProgress] = useState<ProgressData | null>(null);
+  const [bucket, setBucket] = useState<Bucket>("week");
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const res = await api.get(`/projects/${projectId}/progress-curve`);
+        const res = await api.get(`/projects/${projectId}/progress-curve`, {
+          params: { bucket },
+        });
         setProgress(res.data);
       } catch (err) {
         console.error("Fehler beim Laden der Fortschrittskurve:", err);
       }
     };
     fetchData();
-  }, [projectId]);
+  }, [projectId, bucket]);
 
   if (!progress) return null;
 
-  // 1) osiguraj kumulativne nizove
-  const cumSoll = toCumulative(progress.soll || []);
-  const cumIst  = toCumulative(progress.ist || []);
+  // 1) kumulativni nizovi dolaze s backenda (fallback: saberi ovdje)
+  const cumSoll = progress.soll_cum ?? toCumulative(progress.soll || []);
+  const cumIst  = progress.ist_cum ?? toCumulative(progress.ist || []);
 
   // 2) izračun postotka na temelju zadnje točke (ne zbroja)
   const lastSoll = cumSoll[cumSoll.length - 1] ?? 0;
@@ -58,7 +72,20 @@ const ProgressCurve: React.FC<{ projectId: number }> = ({ projectId }) => {
 
   return (
     <div className="bg-black/20 p-6 rounded-xl shadow-inner border border-slate-700 text-white mt-10">
-      <h3 className="text-lg font-bold text-cyan-300 mb-4">📈 Soll-Ist-Vergleich (Zeitverlauf)</h3>
+      <div className="flex items-center justify-between mb-4">
+        <h3 className="text-lg font-bold text-cyan-300">📈 Soll-Ist-Vergleich (Zeitverlauf)</h3>
+        <select
+          className="bg-slate-800 border border-slate-600 rounded px-2 py-1 text-sm text-slate-200"
+          value={bucket}
+          onChange={(e) => setBucket(e.target.value as Bucket)}
+        >
+          {(Object.keys(BUCKET_LABELS) as Bucket[]).map((b) => (
+            <option key={b} value={b}>
+              {BUCKET_LABELS[b]}
+            </option>
+          ))}
+        </select>
+      </div>
 
       <Line
         height={100}
@@ -4,6 +4,7 @@ import ProcessModelDropdown from "./ProcessModelDropdown";
 import GenerateTasksButton from "./GenerateTasksButton";
 import { useParams } from "react-router-dom";
 import CustomDatePicker from "./CustomDatePicker";
+import { decodeTimeline } from "../utils/timelineColumnar";
 
 type EntityType = "bauteil" | "stiege" | "ebene" | "top";
 
@@ -676,6 +677,7 @@ const ProjektStruktur: React.FC<ProjektStrukturProps> = ({
       try {
         // koristi postojeću rutu (istu kao na Timelineu)
         const r = await api.get(`/projects/${pid}/tasks-timeline`, {
+          params: { format: "columnar" },
           meta: { showLoader: false },
         });
         if (!alive) return;
@@ -683,7 +685,7 @@ const ProjektStruktur: React.FC<ProjektStrukturProps> = ({
         const byTopStart: Record<number, string> = {};
         const byTopModel: Record<number, string> = {};
 
-        const arr = Array.isArray(r.data) ? r.data : [];
+        const arr = decodeTimeline(r.data);
         for (const t of arr) {
           const topId = Number(t.top_id);
           if (!topId) continue;
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from "react";
 import {
-  fetchProjects,
+  fetchProjectSummary,
   createProject,
   updateProject,
   deleteProject,
@@ -82,7 +82,7 @@ const Dashboard: React.FC = () => {
 
   const refreshProjectsSilently = async () => {
     try {
-      const data = await fetchProjects({ hideLoader: true }); // ⬅️ dodano
+      const data = await fetchProjectSummary({ hideLoader: true }); // ⬅️ dodano
       setProjects(data);
     } catch (err) {
       console.error(err);
@@ -93,7 +93,7 @@ const Dashboard: React.FC = () => {
   const loadProjects = async () => {
     try {
       
-      const data = await fetchProjects();
+      const data = await fetchProjectSummary();
       setProjects(data);
     } catch (err) {
       setError("Fehler beim Laden der Projekte.");
@@ -475,6 +475,26 @@ const Dashboard: React.FC = () => {
                   <CalendarDays size={22} className="mr-2" />
                   {formatDate(p.start_date) || "Kein Datum"}
                 </div>
+
+                {p.total > 0 && (
+                  <div className="mt-3 space-y-1">
+                    <div className="h-1.5 w-full rounded bg-white/20 overflow-hidden">
+                      <div
+                        className="h-full bg-green-400"
+                        style={{ width: `${p.percent_done}%` }}
+                      />
+                    </div>
+                    <div className="flex flex-wrap gap-x-3 text-xs text-gray-200">
+                      <span>
+                        ✔ {p.done}/{p.total} ({p.percent_done}%)
+                      </span>
+                      {p.delayed > 0 && <span>⚠ {p.delayed} verspätet</span>}
+                      {p.next_milestone && (
+                        <span>Nächste Frist: {formatDate(p.next_milestone)}</span>
+                      )}
+                    </div>
+                  </div>
+                )}
               </div>
             </div>
           ))}
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from "react";
+import React, { useCallback, useEffect, useState } from "react";
 import { useNavigate, useParams } from "react-router-dom";
 import api from "../api/axios";
 
@@ -35,40 +35,48 @@ type TaskRow = {
   check_answers: TaskCheckAnswer[];
 };
 
+type TableOptions = {
+  bauteil: string[];
+  stiege: string[];
+  ebene: string[];
+  top: string[];
+};
+
+// GET /projects/{id}/tasks-tabelle → jedna stranica (keyset kursor)
+type TaskTablePage = {
+  items: TaskRow[];
+  total: number;
+  next_cursor: string | null;
+  sort: string;
+  order: "asc" | "desc";
+  options?: TableOptions;
+};
+
+const PAGE_SIZE = 100;
+
 const ProjectTasksTable: React.FC = () => {
   const { id } = useParams<{ id: string }>(); // projekt id
   const navigate = useNavigate();
 
   const [projectName, setProjectName] = useState<string>("");
   const [rows, setRows] = useState<TaskRow[]>([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [sort, setSort] = useState("struktur");
+  const [order, setOrder] = useState<"asc" | "desc">("asc");
+  const [options, setOptions] = useState<TableOptions>({
+    bauteil: [],
+    stiege: [],
+    ebene: [],
+    top: [],
+  });
   const [filterBauteil, setFilterBauteil] = useState("");
   const [filterStiege, setFilterStiege] = useState("");
   const [filterEbene, setFilterEbene] = useState("");
   const [filterTop, setFilterTop] = useState("");
-  const unique = <T,>(arr: T[]): T[] => Array.from(new Set(arr));
-
-  const bauteile = unique(
-    rows.map((r) => r.bauteil ?? "").filter((v) => v !== "")
-  );
 
-  const stiegen = unique(
-    rows.map((r) => r.stiege ?? "").filter((v) => v !== "")
-  );
-
-  const ebenen = unique(rows.map((r) => r.ebene ?? "").filter((v) => v !== ""));
-
-  const tops = unique(rows.map((r) => r.top ?? "").filter((v) => v !== ""));
-  
-
-  const filteredRows = rows.filter(
-    (r) =>
-      (!filterBauteil || r.bauteil === filterBauteil) &&
-      (!filterStiege || r.stiege === filterStiege) &&
-      (!filterEbene || r.ebene === filterEbene) &&
-      (!filterTop || r.top === filterTop)
-  );
-  
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [expanded, setExpanded] = useState<Set<number>>(new Set());
 
   // helper za datum
@@ -88,6 +96,44 @@ const ProjectTasksTable: React.FC = () => {
     });
   };
 
+  // sort + filteri idu na server (isti filteri kao timeline)
+  const fetchPage = useCallback(
+    async (cursor: string | null): Promise<TaskTablePage> => {
+      const params = new URLSearchParams();
+      params.set("sort", sort);
+      params.set("order", order);
+      params.set("limit", String(PAGE_SIZE));
+      if (cursor) params.set("cursor", cursor);
+      if (filterBauteil) params.append("bauteil", filterBauteil);
+      if (filterStiege) params.append("stiege", filterStiege);
+      if (filterEbene) params.append("ebene", filterEbene);
+      if (filterTop) params.append("top", filterTop);
+
+      const res = await api.get(`/projects/${id}/tasks-tabelle`, {
+        params,
+        meta: { showLoader: false },
+      });
+      return res.data as TaskTablePage;
+    },
+    [id, sort, order, filterBauteil, filterStiege, filterEbene, filterTop]
+  );
+
+  // naziv projekta (jednom po projektu)
+  useEffect(() => {
+    if (!id) return;
+    let alive = true;
+    api
+      .get(`/projects/${id}`, { meta: { showLoader: false } })
+      .then((proj) => {
+        if (alive) setProjectName(proj.data?.name ?? "");
+      })
+      .catch((err) => console.error("Fehler beim Laden des Projekts:", err));
+    return () => {
+      alive = false;
+    };
+  }, [id]);
+
+  // prva stranica – ponovo kad se promijeni sort ili filter
   useEffect(() => {
     if (!id) return;
 
@@ -96,50 +142,13 @@ const ProjectTasksTable: React.FC = () => {
 
     (async () => {
       try {
-        // 1) naziv projekta (opcionalno)
-        const proj = await api.get(`/projects/${id}`, {
-          meta: { showLoader: false },
-        });
-
-        // 2) tasks + check-answers
-        // OVDJE pretpostavljam novu backend rutu:
-        // GET /projects/{id}/tasks-tabelle
-        const res = await api.get(`/projects/${id}/tasks-tabelle`, {
-          meta: { showLoader: false },
-        });
-
+        const page = await fetchPage(null);
         if (!alive) return;
-
-        const data: TaskRow[] = Array.isArray(res.data) ? res.data : [];
-
-        // sortiraj po: bauteil > stiege > ebene > top > task
-        const coll = new Intl.Collator("de", {
-          numeric: true,
-          sensitivity: "base",
-        });
-        const sorted = [...data].sort((a, b) => {
-          const b1 = a.bauteil || "";
-          const b2 = b.bauteil || "";
-          const s1 = a.stiege || "";
-          const s2 = b.stiege || "";
-          const e1 = a.ebene || "";
-          const e2 = b.ebene || "";
-          const t1 = a.top || "";
-          const t2 = b.top || "";
-          const n1 = a.task || "";
-          const n2 = b.task || "";
-
-          return (
-            coll.compare(b1, b2) ||
-            coll.compare(s1, s2) ||
-            coll.compare(e1, e2) ||
-            coll.compare(t1, t2) ||
-            coll.compare(n1, n2)
-          );
-        });
-
-        setProjectName(proj.data?.name ?? "");
-        setRows(sorted);
+        setRows(page.items);
+        setTotal(page.total);
+        setNextCursor(page.next_cursor);
+        if (page.options) setOptions(page.options);
+        setExpanded(new Set());
       } catch (err) {
         console.error("Fehler beim Laden der Aufgabentabelle:", err);
       } finally {
@@ -150,7 +159,78 @@ const ProjectTasksTable: React.FC = () => {
     return () => {
       alive = false;
     };
-  }, [id]);
+  }, [id, fetchPage]);
+
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(nextCursor);
+      setRows((prev) => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      console.error("Fehler beim Laden der Aufgabentabelle:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // export ide na server (isti filteri kao tabela) – browser samo sprema fajl
+  const [exporting, setExporting] = useState(false);
+  const exportTable = async (format: "csv" | "xlsx") => {
+    setExporting(true);
+    try {
+      const params = new URLSearchParams();
+      params.set("format", format);
+      if (filterBauteil) params.append("bauteil", filterBauteil);
+      if (filterStiege) params.append("stiege", filterStiege);
+      if (filterEbene) params.append("ebene", filterEbene);
+      if (filterTop) params.append("top", filterTop);
+
+      const res = await api.get(`/projects/${id}/tasks-export`, {
+        params,
+        responseType: "blob",
+        meta: { showLoader: false },
+      });
+      const disposition = String(res.headers["content-disposition"] || "");
+      const match = disposition.match(/filename="([^"]+)"/);
+      const url = URL.createObjectURL(res.data as Blob);
+      const link = document.createElement("a");
+      link.href = url;
+      link.download = match ? match[1] : `aufgaben.${format}`;
+      document.body.appendChild(link);
+      link.click();
+      link.remove();
+      URL.revokeObjectURL(url);
+    } catch (err) {
+      console.error("Fehler beim Export:", err);
+      alert("Export fehlgeschlagen.");
+    } finally {
+      setExporting(false);
+    }
+  };
+
+  const toggleSort = (key: string) => {
+    if (sort === key) {
+      setOrder((o) => (o === "asc" ? "desc" : "asc"));
+    } else {
+      setSort(key);
+      setOrder("asc");
+    }
+  };
+
+  const SortTh: React.FC<{ col: string; children: React.ReactNode }> = ({
+    col,
+    children,
+  }) => (
+    <th
+      className="px-3 py-2 text-left font-semibold cursor-pointer select-none hover:bg-slate-200"
+      onClick={() => toggleSort(col)}
+    >
+      {children}
+      {sort === col && (order === "asc" ? " ▲" : " ▼")}
+    </th>
+  );
 
   // grupiranje po strukturi
   let lastGroupKey = "";
@@ -168,7 +248,7 @@ const ProjectTasksTable: React.FC = () => {
             onChange={(e) => setFilterBauteil(e.target.value)}
           >
             <option value="">Bauteil (alle)</option>
-            {bauteile.map((b) => (
+            {options.bauteil.map((b) => (
               <option key={b} value={b}>
                 {b}
               </option>
@@ -181,7 +261,7 @@ const ProjectTasksTable: React.FC = () => {
             onChange={(e) => setFilterStiege(e.target.value)}
           >
             <option value="">Stiege (alle)</option>
-            {stiegen.map((s) => (
+            {options.stiege.map((s) => (
               <option key={s} value={s}>
                 {s}
               </option>
@@ -194,7 +274,7 @@ const ProjectTasksTable: React.FC = () => {
             onChange={(e) => setFilterEbene(e.target.value)}
           >
             <option value="">Ebene (alle)</option>
-            {ebenen.map((e) => (
+            {options.ebene.map((e) => (
               <option key={e} value={e}>
                 {e}
               </option>
@@ -207,7 +287,7 @@ const ProjectTasksTable: React.FC = () => {
             onChange={(e) => setFilterTop(e.target.value)}
           >
             <option value="">Top (alle)</option>
-            {tops.map((t) => (
+            {options.top.map((t) => (
               <option key={t} value={t}>
                 {t}
               </option>
@@ -216,6 +296,20 @@ const ProjectTasksTable: React.FC = () => {
         </div>
 
         <div className="flex items-center gap-2">
+          <button
+            className="px-3 py-2 rounded bg-emerald-100 text-emerald-900 hover:bg-emerald-200 disabled:opacity-50"
+            onClick={() => exportTable("csv")}
+            disabled={exporting}
+          >
+            ⬇ CSV
+          </button>
+          <button
+            className="px-3 py-2 rounded bg-emerald-100 text-emerald-900 hover:bg-emerald-200 disabled:opacity-50"
+            onClick={() => exportTable("xlsx")}
+            disabled={exporting}
+          >
+            ⬇ Excel
+          </button>
           <button
             className="px-3 py-2 rounded bg-gray-200 text-gray-900 hover:bg-gray-300"
             onClick={() => navigate(`/projekt/${id}/timeline`)}
@@ -243,41 +337,31 @@ const ProjectTasksTable: React.FC = () => {
             <table className="min-w-full text-sm">
               <thead className="bg-slate-100 sticky top-0 z-10">
                 <tr>
-                  <th className="px-3 py-2 text-left font-semibold">
-                    Struktur
-                  </th>
-                  <th className="px-3 py-2 text-left font-semibold">Top</th>
-                  <th className="px-3 py-2 text-left font-semibold">
-                    Aktivität
-                  </th>
-                  <th className="px-3 py-2 text-left font-semibold">Gewerk</th>
-                  <th className="px-3 py-2 text-left font-semibold">PM</th>
-                  <th className="px-3 py-2 text-left font-semibold">
-                    Start Soll
-                  </th>
-                  <th className="px-3 py-2 text-left font-semibold">
-                    Ende Soll
-                  </th>
-                  <th className="px-3 py-2 text-left font-semibold">
-                    Start Ist
-                  </th>
-                  <th className="px-3 py-2 text-left font-semibold">
-                    Ende Ist
-                  </th>
-                  <th className="px-3 py-2 text-left font-semibold">Status</th>
-                  <th className="px-3 py-2 text-left font-semibold">Sub</th>
+                  <SortTh col="struktur">Struktur</SortTh>
+                  <SortTh col="top">Top</SortTh>
+                  <SortTh col="task">Aktivität</SortTh>
+                  <SortTh col="gewerk_name">Gewerk</SortTh>
+                  <SortTh col="process_model">PM</SortTh>
+                  <SortTh col="start_soll">Start Soll</SortTh>
+                  <SortTh col="end_soll">Ende Soll</SortTh>
+                  <SortTh col="start_ist">Start Ist</SortTh>
+                  <SortTh col="end_ist">Ende Ist</SortTh>
+                  <SortTh col="status">Status</SortTh>
+                  <SortTh col="sub_name">Sub</SortTh>
                   <th className="px-3 py-2 text-left font-semibold">
                     Checkliste
                   </th>
                 </tr>
               </thead>
               <tbody>
-                {filteredRows.map((row) => {
+                {rows.map((row) => {
                   const groupKey = `${row.bauteil || ""}|${row.stiege || ""}|${
                     row.ebene || ""
                   }`;
 
-                  const showGroupHeader = groupKey !== lastGroupKey;
+                  // zaglavlje grupe ima smisla samo kad je sort po strukturi
+                  const showGroupHeader =
+                    sort === "struktur" && groupKey !== lastGroupKey;
                   if (showGroupHeader) lastGroupKey = groupKey;
 
                   const isExpanded = expanded.has(row.id);
@@ -428,6 +512,20 @@ const ProjectTasksTable: React.FC = () => {
               </tbody>
             </table>
           </div>
+          <div className="flex items-center justify-between px-3 py-2 border-t text-sm text-slate-600">
+            <span>
+              {rows.length} von {total} Aktivitäten
+            </span>
+            {nextCursor && (
+              <button
+                className="px-3 py-1 rounded bg-gray-200 text-gray-900 hover:bg-gray-300 disabled:opacity-50"
+                onClick={loadMore}
+                disabled={loadingMore}
+              >
+                {loadingMore ? "Lädt…" : "Mehr laden"}
+              </button>
+            )}
+          </div>
         </div>
       )}
     </div>
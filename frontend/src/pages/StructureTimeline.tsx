@@ -10,8 +10,9 @@ import { Printer } from "lucide-react";
 
 
 import {
-  fetchStructureTimeline,
-  type StructureTimelineResponse,
+  fetchStructureTimelineAll,
+  type StructLevel,
+  type StructureTimelineLevelsResponse,
 } from "../api/structure";
 import { useParams, useSearchParams, useNavigate } from "react-router-dom";
 import "./TaskCalendar.css";
@@ -24,7 +25,15 @@ import {
   type BgEvent,
 } from "../utils/calendarAT"; // koristi iste utilse kao TaskCalendar
 
-type Level = "ebene" | "stiege" | "bauteil";
+type Level = StructLevel;
+
+const LEVEL_LABELS: Record<Level, string> = {
+  top: "Top",
+  ebene: "Ebene",
+  stiege: "Stiege",
+  bauteil: "Bauteil",
+  gewerk: "Gewerk",
+};
 
 function pct(n: number) {
   const p = Math.round((n || 0) * 100);
@@ -50,13 +59,21 @@ export default function StructureTimelinePage() {
   const params = useParams();
   const routeProjectId = params.projectId ?? params.id;
   const [search] = useSearchParams();
-  const initialLevel = (search.get("level") as Level) || "ebene";
+  const qLevel = search.get("level") as Level | null;
+  const initialLevel: Level = qLevel && qLevel in LEVEL_LABELS ? qLevel : "ebene";
   const [projectName, setProjectName] = React.useState<string>("");
   const calRef = React.useRef<FullCalendar | null>(null);
   const navigate = useNavigate();  const [level, setLevel] = React.useState<Level>(initialLevel);
   const [loading, setLoading] = React.useState(false);
-  const [data, setData] = React.useState<StructureTimelineResponse | null>(
-    null
+  // svi nivoi se učitavaju odjednom → promjena nivoa je samo lokalni odabir
+  const [allLevels, setAllLevels] =
+    React.useState<StructureTimelineLevelsResponse | null>(null);
+  const data = React.useMemo(
+    () =>
+      allLevels
+        ? { level, segments: allLevels.levels[level] ?? [] }
+        : null,
+    [allLevels, level]
   );
   const [title, setTitle] = React.useState<string>("");
   const [projRange, setProjRange] = React.useState<{
@@ -94,12 +111,12 @@ export default function StructureTimelinePage() {
     if (!projectIdNum) return;
     setLoading(true);
     try {
-      const res = await fetchStructureTimeline(projectIdNum, { level });
-      setData(res);
-      // izračun najmanjeg starta i najvećeg enda
+      const res = await fetchStructureTimelineAll(projectIdNum);
+      setAllLevels(res);
+      // izračun najmanjeg starta i najvećeg enda (Bauteil pokriva sve taskove)
       const starts: number[] = [];
       const ends: number[] = [];
-      for (const seg of res.segments) {
+      for (const seg of res.levels.bauteil ?? []) {
         for (const a of seg.activities) {
           if (a.start) starts.push(new Date(a.start).getTime());
           if (a.end) ends.push(new Date(a.end).getTime());
@@ -127,7 +144,7 @@ export default function StructureTimelinePage() {
     } finally {
       setLoading(false);
     }
-  }, [projectIdNum, level]);
+  }, [projectIdNum]);
 
   React.useEffect(() => {
     load();
@@ -293,9 +310,11 @@ export default function StructureTimelinePage() {
           onChange={(e) => setLevel(e.target.value as Level)}
           disabled={loading}
         >
-          <option value="ebene">Ebene</option>
-          <option value="stiege">Stiege</option>
-          <option value="bauteil">Bauteil</option>
+          {(Object.keys(LEVEL_LABELS) as Level[]).map((l) => (
+            <option key={l} value={l}>
+              {LEVEL_LABELS[l]}
+            </option>
+          ))}
         </select>
 
         {/* 👉 desna grupa dugmadi */}
@@ -451,13 +470,7 @@ export default function StructureTimelinePage() {
         resourceAreaWidth="140px"
         resources={resources}
         eventSources={eventSources}
-        resourceAreaHeaderContent={
-          level === "ebene"
-            ? "Ebene"
-            : level === "stiege"
-            ? "Stiege"
-            : "Bauteil"
-        }
+        resourceAreaHeaderContent={LEVEL_LABELS[level]}
         resourceLabelContent={resourceLabelContent}
         eventContent={eventContent}
         editable={false}
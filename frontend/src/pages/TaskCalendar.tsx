@@ -24,6 +24,7 @@ import {
 } from "../utils/calendarAT";
 import { type BgEvent } from "../utils/calendarAT";
 import CustomDatePicker from "../components/CustomDatePicker";
+import { decodeTimeline } from "../utils/timelineColumnar";
 
 type QuestionFieldType = "boolean" | "text" | "image";
 
@@ -302,6 +303,50 @@ const TaskCalendar = () => {
     }
   };
 
+  // Gantt pomjeranja: sve promjene iz istog "ticka" (npr. više označenih
+  // taskova) idu kao JEDAN POST /tasks/batch → jedan round trip, jedan commit
+  type PendingMove = {
+    payload: { id: number; start_soll?: string; end_soll?: string };
+    apply: () => void;
+    revert: () => void;
+  };
+  const pendingMovesRef = useRef<Map<number, PendingMove>>(new Map());
+  const moveFlushRef = useRef<ReturnType<typeof setTimeout> | null>(null);
+
+  const flushMoves = async () => {
+    moveFlushRef.current = null;
+    const moves = Array.from(pendingMovesRef.current.values());
+    pendingMovesRef.current = new Map();
+    if (!moves.length) return;
+
+    await withPageLoading(async () => {
+      try {
+        await api.post(
+          "/tasks/batch",
+          { items: moves.map((m) => m.payload) },
+          { meta: { showLoader: false } }
+        );
+        moves.forEach((m) => m.apply());
+      } catch (err: any) {
+        console.error("POST /tasks/batch error:", err?.response?.data ?? err);
+        moves.forEach((m) => m.revert()); // vrati vizuelno na staro ako fail
+        alert("Speichern fehlgeschlagen.");
+      }
+    });
+  };
+
+  const queueMove = (move: PendingMove) => {
+    const prev = pendingMovesRef.current.get(move.payload.id);
+    pendingMovesRef.current.set(move.payload.id, {
+      ...move,
+      // revert vraća na stanje PRIJE prvog pomjeranja u ovoj seriji
+      revert: prev ? prev.revert : move.revert,
+    });
+    if (!moveFlushRef.current) {
+      moveFlushRef.current = setTimeout(flushMoves, 0);
+    }
+  };
+
   const natCmp = new Intl.Collator(undefined, {
     numeric: true,
     sensitivity: "base",
@@ -330,13 +375,15 @@ const TaskCalendar = () => {
       selectedBauteile.forEach((b) => params.append("bauteil", b));
       selectedActivities.forEach((a) => params.append("activity", a));
       selectedProcessModels.forEach((p) => params.append("processModel", p));
+      // kompaktni payload (lookup tabele + indeksi), dekodira se ispod
+      params.append("format", "columnar");
 
       const res = await api.get(`/projects/${id}/tasks-timeline?${params}`, {
         signal: ctrl.signal,
         meta: { showLoader: false },
       });
 
-      let allData = res.data;
+      let allData = decodeTimeline(res.data);
 
       // Ako dataset >5000 i još smo u auto modu, otvori DateFilter tab
       if (Array.isArray(allData)) {
@@ -400,7 +447,7 @@ const TaskCalendar = () => {
             meta: { showLoader: false },
           }
         );
-        allData = refetch.data;
+        allData = decodeTimeline(refetch.data);
       }
 
       let data = allData;
@@ -1377,10 +1424,12 @@ const closeQuestionDialog = () => setQuestionDialog(null);
               const willBeDone = !!u.end_ist;
               const taskId = Number(u.id);
 
-              // 1) prvo snimi task
-              await api.put(`/tasks/${u.id}`, payload, {
-                meta: { showLoader: false },
-              });
+              // 1) prvo snimi task (batch endpoint: jedan commit + jedan log)
+              await api.post(
+                "/tasks/batch",
+                { items: [{ ...payload, id: taskId }] },
+                { meta: { showLoader: false } }
+              );
 
               // 2) osvježi event u kalendaru
               const apiCal = calRef.current?.getApi();
@@ -1416,7 +1465,7 @@ const closeQuestionDialog = () => setQuestionDialog(null);
                 await openQuestionDialogForTask(taskId, u.title ?? "");
               }
             } catch (err) {
-              console.error("PUT /tasks error:", err);
+              console.error("POST /tasks/batch error:", err);
               alert("Speichern fehlgeschlagen.");
             }
           }}
@@ -1707,35 +1756,33 @@ const closeQuestionDialog = () => setQuestionDialog(null);
               }}
               footerToolbar={false}
               editable={true}
-              eventChange={async (info) => {
-                await withPageLoading(async () => {
-                  const ev = info.event;
-                  // tretiramo timeline kao “all-day-like” (dnevni koraci)
-                  const allDayLike = true;
-
-                  const startISO = toLocalYMD(ev.start);
-                  const endISO = endExclusiveToInclusiveLocal(
-                    ev.end,
-                    allDayLike
-                  );
+              eventChange={(info) => {
+                const ev = info.event;
+                // tretiramo timeline kao “all-day-like” (dnevni koraci)
+                const allDayLike = true;
+
+                const startISO = toLocalYMD(ev.start);
+                const endISO = endExclusiveToInclusiveLocal(
+                  ev.end,
+                  allDayLike
+                );
 
-                  // ako nema stvarne promjene, ne zovi backend
-                  const prev = info.oldEvent;
-                  const prevStart = toLocalYMD(prev.start);
-                  const prevEnd = endExclusiveToInclusiveLocal(
-                    prev.end,
-                    allDayLike
-                  );
-                  if (startISO === prevStart && endISO === prevEnd) return;
+                // ako nema stvarne promjene, ne zovi backend
+                const prev = info.oldEvent;
+                const prevStart = toLocalYMD(prev.start);
+                const prevEnd = endExclusiveToInclusiveLocal(
+                  prev.end,
+                  allDayLike
+                );
+                if (startISO === prevStart && endISO === prevEnd) return;
 
-                  const payload: Record<string, any> = {};
-                  if (startISO) payload.start_soll = startISO;
-                  if (endISO) payload.end_soll = endISO;
+                const payload: PendingMove["payload"] = { id: Number(ev.id) };
+                if (startISO) payload.start_soll = startISO;
+                if (endISO) payload.end_soll = endISO;
 
-                  try {
-                    await api.put(`/tasks/${ev.id}`, payload, {
-                      meta: { showLoader: false },
-                    });
+                queueMove({
+                  payload,
+                  apply: () => {
                     // lokalno osvježi extendedProps za tooltipe
                     ev.setExtendedProp("start_soll", startISO);
                     ev.setExtendedProp("end_soll", endISO);
@@ -1744,14 +1791,8 @@ const closeQuestionDialog = () => setQuestionDialog(null);
                       ev.extendedProps.end_ist
                     );
                     ev.setExtendedProp("verzug", newVerzug);
-                  } catch (err: any) {
-                    console.error(
-                      "PUT /tasks error:",
-                      err?.response?.data ?? err
-                    );
-                    info.revert(); // vrati vizuelno na staro ako fail
-                    alert("Speichern fehlgeschlagen.");
-                  }
+                  },
+                  revert: () => info.revert(),
                 });
               }}
               eventContent={(arg) => {
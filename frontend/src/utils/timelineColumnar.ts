@@ -0,0 +1,51 @@
+// src/utils/timelineColumnar.ts
+// Dekoder za /tasks-timeline?format=columnar (backend: app/core/timeline_columnar.py)
+
+export type ColumnarTimeline = {
+  format: "columnar";
+  version: number;
+  count: number;
+  base_date: string | null;
+  dicts: Record<string, string[]>;
+  columns: Record<string, (number | string | null)[]>;
+};
+
+const DATE_FIELDS = new Set(["start_soll", "end_soll", "start_ist", "end_ist"]);
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+export function isColumnarTimeline(data: any): data is ColumnarTimeline {
+  return !!data && !Array.isArray(data) && data.format === "columnar";
+}
+
+// Vrati listu redova u istom obliku kao klasični /tasks-timeline (TimelineTask[]).
+// Ako je već lista – vrati je nepromijenjenu.
+export function decodeTimeline(data: any): any[] {
+  if (!isColumnarTimeline(data)) return Array.isArray(data) ? data : [];
+
+  const { count, dicts, columns } = data;
+  const base = data.base_date ? Date.parse(`${data.base_date}T00:00:00Z`) : 0;
+  const dateCache = new Map<number, string>();
+  const toDate = (off: number) => {
+    let s = dateCache.get(off);
+    if (s === undefined) {
+      s = new Date(base + off * DAY_MS).toISOString().slice(0, 10);
+      dateCache.set(off, s);
+    }
+    return s;
+  };
+
+  const fields = Object.keys(columns);
+  const rows: any[] = new Array(count);
+  for (let i = 0; i < count; i++) {
+    const row: any = {};
+    for (const f of fields) {
+      const v = columns[f][i];
+      if (v == null) row[f] = null;
+      else if (dicts[f]) row[f] = dicts[f][v as number];
+      else if (DATE_FIELDS.has(f)) row[f] = toDate(v as number);
+      else row[f] = v;
+    }
+    rows[i] = row;
+  }
+  return rows;
+}